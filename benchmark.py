@@ -0,0 +1,108 @@
+"""
+Measures how quickly each lexer and parser combination parses a large generated DB, like those shipped by some IOCs.
+
+Run with: python benchmark.py [--records N] [--repeats N]
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from src.db_parser.bulk_lexer import BulkLexer
+from src.db_parser.fast_parser import FastParser
+from src.db_parser.lexer import Lexer
+from src.db_parser.parser import Parser
+
+RECORD_TEMPLATE = """# Channel {0}
+record(ai, "$(P)CH{0}:TEMP") {{
+    field(DESC, "Channel {0} temperature")
+    field(DTYP, "asynFloat64")
+    field(INP, "@asyn($(PORT),{0},1)TEMP")
+    field(SCAN, "1 second")
+    field(EGU, "K")
+    field(PREC, "3")
+    info(archive, "VAL")
+    alias("$(P)CH{0}:T")
+}}
+
+"""
+
+"""
+Lexer and parser combinations to compare, in the order they are reported.
+"""
+ENGINES = [
+    ("Lexer + Parser", Lexer, Parser),
+    ("BulkLexer + Parser", BulkLexer, Parser),
+    ("BulkLexer + FastParser", BulkLexer, FastParser),
+]
+
+
+def generated_db(records):
+    return "".join(RECORD_TEMPLATE.format(i) for i in range(records))
+
+
+def time_parse(lexer_class, parser_class, contents, repeats):
+    """
+    Returns:
+        the fastest time in seconds taken to parse the contents, over the given number of repeats
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        parser_class(lexer_class(contents)).db()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def parsed_memory(lexer_class, parser_class, contents):
+    """
+    Returns:
+        tuple of (bytes allocated for the parsed DB, of which bytes used to keep the location of each record and field)
+    """
+    gc.collect()
+    tracemalloc.start()
+    db = parser_class(lexer_class(contents)).db()
+    gc.collect()
+    total = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # The locations of all the records and fields are kept in a single array of offsets.
+    locations = sys.getsizeof(db.offsets)
+    return total, locations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks parsing a large generated DB.")
+    parser.add_argument("--records", type=int, default=10000, help="Number of records in the DB.")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of times to parse the DB.")
+    args = parser.parse_args()
+
+    contents = generated_db(args.records)
+    print(
+        "Parsing {} records ({} bytes), best of {}".format(
+            args.records, len(contents), args.repeats
+        )
+    )
+
+    baseline = None
+    for name, lexer_class, parser_class in ENGINES:
+        seconds = time_parse(lexer_class, parser_class, contents, args.repeats)
+        baseline = baseline if baseline is not None else seconds
+        total, locations = parsed_memory(lexer_class, parser_class, contents)
+        print(
+            "{:<24} {:>8.3f} s {:>10.0f} records/s {:>6.1f}x {:>8.1f} MB parsed"
+            " ({:.1f}% for locations)".format(
+                name,
+                seconds,
+                args.records / seconds,
+                baseline / seconds,
+                total / 1e6,
+                100.0 * locations / total,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
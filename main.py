@@ -1,14 +1,266 @@
 from __future__ import division
 
 import argparse
-import os
+import contextlib
+import sqlite3
 import sys
 
-from src.constants import RELEASES_DIR
-from src.db_iterators import DbChangesIterator
+from src.constants import CACHE_DIR, RELEASES_DIR
+from src.db_diff import DEFAULT_MAX_TEXT_DIFF_SIZE, DEFAULT_PARSER, PARSERS
+from src.db_filter import RecordFilter
+from src.db_iterators import (
+    DBD_FILE_TYPES,
+    DEFAULT_PATH_RULES,
+    WHOLE_TREE_PATH_RULES,
+    DbChangesIterator,
+    default_path_matcher,
+    path_matcher_from_config_file,
+    whole_tree_path_matcher,
+)
+from src.gating import EXIT_OVER_BUDGET, FAIL_ON_KINDS, LINK_FAIL_ON_KINDS, ChangeBudget
+from src.git_changes import GitDbChangesIterator, GitRepository
+from src.mirror import DEFAULT_MIRROR_WORKERS, ReleaseMirror
+from src.path_comparison import PathComparer
+from src.pipeline import DEFAULT_PIPELINE_READERS, ChangesPipeline
+from src.progress import ComparisonProgress, ProgressReporter
+from src.release_bisect import ReleaseBisector
+from src.release_store import ReleaseStore
+from src.releases import DEFAULT_RELEASE_LIST_TTL, ReleaseCatalogue
+from src.server import (
+    DEFAULT_MAX_RELEASES,
+    DEFAULT_SERVER_HOST,
+    DEFAULT_SERVER_PORT,
+    ComparisonService,
+    comparison_server,
+)
+from src.summary import DETAILS_FORMATS, ChangeSummary
 
 
-def main():
+def add_release_arguments(parser):
+    """
+    Adds the arguments for finding releases to a parser.
+    """
+    parser.add_argument(
+        "--releases-dir",
+        type=str,
+        default=RELEASES_DIR,
+        help="Directory containing the releases, e.g. a local mirror of the releases share.",
+    )
+    parser.add_argument(
+        "--release-list-ttl",
+        type=int,
+        default=DEFAULT_RELEASE_LIST_TTL,
+        help="Number of seconds to cache the list of valid releases (shown if an invalid release is given) for.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=CACHE_DIR,
+        help="Directory to cache data about releases in, such as their record type schemas.",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=None,
+        help="JSON file of rules for which directories and files to walk. See README.md for the format.",
+    )
+
+
+def release_catalogue(args, *releases):
+    """
+    Creates the release catalogue given by the arguments, exiting if any of the given releases are not valid.
+    """
+    catalogue = ReleaseCatalogue(args.releases_dir, args.cache_dir, args.release_list_ttl)
+
+    # Only check the requested releases, so that we don't need to look at every release on the share.
+    if not all(catalogue.is_valid(release) for release in releases):
+        print(
+            "Invalid release given. Valid releases are: {}".format(
+                ", ".join(catalogue.valid_releases())
+            )
+        )
+        sys.exit(1)
+
+    return catalogue
+
+
+def path_matcher(parser, args, whole_tree=False):
+    """
+    Creates the path matcher given by the arguments, exiting with a usage error if it is not valid.
+    Args:
+        parser: the parser the arguments were parsed by
+        args: the parsed arguments, including --config
+        whole_tree: whether to search the whole tree by default (see WHOLE_TREE_PATH_RULES), rather than only the
+            directories of a release
+    """
+    try:
+        if args.config is not None:
+            return path_matcher_from_config_file(
+                args.config, WHOLE_TREE_PATH_RULES if whole_tree else DEFAULT_PATH_RULES
+            )
+        return whole_tree_path_matcher() if whole_tree else default_path_matcher()
+    except (IOError, ValueError) as e:
+        parser.error(str(e))
+
+
+def add_comparison_arguments(parser):
+    """
+    Adds the arguments for how DBs are compared and how changes are reported to a parser.
+    """
+    parser.add_argument(
+        "--show-added",
+        action="store_true",
+        help="Also report DBs, records, fields, infos and aliases that were added in the new release.",
+    )
+    parser.add_argument(
+        "--filter",
+        type=str,
+        default=None,
+        help="Only compare matching DBs, records and fields, e.g. 'type=ai,ao;field=DTYP,INP;path=EPICS/support/*'. "
+        "See README.md for the syntax.",
+    )
+    parser.add_argument(
+        "--raw-values",
+        action="store_true",
+        help="Compare field values exactly as written, rather than treating equivalent values (e.g. '1' and '1.0', "
+        "or PINI '1' and 'YES') as equal.",
+    )
+    parser.add_argument(
+        "--text-diff",
+        action="store_true",
+        help="Show a line diff of DBs whose API is unchanged but whose contents differ by more than whitespace, "
+        "comments or macros.",
+    )
+    parser.add_argument(
+        "--max-text-diff-size",
+        type=int,
+        default=DEFAULT_MAX_TEXT_DIFF_SIZE,
+        help="Size in characters above which line diffs are not shown.",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=sorted(PARSERS),
+        default=DEFAULT_PARSER,
+        help="Parser engine to use. Both give the same results; 'standard' is the original, slower, implementation.",
+    )
+    parser.add_argument(
+        "--summary",
+        type=str,
+        default=None,
+        help="File to write a summary of the number of changes in each IOC or support module to.",
+    )
+    parser.add_argument(
+        "--details",
+        type=str,
+        default=None,
+        help="File to write the details of each change to, instead of standard output.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=DETAILS_FORMATS,
+        default="text",
+        help="Format to write the details of each change in. 'json' writes one JSON object per changed DB per line.",
+    )
+    parser.add_argument(
+        "--fail-on",
+        nargs="+",
+        choices=sorted(FAIL_ON_KINDS),
+        default=None,
+        help="Kinds of change to fail on. The comparison stops as soon as more than --max-changes of them are found, "
+        "and exits with code {}. broken-links turns on --links, and can only be used when comparing releases.".format(
+            EXIT_OVER_BUDGET
+        ),
+    )
+    parser.add_argument(
+        "--max-changes",
+        type=int,
+        default=0,
+        help="Number of changes of the kinds given by --fail-on which are allowed.",
+    )
+
+
+def fails_on_links(args):
+    """
+    Returns:
+        whether any of the kinds of change given by --fail-on are only found when links are checked
+    """
+    return any(kind in LINK_FAIL_ON_KINDS for kind in args.fail_on or [])
+
+
+def reject_link_fail_on(parser, args):
+    """
+    Exits with an error if --fail-on was given a kind of change which is only found when links are checked, for
+    commands which can not check links.
+    """
+    if fails_on_links(args):
+        parser.error("--fail-on broken-links can only be used when comparing releases")
+
+
+def record_filter(parser, args):
+    """
+    Creates the record filter given by the arguments, exiting with a usage error if it is not valid.
+    """
+    try:
+        return RecordFilter.from_expression(args.filter) if args.filter is not None else None
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def write_changes(args, roots, changes, progress=None):
+    """
+    Writes the details of each change, and the summary if requested, as given by the arguments.
+    Args:
+        args: the parsed arguments (see add_comparison_arguments)
+        roots: the directories whose subdirectories are summarised separately (see ChangeSummary)
+        changes: iterable of DbChanges
+        progress: ComparisonProgress of the comparison finding the changes, to report on standard error while they are
+            written, or None to not report progress
+    Exits with EXIT_OVER_BUDGET if --fail-on is given and too many changes of those kinds were found.
+    """
+    budget = None
+    if args.fail_on is not None:
+        budget = ChangeBudget([FAIL_ON_KINDS[kind] for kind in args.fail_on], args.max_changes)
+        changes = budget.limit(changes)
+
+    summary = ChangeSummary(roots)
+    reporter = ProgressReporter(progress) if progress is not None else contextlib.nullcontext()
+    with reporter:
+        if args.details is not None:
+            with open(args.details, "w") as details_stream:
+                summary.consume(changes, details_stream, args.format)
+        else:
+            summary.consume(changes, sys.stdout, args.format)
+
+    if args.summary is not None:
+        with open(args.summary, "w") as summary_stream:
+            summary.write_summary(summary_stream)
+
+    if budget is not None and budget.exceeded:
+        sys.stderr.write(
+            "Found more than {} changes of kinds: {}\n".format(
+                args.max_changes, ", ".join(args.fail_on)
+            )
+        )
+        sys.exit(EXIT_OVER_BUDGET)
+
+
+def show_progress(args):
+    """
+    Args:
+        args: the parsed arguments, including --progress and --details
+    Returns:
+        whether to report the progress of a comparison on standard error. By default, progress is only shown if standard
+        error is a terminal, and is not mixed in with changes being written to the same terminal.
+    """
+    if args.progress == "auto":
+        return sys.stderr.isatty() and (args.details is not None or not sys.stdout.isatty())
+    return args.progress == "always"
+
+
+def compare_releases(argv):
+    """
+    Compares the DBs in two releases. This is the default command.
+    """
     parser = argparse.ArgumentParser(
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         description="""Checks for changes in DB files between releases""",
@@ -20,27 +272,440 @@ def main():
     parser.add_argument(
         "--new", required=True, type=str, help="Name of the new release to compare."
     )
+    add_release_arguments(parser)
+    add_comparison_arguments(parser)
+    parser.add_argument(
+        "--schema",
+        action="store_true",
+        help="Read the record types from the DBD files of the new release, and report removed fields which had their "
+        "default value as non-breaking.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        help="Number of processes to parse and diff DBs in, while other threads walk the releases and read DBs. If 0, "
+        "DBs are walked, read and diffed one at a time.",
+    )
+    parser.add_argument(
+        "--readers",
+        type=int,
+        default=DEFAULT_PIPELINE_READERS,
+        help="Number of threads to read DBs in when --jobs is given.",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Write how much work each stage did to standard error when --jobs is given.",
+    )
+    parser.add_argument(
+        "--links",
+        action="store_true",
+        help="Also report records in the new release whose INP, OUT, FLNK, DOL (etc.) links point at records which "
+        "were removed. Every DB in the new release is parsed to find them. Turned on by --fail-on broken-links. "
+        "Can not be used with --jobs.",
+    )
+    parser.add_argument(
+        "--progress",
+        choices=["auto", "always", "never"],
+        default="auto",
+        help="Whether to report the progress of the comparison (DBs compared, millions of characters read, DBs parsed "
+        "per second and an estimate of the time left) on standard error. If auto, progress is reported if standard "
+        "error is a terminal and changes are not being written to it. Progress is not reported when --jobs is given.",
+    )
+
+    args = parser.parse_args(argv)
+    args.links = args.links or fails_on_links(args)
+    if args.links and args.jobs > 0:
+        parser.error("--links and --fail-on broken-links can not be used with --jobs")
+
+    matcher = path_matcher(parser, args)
+    db_filter = record_filter(parser, args)
+    catalogue = release_catalogue(args, args.new, args.old)
+    progress = ComparisonProgress() if args.jobs == 0 and show_progress(args) else None
+
+    db_iterator = DbChangesIterator(
+        catalogue.release_path(args.old),
+        catalogue.release_path(args.new),
+        report_additions=args.show_added,
+        path_matcher=matcher,
+        record_filter=db_filter,
+        normalise_values=not args.raw_values,
+        use_schema=args.schema,
+        schema_cache_dir=args.cache_dir,
+        text_diff=args.text_diff,
+        max_text_diff_size=args.max_text_diff_size,
+        parser=args.parser,
+        check_links=args.links,
+        likely_changes_first=args.fail_on is not None,
+        progress=progress,
+    )
+
+    if args.jobs > 0:
+        pipeline = ChangesPipeline(db_iterator, workers=args.jobs, readers=args.readers)
+        write_changes(args, matcher.roots, pipeline.change_descriptions())
+        if args.stats:
+            sys.stderr.write("{}\n".format(pipeline.stats))
+    else:
+        write_changes(args, matcher.roots, db_iterator.change_descriptions(), progress)
+
+
+def compare_git_revisions(argv):
+    """
+    Compares the DBs in two revisions of a git repository.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py git",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="""Checks for changes in DB files between two revisions of a local git repository, e.g. a
+        support module. Only DBs which git reports as changed are read.""",
+    )
+
+    parser.add_argument("repository", type=str, help="Path to the git repository.")
+    parser.add_argument("old", type=str, help="Old revision to compare against, e.g. a tag.")
+    parser.add_argument("new", type=str, help="New revision to compare.")
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=None,
+        help="JSON file of rules for which directories and files to compare. The whole repository is searched by "
+        "default. See README.md for the format.",
+    )
+    add_comparison_arguments(parser)
+
+    args = parser.parse_args(argv)
+    reject_link_fail_on(parser, args)
+
+    matcher = path_matcher(parser, args, whole_tree=True)
+    db_filter = record_filter(parser, args)
+
+    db_iterator = GitDbChangesIterator(
+        GitRepository(args.repository),
+        args.old,
+        args.new,
+        report_additions=args.show_added,
+        path_matcher=matcher,
+        record_filter=db_filter,
+        normalise_values=not args.raw_values,
+        text_diff=args.text_diff,
+        max_text_diff_size=args.max_text_diff_size,
+        parser=args.parser,
+    )
+
+    try:
+        write_changes(args, matcher.roots, db_iterator.change_descriptions())
+    except ValueError as e:
+        print(str(e))
+        sys.exit(1)
+
+
+def compare_paths(argv):
+    """
+    Compares two DB files, or two directories of DBs, which need not be releases.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py compare",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="""Checks for changes between two DB files, or between the DBs in two directories (e.g. two
+        build outputs), without needing them to be releases. With --stdin, compares each pair of paths read from
+        standard input, one tab-separated pair per line, in a single process.""",
+    )
+
+    parser.add_argument(
+        "old", nargs="?", type=str, help="Old DB file or directory to compare against."
+    )
+    parser.add_argument("new", nargs="?", type=str, help="New DB file or directory to compare.")
+    parser.add_argument(
+        "--stdin",
+        action="store_true",
+        help="Read the pairs of paths to compare from standard input instead of the arguments.",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=None,
+        help="JSON file of rules for which directories and files to compare in directories. Every DB below them is "
+        "compared by default. See README.md for the format.",
+    )
+    add_comparison_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if args.stdin == (args.old is not None):
+        parser.error("Give either an old and a new path, or --stdin")
+    if args.old is not None and args.new is None:
+        parser.error("A new path to compare is needed")
+    reject_link_fail_on(parser, args)
+
+    matcher = path_matcher(parser, args, whole_tree=True)
+
+    comparer = PathComparer(
+        path_matcher=matcher,
+        report_additions=args.show_added,
+        record_filter=record_filter(parser, args),
+        normalise_values=not args.raw_values,
+        text_diff=args.text_diff,
+        max_text_diff_size=args.max_text_diff_size,
+        parser=args.parser,
+    )
+
+    if args.stdin:
+        errors = []
+        write_changes(args, matcher.roots, comparer.compare_pairs(sys.stdin, errors))
+        for line_number, error in errors:
+            sys.stderr.write("Line {}: {}\n".format(line_number, error))
+        if errors:
+            sys.exit(1)
+    else:
+        try:
+            write_changes(args, matcher.roots, comparer.change_descriptions(args.old, args.new))
+        except (IOError, UnicodeDecodeError, ValueError) as e:
+            print(str(e))
+            sys.exit(1)
+
+
+def mirror_releases(argv):
+    """
+    Mirrors the interesting files of releases into a local store.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py mirror",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="""Copies the DB and DBD files of releases into a local store, so that they can be compared
+        without reading from the releases share. Compare them afterwards with --releases-dir STORE/releases.""",
+    )
 
-    args = parser.parse_args()
+    parser.add_argument("releases", nargs="+", type=str, help="Names of the releases to mirror.")
+    parser.add_argument(
+        "--store", required=True, type=str, help="Directory of the local store to mirror into."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_MIRROR_WORKERS,
+        help="Number of files to copy in parallel.",
+    )
+    add_release_arguments(parser)
 
-    # Filter to only include releases where we built an EPICS version (i.e. not client-only hotfixes)
-    valid_releases = [
-        p
-        for p in os.listdir(RELEASES_DIR)
-        if os.path.exists(os.path.join(RELEASES_DIR, p, "EPICS"))
-    ]
+    args = parser.parse_args(argv)
 
-    if any(arg not in valid_releases for arg in (args.new, args.old)):
-        print("Invalid release given. Valid releases are: {}".format(", ".join(valid_releases)))
+    matcher = path_matcher(parser, args)
+    catalogue = release_catalogue(args, *args.releases)
+
+    mirror = ReleaseMirror(
+        args.store,
+        matcher.with_include_files(matcher.include_files + DBD_FILE_TYPES),
+        workers=args.jobs,
+    )
+    for release in args.releases:
+        result = mirror.mirror(catalogue.release_path(release), release)
+        print("Mirrored {}: {}".format(release, result))
+
+
+def serve_comparisons(argv):
+    """
+    Runs a server which keeps releases in memory and answers comparison requests over HTTP.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py serve",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="""Answers comparison requests over HTTP, keeping recently compared releases and their parsed
+        DBs in memory so that repeated comparisons are fast. See README.md for the API.""",
+    )
+
+    parser.add_argument(
+        "--host", type=str, default=DEFAULT_SERVER_HOST, help="Address to listen on."
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVER_PORT, help="Port to listen on.")
+    parser.add_argument(
+        "--max-releases",
+        type=int,
+        default=DEFAULT_MAX_RELEASES,
+        help="Number of releases to keep in memory.",
+    )
+    parser.add_argument(
+        "--max-text-diff-size",
+        type=int,
+        default=DEFAULT_MAX_TEXT_DIFF_SIZE,
+        help="Size in characters above which line diffs are not shown.",
+    )
+    add_release_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    service = ComparisonService(
+        release_catalogue(args),
+        path_matcher(parser, args),
+        max_releases=args.max_releases,
+        max_text_diff_size=args.max_text_diff_size,
+        schema_cache_dir=args.cache_dir,
+    )
+    server = comparison_server(service, args.host, args.port)
+    print("Serving comparisons on http://{}:{}/".format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def bisect_releases(argv):
+    """
+    Finds the first of a list of releases in which a record, or one of its fields, was removed or changed.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py bisect",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="""Finds the first release in which a record (or one of its fields) was removed or changed, by a
+        binary search over the given releases. Only the DBs defining the record are parsed in each release looked at,
+        found from an index of record names which is cached in --cache-dir.""",
+    )
+
+    parser.add_argument("record", type=str, help="Name of the record, as written in the DBs.")
+    parser.add_argument(
+        "releases",
+        nargs="+",
+        type=str,
+        help="Names of the releases to search, oldest first. The record must be in the first of them.",
+    )
+    parser.add_argument(
+        "--field",
+        type=str,
+        default=None,
+        help="Only look for changes to this field of the record, rather than to any of its fields.",
+    )
+    parser.add_argument(
+        "--raw-values",
+        action="store_true",
+        help="Compare field values exactly as written, rather than treating equivalent values as equal.",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=sorted(PARSERS),
+        default=DEFAULT_PARSER,
+        help="Parser engine to use.",
+    )
+    add_release_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    bisector = ReleaseBisector(
+        release_catalogue(args, *args.releases),
+        path_matcher(parser, args),
+        cache_dir=args.cache_dir,
+        normalise_values=not args.raw_values,
+        parser=args.parser,
+    )
+    try:
+        result = bisector.bisect(args.releases, args.record, args.field)
+    except ValueError as e:
+        print(str(e))
         sys.exit(1)
 
-    db_iterator = DbChangesIterator(
-        os.path.join(RELEASES_DIR, args.old), os.path.join(RELEASES_DIR, args.new)
+    if result is None:
+        print("{} is unchanged in all {} releases".format(args.record, len(args.releases)))
+    else:
+        print(result)
+        print(
+            "Looked at {} of {} releases".format(len(result.releases_checked), len(args.releases))
+        )
+
+
+def store_releases(argv):
+    """
+    Loads releases into a SQLite store, queries the store, or compares releases in it.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py store",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="""Keeps the parsed DBs of releases in a SQLite database, so that they can be queried, or
+        compared, without parsing them again. See README.md for the tables.""",
+    )
+    parser.add_argument("store", type=str, help="Path to the SQLite database.")
+    actions = parser.add_subparsers(dest="action", required=True)
+
+    load_parser = actions.add_parser(
+        "load",
+        help="Load releases into the store, replacing any already loaded with the same name.",
+    )
+    load_parser.add_argument("releases", nargs="+", type=str, help="Names of the releases to load.")
+    load_parser.add_argument(
+        "--parser", choices=sorted(PARSERS), default=DEFAULT_PARSER, help="Parser engine to use."
+    )
+    add_release_arguments(load_parser)
+
+    query_parser = actions.add_parser("query", help="Run an SQL query against the store.")
+    query_parser.add_argument("sql", type=str, help="The query to run.")
+
+    compare_parser = actions.add_parser("compare", help="Compare two loaded releases.")
+    compare_parser.add_argument("old", type=str, help="Name of the old release to compare against.")
+    compare_parser.add_argument("new", type=str, help="Name of the new release to compare.")
+    compare_parser.add_argument(
+        "--show-added",
+        action="store_true",
+        help="Also report DBs, records, fields, infos and aliases that were added in the new release.",
+    )
+    compare_parser.add_argument(
+        "--raw-values",
+        action="store_true",
+        help="Compare field values exactly as written, rather than treating equivalent values as equal.",
     )
+    compare_parser.add_argument(
+        "--format",
+        choices=DETAILS_FORMATS,
+        default="text",
+        help="Format to write the details of each change in.",
+    )
+
+    args = parser.parse_args(argv)
 
-    for change in db_iterator.change_descriptions():
-        print(change)
-        print("\n-----\n")
+    with ReleaseStore(args.store) as store:
+        if args.action == "load":
+            matcher = path_matcher(parser, args)
+            catalogue = release_catalogue(args, *args.releases)
+            for release in args.releases:
+                dbs, parsed = store.load_release(
+                    release, catalogue.release_path(release), matcher, args.parser
+                )
+                print("Loaded {}: {} DBs, {} not already stored".format(release, dbs, parsed))
+        elif args.action == "query":
+            try:
+                columns, rows = store.query(args.sql)
+            except sqlite3.Error as e:
+                print(str(e))
+                sys.exit(1)
+            print("\t".join(columns))
+            for row in rows:
+                print("\t".join(str(value) for value in row))
+        else:
+            try:
+                changes = store.change_descriptions(
+                    args.old, args.new, args.show_added, not args.raw_values
+                )
+            except ValueError as e:
+                print(str(e))
+                sys.exit(1)
+            ChangeSummary([]).consume(changes, sys.stdout, args.format)
+
+
+"""
+Commands other than the default comparison, selected by the first argument.
+"""
+COMMANDS = {
+    "bisect": bisect_releases,
+    "compare": compare_paths,
+    "git": compare_git_revisions,
+    "mirror": mirror_releases,
+    "serve": serve_comparisons,
+    "store": store_releases,
+}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+    else:
+        compare_releases(sys.argv[1:])
 
 
 if __name__ == "__main__":
@@ -1,3 +1,5 @@
 import os
 
 RELEASES_DIR = os.path.join(r"\\isis", "inst$", "Kits$", "CompGroup", "ICP", "Releases")
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".dbchanges_cache")
@@ -1,19 +1,355 @@
+import difflib
+import hashlib
 import os
+from collections import OrderedDict
 
-from src.db_parser.common import DbSyntaxError
-from src.db_parser.lexer import Lexer
+from src.db_parser.bulk_lexer import BulkLexer, significant_tokens_equal
+from src.db_parser.common import UNKNOWN_OFFSET, DbSyntaxError, SourcePositions
+from src.db_parser.fast_parser import FastParser
 from src.db_parser.parser import Parser
+from src.field_values import canonical_value
+from src.release_sources import read_text_file, release_source
+
+
+def _restore(cls, text, attributes):
+    """
+    Recreates a str subclass with attributes (e.g. a Difference) when it is unpickled, e.g. after being sent back from
+    a worker process.
+    """
+    restored = str.__new__(cls, text)
+    restored.__dict__.update(attributes)
+    return restored
+
+
+class DifferenceKinds(object):
+    # API removals and changes
+    RECORD_REMOVED = "RECORD_REMOVED"
+    FIELD_REMOVED = "FIELD_REMOVED"
+    FIELD_CHANGED = "FIELD_CHANGED"
+
+    # Fields which were removed but had their default value, so removing them changes nothing
+    FIELD_REMOVED_DEFAULT = "FIELD_REMOVED_DEFAULT"
+
+    # API additions, only reported when additions are requested
+    RECORD_ADDED = "RECORD_ADDED"
+    FIELD_ADDED = "FIELD_ADDED"
+    INFO_ADDED = "INFO_ADDED"
+    ALIAS_ADDED = "ALIAS_ADDED"
+
+    # Links from records in the new release to records which were removed, only reported when links are checked
+    LINK_BROKEN = "LINK_BROKEN"
+
+
+class Difference(str):
+    """
+    A single difference between two DBs. Behaves exactly like the human-readable description of the difference, but
+    also records what kind of difference it is so that callers do not need to parse the text.
+    Args:
+        kind: the kind of difference. Should be one of DifferenceKinds
+        message: human-readable description of the difference
+        record: the name of the record the difference applies to
+        field: the name of the field, info or alias the difference applies to (if applicable)
+        old_line: the line in the old DB where the record or field is, if known. Added to the description.
+        new_line: the line in the new DB where the record or field is, if known. Added to the description.
+    """
+
+    def __new__(cls, kind, message, record=None, field=None, old_line=None, new_line=None):
+        locations = []
+        if old_line is not None:
+            locations.append("old line {}".format(old_line))
+        if new_line is not None:
+            locations.append("new line {}".format(new_line))
+        if locations:
+            message = "{} ({})".format(message, ", ".join(locations))
+
+        difference = str.__new__(cls, message)
+        difference.kind = kind
+        difference.record = record
+        difference.field = field
+        difference.old_line = old_line
+        difference.new_line = new_line
+        return difference
+
+    def __reduce__(self):
+        return _restore, (self.__class__, str(self), self.__dict__)
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "description": str(self),
+            "record": self.record,
+            "field": self.field,
+            "old_line": self.old_line,
+            "new_line": self.new_line,
+        }
+
+
+class ChangeKinds(object):
+    MODIFIED = "MODIFIED"  # The API of the DB changed
+    TEXT_CHANGED = "TEXT_CHANGED"  # The API of the DB is unchanged, but its contents changed
+    PARSE_ERROR = "PARSE_ERROR"
+    DELETED = "DELETED"
+    ADDED = "ADDED"
+    BROKEN_LINKS = "BROKEN_LINKS"  # The DB links to records which were removed from other DBs
+
+
+class DbChange(str):
+    """
+    A change to a single DB file. Behaves exactly like the human-readable description of the change, but also records
+    what kind of change it is, which DB it applies to and the individual differences found.
+    Args:
+        kind: the kind of change. Should be one of ChangeKinds
+        db_path: the path of the DB, relative to the releases being compared
+        description: human-readable description of the change
+        differences: list of Differences in the DB's API (if applicable)
+    """
+
+    def __new__(cls, kind, db_path, description, differences=()):
+        change = str.__new__(cls, description)
+        change.kind = kind
+        change.db_path = db_path
+        change.differences = list(differences)
+        return change
+
+    def __reduce__(self):
+        return _restore, (self.__class__, str(self), self.__dict__)
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "db_path": self.db_path,
+            "description": str(self),
+            "differences": [difference.to_dict() for difference in self.differences],
+        }
+
+
+class _DbLocations(object):
+    """
+    Finds the lines of the records and fields of a parsed DB. Nothing is worked out until a line is asked for, so
+    this costs nothing for DBs without differences.
+    Args:
+        db: the parsed DB. Lines are only known if it is a ParsedDb.
+        positions: SourcePositions of the DB's contents, or None if they are not known
+    """
+
+    def __init__(self, db=None, positions=None):
+        self.offsets = getattr(db, "offsets", None) if positions is not None else None
+        self.db = db
+        self.positions = positions
+        self._record_starts = None
+
+    def _record_start(self, record):
+        """
+        Returns:
+            the index in the offsets array of the record's offset, which is followed by the offsets of its fields
+        """
+        if self._record_starts is None:
+            self._record_starts = {}
+            start = 0
+            for rec in self.db:
+                self._record_starts[id(rec)] = start
+                start += 1 + len(rec["fields"])
+        return self._record_starts.get(id(record))
+
+    def _line(self, index):
+        if index is None or index >= len(self.offsets) or self.offsets[index] == UNKNOWN_OFFSET:
+            return None
+        return self.positions.line_and_column(self.offsets[index])[0]
+
+    def record_line(self, record):
+        """
+        Returns:
+            the line that the record starts on, or None if it is not known
+        """
+        if self.offsets is None:
+            return None
+        return self._line(self._record_start(record))
+
+    def field_line(self, record, field_name):
+        """
+        Returns:
+            the line of the first field in the record with the given name, or None if it is not known
+        """
+        for index, (name, _) in enumerate(record["fields"]):
+            if name == field_name:
+                return self.field_line_at(record, index)
+        return None
+
+    def field_line_at(self, record, index):
+        """
+        Returns:
+            the line of the field at the given index in the record, or None if it is not known
+        """
+        if self.offsets is None:
+            return None
+        start = self._record_start(record)
+        return self._line(start + 1 + index) if start is not None else None
+
+
+def _index_by_name(items, key):
+    """
+    Builds a name index over a list of items, keeping the first item for each name (matching the first-match lookup
+    semantics of a linear search).
+    """
+    index = {}
+    for item in items:
+        index.setdefault(key(item), item)
+    return index
+
+
+"""
+Default size in characters above which line diffs are not computed.
+"""
+DEFAULT_MAX_TEXT_DIFF_SIZE = 256 * 1024
+
+"""
+The parser engines which can be used to parse DBs. Both produce the same results, but "fast" is much faster.
+"""
+PARSERS = {"fast": FastParser, "standard": Parser}
+DEFAULT_PARSER = "fast"
+
+"""
+Default number of distinct DB contents whose parsed form (and distinct old/new pairs whose differences) are kept.
+"""
+DEFAULT_CONTENT_CACHE_SIZE = 4096
+
+
+def content_digest(contents):
+    """
+    Returns:
+        a digest identifying the contents of a DB file, so that identical files at different paths can share work.
+    """
+    return hashlib.sha1(contents.encode("utf-8", "surrogateescape")).digest()
+
+
+class LruCache(object):
+    """
+    A dict-like cache which discards the least recently used entry once it holds more than max_size entries.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def keys(self):
+        """
+        Returns:
+            the keys in the cache, least recently used first
+        """
+        return self._entries.keys()
+
+    def get(self, key, default=None):
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            return default
+        return self._entries[key]
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        return self._entries.pop(key, default)
 
 
 class DbDiffer(object):
-    def __init__(self, old_path, new_path):
+    def __init__(
+        self,
+        old_path,
+        new_path,
+        report_additions=False,
+        record_filter=None,
+        normalise_values=True,
+        schema=None,
+        text_diff=False,
+        max_text_diff_size=DEFAULT_MAX_TEXT_DIFF_SIZE,
+        content_cache_size=DEFAULT_CONTENT_CACHE_SIZE,
+        parser=DEFAULT_PARSER,
+        parsed_db_cache=None,
+        differences_cache=None,
+        old_source=None,
+        new_source=None,
+    ):
+        """
+        Identical DB contents often appear at several paths (e.g. copies of a support module's DBs), so parsed DBs are
+        cached by a digest of their contents, and the differences between each distinct pair of old and new contents
+        are cached too. Each distinct file is therefore only parsed, and each distinct pair only diffed, once.
+
+        Args:
+            old_path: The path to the old release to be compared
+            new_path: The path to the new release to be compared
+            report_additions: Whether to also report records, fields, infos and aliases that only exist in the new DB
+            record_filter: Optional RecordFilter restricting which records and fields are parsed and compared
+            normalise_values: Whether to compare field values in their canonical form (see canonical_value) rather
+                than as they are written, so that e.g. "1" and "1.0" are not reported as a change
+            schema: Optional RecordTypeSchema of the new release. If given, removed fields which had their default
+                value are reported as non-breaking.
+            text_diff: Whether to show a line diff of DBs whose API is unchanged but whose significant tokens differ
+            max_text_diff_size: Size in characters above which a line diff is not computed, as computing it is quadratic
+            content_cache_size: Number of distinct parsed DBs, and of distinct pairs of DBs' differences, to cache
+            parser: The name of the parser engine to use. Should be one of PARSERS
+            parsed_db_cache: Optional LruCache of parsed DBs to use instead of a new one, so that it can be shared
+                between differs with the same record filter and parser
+            differences_cache: Optional LruCache of differences to use instead of a new one, so that it can be shared
+                between differs with the same options and schema
+            old_source: Optional source to read DBs in the old release from (see release_source). Defaults to the
+                source for old_path.
+            new_source: Optional source to read DBs in the new release from (see release_source). Defaults to the
+                source for new_path.
+        """
         self.old_path = old_path
         self.new_path = new_path
+        self.report_additions = report_additions
+        self.record_filter = record_filter
+        self.normalise_values = normalise_values
+        self.schema = schema
+        self.text_diff = text_diff
+        self.max_text_diff_size = max_text_diff_size
+        self.parser = parser
+        self.parser_class = PARSERS[parser]
+        self._parsed_dbs = (
+            parsed_db_cache if parsed_db_cache is not None else LruCache(content_cache_size)
+        )
+        self._db_differences = (
+            differences_cache if differences_cache is not None else LruCache(content_cache_size)
+        )
+        self.old_source = old_source if old_source is not None else release_source(old_path)
+        self.new_source = new_source if new_source is not None else release_source(new_path)
+        self.dbs_parsed = 0  # Number of DBs actually parsed, rather than taken from the cache
+
+    def values_equal(self, field_name, old_value, new_value, record_type=None):
+        """
+        Returns whether two values of the named field, in a record of the given type, are equivalent.
+        """
+        if old_value == new_value:
+            return True
+        if not self.normalise_values:
+            return False
+        return canonical_value(field_name, old_value, record_type) == canonical_value(
+            field_name, new_value, record_type
+        )
+
+    @staticmethod
+    def parse_db_from_filepath(filepath, record_filter=None, parser_class=FastParser, source=None):
+        """
+        Parses the DB at a path, which is relative to the source if one is given (see release_source).
+        """
+        if source is not None:
+            return DbDiffer.parse_db(source.read(filepath), record_filter, parser_class)
+        return DbDiffer.parse_db(read_text_file(filepath), record_filter, parser_class)
 
     @staticmethod
-    def parse_db_from_filepath(filepath):
-        with open(filepath) as f:
-            return Parser(Lexer(f.read())).db()
+    def parse_db(contents, record_filter=None, parser_class=FastParser):
+        return parser_class(BulkLexer(contents), record_filter=record_filter).db()
 
     def diff_dbs_by_path(self, db_path):
         """
@@ -21,76 +357,307 @@ class DbDiffer(object):
         Args:
             db_path: The relative path from self.old_path or self.new_path to the DB file to diff.
         Returns:
-            String describing the API differences, or None if there were no API differences.
+            DbChange describing the API differences, or None if there were no API differences.
         """
-        old_path = os.path.join(self.old_path, db_path)
-        new_path = os.path.join(self.new_path, db_path)
+        old_contents = self.old_source.read(db_path)
+        new_contents = self.new_source.read(db_path)
+        return self.diff_db_contents(db_path, old_contents, new_contents)
 
-        try:
-            old_db = DbDiffer.parse_db_from_filepath(old_path)
-        except DbSyntaxError as e:
-            return "Unable to parse db at {} because: {} {}".format(
-                old_path, e.__class__.__name__, e
-            )
+    def diff_db_contents(self, db_path, old_contents, new_contents, old_path=None, new_path=None):
+        """
+        Finds the API differences between two DB files whose contents have already been read.
+        Args:
+            db_path: The relative path from self.old_path or self.new_path to the DB file.
+            old_contents: The contents of the DB file in the old release
+            new_contents: The contents of the DB file in the new release
+            old_path: The path to describe the old DB file by. Defaults to db_path in self.old_path.
+            new_path: The path to describe the new DB file by. Defaults to db_path in self.new_path.
+        Returns:
+            DbChange describing the API differences, or None if there were no API differences.
+        """
+        if old_path is None:
+            old_path = os.path.join(self.old_path, db_path)
+        if new_path is None:
+            new_path = os.path.join(self.new_path, db_path)
+        old_digest = content_digest(old_contents)
+        new_digest = content_digest(new_contents)
 
-        try:
-            new_db = DbDiffer.parse_db_from_filepath(new_path)
-        except DbSyntaxError as e:
-            return "Unable to parse db at {} because: {} {}".format(
-                new_path, e.__class__.__name__, e
-            )
+        if (old_digest, new_digest) in self._db_differences:
+            db_differences = self._db_differences.get((old_digest, new_digest))
+        else:
+            try:
+                tokens_equal = significant_tokens_equal(old_contents, new_contents)
+            except DbSyntaxError:
+                tokens_equal = False  # Reported when the DBs are parsed below.
+
+            if tokens_equal:
+                db_differences = None
+            else:
+                try:
+                    old_db = self._parse_cached(old_digest, old_contents)
+                except DbSyntaxError as e:
+                    return DbChange(
+                        ChangeKinds.PARSE_ERROR,
+                        db_path,
+                        "Unable to parse db at {} because: {} {}".format(
+                            old_path, e.__class__.__name__, e
+                        ),
+                    )
 
-        db_differences = self.diff_dbs(old_db, new_db)
+                try:
+                    new_db = self._parse_cached(new_digest, new_contents)
+                except DbSyntaxError as e:
+                    return DbChange(
+                        ChangeKinds.PARSE_ERROR,
+                        db_path,
+                        "Unable to parse db at {} because: {} {}".format(
+                            new_path, e.__class__.__name__, e
+                        ),
+                    )
 
-        # If we can't generate a sensible diff from the parsed file, use difflib. May be whitespace changes or similar.
-        if len(db_differences) > 0:
-            return "DBs at '{}' and '{}' are different.\n  - {}".format(
-                old_path, new_path, "\n  - ".join(db_differences)
+                db_differences = self.diff_dbs(
+                    old_db, new_db, SourcePositions(old_contents), SourcePositions(new_contents)
+                )
+            self._db_differences.put((old_digest, new_digest), db_differences)
+
+        if db_differences is None:
+            # Only whitespace, comments or macros changed, so the API can't have changed.
+            return None
+        elif len(db_differences) > 0:
+            return DbChange(
+                ChangeKinds.MODIFIED,
+                db_path,
+                "DBs at '{}' and '{}' are different.\n  - {}".format(
+                    old_path, new_path, "\n  - ".join(db_differences)
+                ),
+                db_differences,
+            )
+        elif self.text_diff:
+            # If we can't generate a sensible diff from the parsed file, use difflib.
+            return DbChange(
+                ChangeKinds.TEXT_CHANGED,
+                db_path,
+                self.line_diff(old_path, old_contents, new_path, new_contents),
             )
         else:
             return None  # API unchanged
 
-    def diff_dbs(self, old_db, new_db):
+    def parse_contents(self, contents):
+        """
+        Parses DB contents with the differ's record filter and parser, sharing the cache of parsed DBs used by diffing.
+        Raises:
+            DbSyntaxError: if the contents can not be parsed
+        """
+        return self._parse_cached(content_digest(contents), contents)
+
+    def _parse_cached(self, digest, contents):
+        """
+        Parses DB contents, or returns the result of parsing identical contents earlier. Parse errors are cached too.
+        """
+        result = self._parsed_dbs.get(digest)
+        if result is None:
+            self.dbs_parsed += 1
+            try:
+                result = DbDiffer.parse_db(contents, self.record_filter, self.parser_class)
+            except DbSyntaxError as e:
+                result = e
+            self._parsed_dbs.put(digest, result)
+
+        if isinstance(result, DbSyntaxError):
+            raise result
+        return result
+
+    def line_diff(self, old_path, old_contents, new_path, new_contents):
+        """
+        Finds the line differences between two DB files. This should only be called for files whose significant tokens
+        are known to differ (see significant_tokens_equal), so that cosmetic changes never reach difflib.
+        Args:
+            old_path: the path to the old DB file
+            old_contents: the contents of the old DB file
+            new_path: the path to the new DB file
+            new_contents: the contents of the new DB file
+        Returns:
+            String describing the line differences.
+        """
+        if max(len(old_contents), len(new_contents)) > self.max_text_diff_size:
+            return "DBs at '{}' and '{}' have the same API but differ textually (too large to diff).".format(
+                old_path, new_path
+            )
+
+        diff = difflib.unified_diff(
+            old_contents.splitlines(),
+            new_contents.splitlines(),
+            fromfile=old_path,
+            tofile=new_path,
+            lineterm="",
+        )
+        return "DBs at '{}' and '{}' have the same API but differ textually.\n    {}".format(
+            old_path, new_path, "\n    ".join(diff)
+        )
+
+    def diff_dbs(self, old_db, new_db, old_positions=None, new_positions=None):
         """
         Finds differences between two DBs
+        Args:
+            old_db: the parsed old DB
+            new_db: the parsed new DB
+            old_positions: SourcePositions of the old DB's contents, to give the lines of differences. Optional.
+            new_positions: SourcePositions of the new DB's contents, to give the lines of differences. Optional.
         Returns:
-            A list of strings describing the differences.
+            A list of Differences (which are strings describing the differences).
         """
+        old_locations = _DbLocations(old_db, old_positions)
+        new_locations = _DbLocations(new_db, new_positions)
+        old_records = _index_by_name(old_db, lambda rec: rec["name"])
+        new_records = _index_by_name(new_db, lambda rec: rec["name"])
+
         differences = []
         for old_rec in old_db:
-            for r in new_db:
-                if (
-                    old_rec["name"] == r["name"]
-                ):  # Find a record in the new db with the same name as the old record.
-                    differences.extend(self.diff_records(old_rec, r))
-                    break
+            new_rec = new_records.get(old_rec["name"])
+            if new_rec is not None:
+                differences.extend(
+                    self.diff_records(old_rec, new_rec, old_locations, new_locations)
+                )
             else:  # Record with the same name was not found
-                differences.append("Record removed: {}".format(old_rec["name"]))
+                differences.append(
+                    Difference(
+                        DifferenceKinds.RECORD_REMOVED,
+                        "Record removed: {}".format(old_rec["name"]),
+                        record=old_rec["name"],
+                        old_line=old_locations.record_line(old_rec),
+                    )
+                )
+
+        if self.report_additions:
+            # Iterate over the new records rather than taking a set difference so that output order is stable.
+            for name, new_rec in new_records.items():
+                if name not in old_records:
+                    differences.append(
+                        Difference(
+                            DifferenceKinds.RECORD_ADDED,
+                            "Record added: {}".format(name),
+                            record=name,
+                            new_line=new_locations.record_line(new_rec),
+                        )
+                    )
 
         return differences
 
-    def diff_records(self, old_record, new_record):
+    def diff_records(self, old_record, new_record, old_locations=None, new_locations=None):
         """
         Finds differences between two records
+        Args:
+            old_record: the old record
+            new_record: the new record
+            old_locations: _DbLocations of the old DB, to give the lines of differences. Optional.
+            new_locations: _DbLocations of the new DB, to give the lines of differences. Optional.
         Returns:
-            A list of strings describing the differences.
+            A list of Differences (which are strings describing the differences).
         """
+        old_locations = old_locations if old_locations is not None else _DbLocations()
+        new_locations = new_locations if new_locations is not None else _DbLocations()
+        record_name = old_record["name"]
+        new_fields = _index_by_name(new_record["fields"], lambda field: field[0])
+
         differences = []
-        for old_name, old_value in old_record["fields"]:
-            for new_name, new_value in new_record["fields"]:
-                if (
-                    new_name == old_name
-                ):  # Find a field in the new record with the same name as the old field.
-                    if new_value != old_value:
-                        differences.append(
+        for index, (old_name, old_value) in enumerate(old_record["fields"]):
+            # A field which appears more than once is compared at each of its lines, against the first in the new record
+            old_line = old_locations.field_line_at(old_record, index)
+            if old_name in new_fields:
+                new_value = new_fields[old_name][1]
+                if not self.values_equal(old_name, old_value, new_value, old_record["type"]):
+                    differences.append(
+                        Difference(
+                            DifferenceKinds.FIELD_CHANGED,
                             "Field '{}' in record '{}' changed from '{}' to '{}'".format(
-                                old_name, old_record["name"], old_value, new_value
-                            )
+                                old_name, record_name, old_value, new_value
+                            ),
+                            record=record_name,
+                            field=old_name,
+                            old_line=old_line,
+                            new_line=new_locations.field_line(new_record, old_name),
                         )
-                    break
+                    )
+            elif self.schema is not None and self.schema.is_default_value(
+                old_record["type"], old_name, old_value
+            ):
+                differences.append(
+                    Difference(
+                        DifferenceKinds.FIELD_REMOVED_DEFAULT,
+                        "Field '{}' removed from '{}', but its value '{}' was the default (non-breaking)".format(
+                            old_name, record_name, old_value
+                        ),
+                        record=record_name,
+                        field=old_name,
+                        old_line=old_line,
+                    )
+                )
             else:  # Field with the same name not found
                 differences.append(
-                    "Field '{}' removed from '{}'".format(old_name, old_record["name"])
+                    Difference(
+                        DifferenceKinds.FIELD_REMOVED,
+                        "Field '{}' removed from '{}'".format(old_name, record_name),
+                        record=record_name,
+                        field=old_name,
+                        old_line=old_line,
+                    )
                 )
 
+        if self.report_additions:
+            differences.extend(self._added_to_record(old_record, new_record, new_locations))
+
         return differences
+
+    @staticmethod
+    def _added_to_record(old_record, new_record, new_locations):
+        """
+        Finds fields, infos and aliases that are present in the new record but not in the old record.
+        Returns:
+            A list of Differences (which are strings describing the additions).
+        """
+        record_name = old_record["name"]
+        record_line = new_locations.record_line(new_record)
+        additions = []
+
+        old_fields = _index_by_name(old_record["fields"], lambda field: field[0])
+        new_fields = _index_by_name(new_record["fields"], lambda field: field[0])
+        for name, (_, value) in new_fields.items():
+            if name not in old_fields:
+                additions.append(
+                    Difference(
+                        DifferenceKinds.FIELD_ADDED,
+                        "Field '{}' added to '{}' with value '{}'".format(name, record_name, value),
+                        record=record_name,
+                        field=name,
+                        new_line=new_locations.field_line(new_record, name),
+                    )
+                )
+
+        old_infos = _index_by_name(old_record["infos"], lambda info: info[0])
+        new_infos = _index_by_name(new_record["infos"], lambda info: info[0])
+        for name, (_, value) in new_infos.items():
+            if name not in old_infos:
+                additions.append(
+                    Difference(
+                        DifferenceKinds.INFO_ADDED,
+                        "Info '{}' added to '{}' with value '{}'".format(name, record_name, value),
+                        record=record_name,
+                        field=name,
+                        new_line=record_line,
+                    )
+                )
+
+        old_aliases = set(old_record["aliases"])
+        for alias in _index_by_name(new_record["aliases"], lambda alias: alias):
+            if alias not in old_aliases:
+                additions.append(
+                    Difference(
+                        DifferenceKinds.ALIAS_ADDED,
+                        "Alias '{}' added to '{}'".format(alias, record_name),
+                        record=record_name,
+                        field=alias,
+                        new_line=record_line,
+                    )
+                )
+
+        return additions
@@ -0,0 +1,92 @@
+import os
+
+from src.path_matcher import compile_rules
+
+FILTER_KEYS = ["type", "name", "field", "path"]
+
+
+class RecordFilter(object):
+    """
+    Restricts a comparison to the DB files, records and fields that are of interest.
+
+    The filter is applied as early as possible: DB files are filtered before they are read, records are filtered by the
+    parser as soon as their header has been read (so the bodies of excluded records are skipped rather than parsed)
+    and fields are filtered before they are stored, so they are never compared.
+    """
+
+    def __init__(self, record_types=None, name_patterns=None, fields=None, path_patterns=None):
+        """
+        Args:
+            record_types: record types to include, e.g. ["ai", "ao"]. All types are included if None.
+            name_patterns: rules (globs, or regexes prefixed with "re:") for record names to include. All records are
+                included if None.
+            fields: field names to include, e.g. ["DTYP", "INP"]. All fields are included if None.
+            path_patterns: rules for DB paths, relative to a release and using "/" separators, to include. All DBs
+                are included if None.
+        """
+        self.record_types = frozenset(record_types) if record_types is not None else None
+        self.fields = frozenset(fields) if fields is not None else None
+        self._names = compile_rules(name_patterns) if name_patterns is not None else None
+        self._paths = compile_rules(path_patterns) if path_patterns is not None else None
+
+    def filters_paths(self):
+        """
+        Returns whether the filter excludes any DBs by their paths.
+        """
+        return self._paths is not None
+
+    def includes_path(self, db_path):
+        """
+        Returns whether the DB at the given path, relative to a release, should be compared.
+        """
+        return self._paths is None or bool(self._paths.match(db_path.replace(os.sep, "/")))
+
+    def includes_record(self, record_type, record_name):
+        """
+        Returns whether a record with the given type and name should be compared.
+        """
+        if self.record_types is not None and record_type not in self.record_types:
+            return False
+        return self._names is None or bool(self._names.match(record_name))
+
+    def includes_field(self, field_name):
+        """
+        Returns whether a field with the given name should be compared.
+        """
+        return self.fields is None or field_name in self.fields
+
+    @staticmethod
+    def from_expression(expression):
+        """
+        Creates a filter from an expression of semicolon-separated key=value clauses, where each value is a
+        comma-separated list. Valid keys are in FILTER_KEYS.
+        Example:
+            type=ai,ao,bo,mbbi;field=DTYP,INP,OUT,SCAN;name=*:TEMP*;path=EPICS/support/*
+        Returns:
+            RecordFilter described by the expression
+        Raises:
+            ValueError: if a clause has an unknown key or no values
+        """
+        clauses = {}
+        for clause in expression.split(";"):
+            if not clause.strip():
+                continue
+            key, sep, values = clause.partition("=")
+            key = key.strip()
+            if not sep or key not in FILTER_KEYS:
+                raise ValueError(
+                    "Invalid filter clause '{}'. Expected key=value[,value...] with key one of: {}".format(
+                        clause, ", ".join(FILTER_KEYS)
+                    )
+                )
+            values = [v.strip() for v in values.split(",") if v.strip()]
+            if not values:
+                raise ValueError("Filter clause '{}' has no values".format(clause))
+            clauses.setdefault(key, []).extend(values)
+
+        return RecordFilter(
+            record_types=clauses.get("type"),
+            name_patterns=clauses.get("name"),
+            fields=clauses.get("field"),
+            path_patterns=clauses.get("path"),
+        )
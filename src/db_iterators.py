@@ -1,6 +1,19 @@
 import os
+import time
 
-from src.db_diff import DbDiffer
+from src.db_diff import (
+    DEFAULT_MAX_TEXT_DIFF_SIZE,
+    DEFAULT_PARSER,
+    ChangeKinds,
+    DbChange,
+    DbDiffer,
+    DifferenceKinds,
+)
+from src.db_parser.common import DbSyntaxError
+from src.dbd_schema import load_release_schema
+from src.link_graph import LinkGraph
+from src.path_matcher import PathMatcher
+from src.release_sources import join_relative_path, release_source, walk_source
 
 INTERESTING_FILE_TYPES = [".db"]
 
@@ -22,65 +35,415 @@ INTERESTING_DIRECTORIES = [
     os.path.join("EPICS", "support"),
 ]
 
+DEFAULT_PATH_RULES = {
+    "interesting_directories": [d.replace(os.sep, "/") for d in INTERESTING_DIRECTORIES],
+    "exclude_directories": DIRECTORIES_TO_ALWAYS_IGNORE,
+    "include_files": ["*{}".format(ext) for ext in INTERESTING_FILE_TYPES],
+    "exclude_paths": [],
+}
+
+"""
+Rules for searching a whole tree, such as a git repository or two arbitrary directories, rather than only the
+directories of a release: every DB below the root is compared, skipping the usual directories.
+"""
+WHOLE_TREE_PATH_RULES = dict(DEFAULT_PATH_RULES, interesting_directories=["."])
+
+DBD_FILE_TYPES = ["*.dbd"]
+
+
+def default_path_matcher():
+    """
+    Returns:
+        PathMatcher that walks INTERESTING_DIRECTORIES for INTERESTING_FILE_TYPES, ignoring DIRECTORIES_TO_ALWAYS_IGNORE
+    """
+    return PathMatcher.from_rules(DEFAULT_PATH_RULES)
+
+
+def whole_tree_path_matcher():
+    """
+    Returns:
+        PathMatcher that searches a whole tree for INTERESTING_FILE_TYPES, ignoring DIRECTORIES_TO_ALWAYS_IGNORE
+    """
+    return PathMatcher.from_rules(WHOLE_TREE_PATH_RULES)
+
+
+def path_matcher_from_config_file(config_path, default_rules=DEFAULT_PATH_RULES):
+    """
+    Args:
+        config_path: the path of the configuration file
+        default_rules: the rules for anything which is not configured, e.g. WHOLE_TREE_PATH_RULES
+    Returns:
+        PathMatcher using the rules in the given configuration file, falling back to the default rules for anything
+        which is not configured.
+    """
+    return PathMatcher.from_config_file(config_path, default_rules)
+
 
 class DbChangesIterator(object):
     """
     Contains iterators over DB files or differences between them.
     """
 
-    def __init__(self, old_path, new_path):
+    def __init__(
+        self,
+        old_path,
+        new_path,
+        report_additions=False,
+        path_matcher=None,
+        record_filter=None,
+        normalise_values=True,
+        use_schema=False,
+        schema_cache_dir=None,
+        text_diff=False,
+        max_text_diff_size=DEFAULT_MAX_TEXT_DIFF_SIZE,
+        parser=DEFAULT_PARSER,
+        parsed_db_cache=None,
+        differences_cache=None,
+        old_source=None,
+        new_source=None,
+        check_links=False,
+        likely_changes_first=False,
+        progress=None,
+    ):
         """
         Args:
-            old_path: The path to the old release to be compared
-            new_path: The path to the new release to be compared
+            old_path: The path to the old release to be compared. May be a directory or a zip or tar archive.
+            new_path: The path to the new release to be compared. May be a directory or a zip or tar archive.
+            report_additions: Whether to also report DBs, records, fields, infos and aliases that were added
+            path_matcher: PathMatcher deciding which directories and files are walked. Defaults to
+                default_path_matcher()
+            record_filter: Optional RecordFilter restricting which DBs, records and fields are compared
+            normalise_values: Whether to compare field values in their canonical form rather than as written
+            use_schema: Whether to load the record type schema from the DBD files of the new release, so that removed
+                fields which had their default value are reported as non-breaking
+            schema_cache_dir: Directory to cache release schemas in, or None to not cache them
+            text_diff: Whether to show line diffs of DBs whose API is unchanged but whose significant tokens differ
+            max_text_diff_size: Size in characters above which line diffs are not computed
+            parser: The name of the parser engine to use. Should be one of PARSERS
+            parsed_db_cache: Optional LruCache of parsed DBs shared with other comparisons (see DbDiffer)
+            differences_cache: Optional LruCache of differences shared with other comparisons (see DbDiffer)
+            old_source: Optional source to read the old release from instead of old_path (see release_source)
+            new_source: Optional source to read the new release from instead of new_path (see release_source)
+            check_links: Whether to build a LinkGraph of the new release while comparing, and report the DBs with
+                links to records which were removed
+            likely_changes_first: Whether to compare the DBs most likely to have changed first (see
+                dbs_in_both_paths), so that changes are found sooner, rather than in the order they are walked
+            progress: Optional ComparisonProgress to count the DBs walked, read and compared in. If given, both
+                releases are walked before any DBs are read, so that the number of DBs to compare is known.
         """
         self.old_path = old_path
         self.new_path = new_path
-        self.differ = DbDiffer(old_path, new_path)
+        self.report_additions = report_additions
+        self.path_matcher = path_matcher if path_matcher is not None else default_path_matcher()
+        self.record_filter = record_filter
+        self.use_schema = use_schema
+        self.schema_cache_dir = schema_cache_dir
+        self.check_links = check_links
+        self.likely_changes_first = likely_changes_first
+        self.progress = progress
+
+        # Tar archives are read in one pass, which needs to keep the DBD files too if the schema will be loaded.
+        source_matcher = (
+            self.path_matcher.with_include_files(self.path_matcher.include_files + DBD_FILE_TYPES)
+            if use_schema
+            else self.path_matcher
+        )
+        self.old_source = (
+            old_source if old_source is not None else release_source(old_path, source_matcher)
+        )
+        self.new_source = (
+            new_source if new_source is not None else release_source(new_path, source_matcher)
+        )
+
+        self.differ = DbDiffer(
+            old_path,
+            new_path,
+            report_additions=report_additions,
+            record_filter=record_filter,
+            normalise_values=normalise_values,
+            text_diff=text_diff,
+            max_text_diff_size=max_text_diff_size,
+            parser=parser,
+            parsed_db_cache=parsed_db_cache,
+            differences_cache=differences_cache,
+            old_source=self.old_source,
+            new_source=self.new_source,
+        )
 
     def dbs_in_old_path(self):
         """
-        Generator that returns all the DB files in self.old_path/{INTERESTING_DIRECTORIES}
+        Generator that returns all the DB files in the interesting directories of self.old_path
+        """
+        for db, in_old, _ in self.dbs_in_both_paths():
+            if in_old:
+                yield db
+
+    def dbs_in_both_paths(self):
+        """
+        Generator that walks self.old_path and self.new_path together, listing each directory on both sides once, and
+        returns every DB file in the interesting directories of the path matcher.
+
+        Presence on each side is determined by set operations on the directory listings, so no per-file existence
+        checks are needed. Directories which only exist in the new release are only walked if additions are being
+        reported or links are being checked.
+
+        If likely changes are being looked at first, both releases are walked before anything is returned, and the DBs
+        in both are returned in order of how likely they are to have changed: first those whose sizes differ, then
+        those whose modification times differ, then the rest. DBs only in one release are returned last.
+
+        Yields:
+            tuples of (relative path to the DB, whether it exists in the old release, whether it exists in the new
+            release)
+        """
+        if self.likely_changes_first:
+            for item in sorted(self._walk_both_paths(), key=self._change_likelihood):
+                yield item
+        else:
+            for item in self._walk_both_paths():
+                yield item
+
+    def _change_likelihood(self, item):
+        """
+        Returns:
+            sort key which orders DBs from most to least likely to have changed, from their sizes and modification times
         """
-        for directory in INTERESTING_DIRECTORIES:
-            for root, dirs, files in os.walk(os.path.join(self.old_path, directory)):
-                dirs[:] = [d for d in dirs if d not in DIRECTORIES_TO_ALWAYS_IGNORE]
-                for f in files:
-                    p = os.path.join(root, f)
-                    if any(p.endswith(ext) for ext in INTERESTING_FILE_TYPES):
-                        yield os.path.relpath(p, start=self.old_path)
+        db, in_old, in_new = item
+        if not (in_old and in_new):
+            return 3
+        old_stat, new_stat = self.old_source.stat(db), self.new_source.stat(db)
+        if old_stat is None or new_stat is None:
+            return 2
+        old_size, old_mtime = old_stat
+        new_size, new_mtime = new_stat
+        if old_size != new_size:
+            return 0
+        return 1 if old_mtime != new_mtime else 2
+
+    def _walk_both_paths(self):
+        """
+        Generator that returns every DB file in the interesting directories of both releases, in the order they are
+        walked. See dbs_in_both_paths.
+        """
+        for directory in self.path_matcher.roots:
+            if self.path_matcher.is_directory_excluded(os.path.basename(directory), directory):
+                continue
+            for item in self._walk_directory_pair(directory, in_old=True, in_new=True):
+                yield item
+
+    def _walk_directory_pair(self, directory, in_old, in_new):
+        """
+        Recursive helper for dbs_in_both_paths.
+        Args:
+            directory: the directory to walk, relative to the release roots
+            in_old: whether this directory may exist in the old release
+            in_new: whether this directory may exist in the new release
+        """
+        old_dirs, old_files = (
+            self._list_directory(self.old_source, directory) if in_old else ([], set())
+        )
+        new_dirs, new_files = (
+            self._list_directory(self.new_source, directory) if in_new else ([], set())
+        )
+
+        walk_additions = self.report_additions or self.check_links
+        all_files = old_files | new_files if walk_additions else old_files
+        for f in sorted(all_files):
+            path = join_relative_path(directory, f)
+            if self.record_filter is None or self.record_filter.includes_path(path):
+                yield path, f in old_files, f in new_files
+
+        new_dir_set = set(new_dirs)
+        for d in old_dirs:
+            for item in self._walk_directory_pair(
+                join_relative_path(directory, d), in_old=True, in_new=d in new_dir_set
+            ):
+                yield item
+
+        if walk_additions:
+            old_dir_set = set(old_dirs)
+            for d in new_dirs:
+                if d not in old_dir_set:
+                    for item in self._walk_directory_pair(
+                        join_relative_path(directory, d), in_old=False, in_new=True
+                    ):
+                        yield item
+
+    def _list_directory(self, source, directory):
+        """
+        Lists the interesting contents of a directory of one of the releases. See list_directory.
+        """
+        return source.list_directory(self.path_matcher, directory)
+
+    def read_both(self, db):
+        """
+        Reads the DB at the given relative path from both releases.
+        Returns:
+            tuple of (contents in the old release, contents in the new release)
+        """
+        return self.old_source.read(db), self.new_source.read(db)
+
+    def _is_modified(self, db):
+        """
+        Returns whether the DB at the given relative path differs between the old and new releases.
+        """
+        old_contents, new_contents = self.read_both(db)
+        return old_contents != new_contents
+
+    def load_schema(self):
+        """
+        Loads the schema of the new release into the differ, if it is being used and has not already been loaded. The
+        schema is shared by every DB that is compared.
+        """
+        if self.use_schema and self.differ.schema is None:
+            self.differ.schema = load_release_schema(
+                self.new_path,
+                self.path_matcher.with_include_files(DBD_FILE_TYPES),
+                self.schema_cache_dir,
+            )
 
     def deleted_dbs(self):
         """
         Generator that returns DBs that were removed from old_version to new_version
         """
-        for db in self.dbs_in_old_path():
-            if not os.path.exists(os.path.join(self.new_path, db)):
+        for db, in_old, in_new in self.dbs_in_both_paths():
+            if in_old and not in_new:
+                yield db
+
+    def added_dbs(self):
+        """
+        Generator that returns DBs that were added from old_version to new_version. Only returns anything if additions
+        are being reported.
+        """
+        for db, in_old, in_new in self.dbs_in_both_paths():
+            if in_new and not in_old and self.report_additions:
                 yield db
 
     def modified_dbs(self):
         """
         Generator that returns DBs that were modified between old_version to new_version
         """
-        for db in self.dbs_in_old_path():
-            if os.path.exists(os.path.join(self.new_path, db)):
-                with open(os.path.join(self.old_path, db)) as old_file, open(
-                    os.path.join(self.new_path, db)
-                ) as new_file:
-                    if old_file.readlines() != new_file.readlines():
-                        yield db
+        for db, in_old, in_new in self.dbs_in_both_paths():
+            if in_old and in_new and self._is_modified(db):
+                yield db
 
     def change_descriptions(self):
         """
-        Generator that returns string descriptions of the changes for each database.
+        Generator that returns string descriptions of the changes for each database. Each description is a DbChange,
+        so also records the kind of change and the differences found.
+
+        By default this only returns changes where something *was* present in the API of the old database but is no
+        longer present. If additions are being reported, added DBs and API additions are also returned.
 
-        This only returns changes where something *was* present in the API of the old database but is no longer present.
-        It does not generate "changes" if functionality has only been added.
+        If links are being checked, every DB in the new release is added to a LinkGraph as it is walked, and the DBs
+        with links to removed records are returned last.
+
+        Both release trees are only walked once, and each DB is only read once.
         """
-        for db in self.modified_dbs():
-            diff = self.differ.diff_dbs_by_path(db)
-            if diff is not None:
-                yield diff
+        link_graph = LinkGraph() if self.check_links else None
+        removed_records = set()
+        progress = self.progress
+
+        deleted, added = [], []
+        for db, in_old, in_new in self._dbs_to_compare():
+            if in_old and in_new:
+                start = time.perf_counter()
+                old_contents, new_contents = self.read_both(db)
+                if progress is not None:
+                    progress.read_seconds += time.perf_counter() - start
+                    progress.characters_read += len(old_contents) + len(new_contents)
 
-        for db in self.deleted_dbs():
-            yield "A DB file was deleted from {}".format(db)
+                diff = None
+                if old_contents != new_contents:
+                    self.load_schema()
+                    start = time.perf_counter()
+                    diff = self.differ.diff_db_contents(db, old_contents, new_contents)
+                    if progress is not None:
+                        progress.diff_seconds += time.perf_counter() - start
+                        progress.dbs_parsed = self.differ.dbs_parsed
+
+                if progress is not None:
+                    progress.dbs_compared += 1
+                if diff is not None:
+                    removed_records.update(
+                        d.record
+                        for d in diff.differences
+                        if d.kind == DifferenceKinds.RECORD_REMOVED
+                    )
+                    yield diff
+                if link_graph is not None:
+                    self._add_to_link_graph(link_graph, db, new_contents)
+            elif in_old:
+                deleted.append(db)
+            else:
+                added.append(db)
+
+        for db in deleted:
+            if link_graph is not None:
+                removed_records.update(
+                    record["name"] for record in self._parse_or_empty(self.old_source.read(db))
+                )
+            yield DbChange(ChangeKinds.DELETED, db, "A DB file was deleted from {}".format(db))
+
+        for db in added:
+            if link_graph is not None:
+                self._add_to_link_graph(link_graph, db, self.new_source.read(db))
+            if self.report_additions:
+                yield DbChange(ChangeKinds.ADDED, db, "A DB file was added at {}".format(db))
+
+        if link_graph is not None:
+            for db in self._dbs_outside_path_filter():
+                self._add_to_link_graph(link_graph, db, self.new_source.read(db))
+            for change in link_graph.broken_link_changes(removed_records):
+                yield change
+
+    def _dbs_to_compare(self):
+        """
+        Returns:
+            iterable of the DBs in either release (see dbs_in_both_paths). If progress is being counted, this is a list
+            of every DB, so the walk has finished.
+        """
+        if self.progress is None:
+            return self.dbs_in_both_paths()
+
+        dbs = []
+        for item in self.dbs_in_both_paths():
+            dbs.append(item)
+            self.progress.dbs_found += 1
+        self.progress.finish_walk(sum(1 for _, in_old, in_new in dbs if in_old and in_new))
+        return dbs
+
+    def _parse_or_empty(self, contents):
+        """
+        Parses DB contents, sharing the differ's cache. DBs which can not be parsed are treated as having no records;
+        their errors are reported when they are diffed.
+        """
+        try:
+            return self.differ.parse_contents(contents)
+        except DbSyntaxError:
+            return []
+
+    def _dbs_outside_path_filter(self):
+        """
+        Generator that returns the DBs in the new release which the record filter's path rules exclude. They are not
+        compared, but may still link to removed records, or define records which were moved.
+        """
+        if self.record_filter is None or not self.record_filter.filters_paths():
+            return
+        for db in walk_source(self.new_source, self.path_matcher):
+            if not self.record_filter.includes_path(db):
+                yield db
+
+    def _add_to_link_graph(self, link_graph, db, contents):
+        """
+        Adds a DB in the new release to the link graph. Links to a removed record may be in any field of any record,
+        so the DB is parsed without the record filter. The differ's cache of parsed DBs is only shared if there is no
+        record filter.
+        """
+        try:
+            if self.record_filter is None:
+                records = self.differ.parse_contents(contents)
+            else:
+                records = DbDiffer.parse_db(contents, parser_class=self.differ.parser_class)
+        except DbSyntaxError:
+            records = []  # The error is reported when the DB is diffed
+        link_graph.add_db(db, records)
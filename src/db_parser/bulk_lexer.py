@@ -0,0 +1,235 @@
+import re
+from array import array
+from itertools import islice
+
+from src.db_parser.common import DbSyntaxError, SourcePositions
+from src.db_parser.lexer import Lexer, Token
+from src.db_parser.tokens import TokenTypes
+
+"""
+The token types that can be stored in a BulkLexer's arrays. A token's type code is its index in this tuple.
+"""
+TOKEN_TYPES = (
+    TokenTypes.EOF,
+    TokenTypes.RECORD,
+    TokenTypes.FIELD,
+    TokenTypes.INFO,
+    TokenTypes.ALIAS,
+    TokenTypes.L_BRACKET,
+    TokenTypes.R_BRACKET,
+    TokenTypes.L_BRACE,
+    TokenTypes.R_BRACE,
+    TokenTypes.COMMA,
+    TokenTypes.QUOTED_STRING,
+    TokenTypes.LITERAL,
+)
+TOKEN_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+EOF_CODE = TOKEN_CODES[TokenTypes.EOF]
+
+"""
+Number of significant tokens of each file which significant_tokens_equal lexes before comparing them. Comparing lists
+of tokens is much faster than comparing tokens one at a time, and only this many tokens are lexed past a difference.
+"""
+SIGNIFICANT_TOKENS_CHUNK_SIZE = 256
+
+"""
+The regexes of Lexer.TOKEN_MAPPING, in the same order, but adapted to be matched against the whole file rather than a
+single line: character classes which could otherwise match a newline exclude it. Whitespace may span lines, which
+makes no difference as it is ignored.
+"""
+BULK_TOKEN_MAPPING = [
+    (r"(record)", TokenTypes.RECORD),
+    (r"(grecord)", TokenTypes.RECORD),
+    (r"(field)", TokenTypes.FIELD),
+    (r"(info)", TokenTypes.INFO),
+    (r"(alias)", TokenTypes.ALIAS),
+    (r"(\()", TokenTypes.L_BRACKET),
+    (r"(\))", TokenTypes.R_BRACKET),
+    (r"(\{)", TokenTypes.L_BRACE),
+    (r"(\})", TokenTypes.R_BRACE),
+    (r"(,)", TokenTypes.COMMA),
+    (r"(\".*?[^\\\n]\"|\"\")", TokenTypes.QUOTED_STRING),
+    (r"(\#.*)", TokenTypes.COMMENT),
+    (r"(\$\([^\)\n]*\))", TokenTypes.MACRO),
+    (r"(\$\{[^\}\n]*\})", TokenTypes.MACRO),
+    (r"(\s+)", TokenTypes.WHITESPACE),
+    (r"([a-zA-Z0-9\-\_\.\:]+)", TokenTypes.LITERAL),
+]
+
+"""
+A single regex matching any token. As the alternatives are tried in order, the first rule that matches wins, exactly
+as in Lexer. Each alternative has one group, so the index of the group that matched identifies the rule.
+"""
+_BULK_TOKEN_REGEX = re.compile("|".join(regex for regex, _ in BULK_TOKEN_MAPPING))
+
+"""
+Type code of the token produced by each group of _BULK_TOKEN_REGEX (indexed by group number), or None if the token is
+ignored.
+"""
+_GROUP_CODES = [None] + [
+    None if token_type in Lexer.IGNORED_TOKENS else TOKEN_CODES[token_type]
+    for _, token_type in BULK_TOKEN_MAPPING
+]
+
+
+class BulkLexer(object):
+    """
+    Lexer which tokenises a whole DB file in one pass of a single regex, storing the significant tokens as parallel
+    arrays of type codes (see TOKEN_TYPES), start offsets and end offsets rather than as Token objects. Ignored tokens
+    are not stored at all. This is much faster and smaller than Lexer for large (e.g. generated) DBs.
+
+    It can also be used as a drop-in replacement for Lexer: __next__ produces the same Tokens, with the same line and
+    column numbers. If the file can not be lexed, the same DbSyntaxError is raised when the token which could not be
+    lexed is reached, so errors earlier in the file are reported first, as with Lexer.
+    Args:
+        file_contents: the contents of the DB file
+    """
+
+    def __init__(self, file_contents):
+        self.file_contents = file_contents
+        self.positions = SourcePositions(file_contents)
+        self.types = array("B")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.error = None  # DbSyntaxError to raise once all the tokens before it have been consumed
+        self._tokenise()
+
+        self.index = 0
+
+    def _tokenise(self):
+        text = self.file_contents
+        types, starts, ends = self.types, self.starts, self.ends
+        group_codes = _GROUP_CODES
+
+        pos = 0
+        for match in _BULK_TOKEN_REGEX.finditer(text):
+            start = match.start()
+            if start != pos:
+                break
+            pos = match.end()
+            code = group_codes[match.lastindex]
+            if code is not None:
+                types.append(code)
+                starts.append(start)
+                ends.append(pos)
+
+        if pos != len(text):
+            self.error = Lexer.no_matching_rules_error(self.positions, pos)
+        else:
+            types.append(EOF_CODE)
+            starts.append(len(text))
+            ends.append(len(text))
+
+    def __len__(self):
+        """
+        Returns:
+            the number of significant tokens, including the EOF token if the whole file could be lexed
+        """
+        return len(self.types)
+
+    def token_type(self, index):
+        return TOKEN_TYPES[self.types[index]]
+
+    def contents(self, index):
+        """
+        Returns:
+            the text of the token at the given index, or None for the EOF token (as for Lexer)
+        """
+        if self.types[index] == EOF_CODE:
+            return None
+        return self.file_contents[self.starts[index] : self.ends[index]]
+
+    def token(self, index):
+        """
+        Returns:
+            the token at the given index as a Token
+        """
+        return Token(
+            self.token_type(index),
+            contents=self.contents(index),
+            offset=self.starts[index],
+            positions=self.positions,
+        )
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """
+        Returns:
+            the next significant Token, as Lexer.__next__ does
+        """
+        if self.index >= len(self.types):
+            if self.error is not None:
+                raise self.error
+            raise StopIteration
+        token = self.token(self.index)
+        self.index += 1
+        return token
+
+
+def _significant_tokens(file_contents):
+    """
+    Generator that lexes a DB file lazily, as BulkLexer does, returning the type code and text of each significant
+    token as it is reached.
+    Raises:
+        DbSyntaxError: once the token which could not be lexed is reached
+    """
+    group_codes = _GROUP_CODES
+    pos = 0
+    for match in _BULK_TOKEN_REGEX.finditer(file_contents):
+        if match.start() != pos:
+            break
+        pos = match.end()
+        code = group_codes[match.lastindex]
+        if code is not None:
+            yield code, match.group()
+
+    if pos != len(file_contents):
+        raise Lexer.no_matching_rules_error(SourcePositions(file_contents), pos)
+
+
+def significant_tokens_equal(first_contents, second_contents):
+    """
+    Compares the significant tokens (i.e. not those in Lexer.IGNORED_TOKENS) of two DB files, by type and contents.
+    Both files are lexed lazily and compared SIGNIFICANT_TOKENS_CHUNK_SIZE tokens at a time, so lexing stops soon after
+    the first difference.
+    Args:
+        first_contents: the contents of the first file
+        second_contents: the contents of the second file
+    Returns:
+        True if the files only differ in whitespace, comments or macros outside of strings, False otherwise.
+    Raises:
+        DbSyntaxError: if either file can not be lexed up to the first difference
+    """
+    first, second = _significant_tokens(first_contents), _significant_tokens(second_contents)
+    while True:
+        first_chunk, first_error = _next_chunk(first)
+        second_chunk, second_error = _next_chunk(second)
+        count = min(len(first_chunk), len(second_chunk))
+        if first_chunk[:count] != second_chunk[:count]:
+            return False
+
+        # If the tokens so far are equal but one file failed to lex, it can not be lexed up to the first difference.
+        if first_error is not None:
+            raise first_error
+        if second_error is not None:
+            raise second_error
+        if len(first_chunk) != len(second_chunk):
+            return False
+        if len(first_chunk) < SIGNIFICANT_TOKENS_CHUNK_SIZE:
+            return True
+
+
+def _next_chunk(tokens):
+    """
+    Returns:
+        tuple of (list of the next SIGNIFICANT_TOKENS_CHUNK_SIZE tokens, or fewer if there are no more, and the
+        DbSyntaxError which stopped lexing, or None)
+    """
+    chunk = []
+    try:
+        chunk.extend(islice(tokens, SIGNIFICANT_TOKENS_CHUNK_SIZE))
+    except DbSyntaxError as e:
+        return chunk, e
+    return chunk, None
@@ -1,4 +1,114 @@
+from array import array
+from bisect import bisect_right
+
+"""
+Maximum number of characters of a line shown in a source excerpt. Longer lines are cut down around the error.
+"""
+EXCERPT_WIDTH = 100
+
+"""
+Offset given to records and fields parsed from tokens whose position in the file is not known.
+"""
+UNKNOWN_OFFSET = -1
+
+
+class ParsedDb(list):
+    """
+    The list of records parsed from a DB, which also keeps where in the file each record and field is.
+
+    So as not to add to the size of each record, the locations are kept in a single array of offsets for the whole DB:
+    for each record in turn, the offset of the record followed by the offsets of each of its fields.
+    """
+
+    def __init__(self, records=()):
+        super(ParsedDb, self).__init__(records)
+        self.offsets = array("q")
+
+
 class DbSyntaxError(ValueError):
     """
     Error that gets raised if there was a problem with the syntax of a DB file.
+    Args:
+        message: description of the problem
+        line: the line number the problem was found on, if known
+        col: the column number the problem was found on, if known
+        excerpt: the source around the problem (see SourcePositions.excerpt), if known. Shown after the message.
+    """
+
+    def __init__(self, message, line=None, col=None, excerpt=None):
+        super(DbSyntaxError, self).__init__(
+            message if excerpt is None else "{}\n{}".format(message, excerpt)
+        )
+        self.line = line
+        self.col = col
+        self.excerpt = excerpt
+
+
+class SourcePositions(object):
+    """
+    Converts absolute offsets in a file into line and column numbers. Lexers only track offsets while scanning; the
+    index of where each line starts is only built when a line or column number is first needed (e.g. for an error),
+    and is then searched with bisect.
+    Args:
+        text: the contents of the file
     """
+
+    def __init__(self, text):
+        self.text = text
+        self._line_starts = None
+
+    def line_starts(self):
+        """
+        Returns:
+            list of the offset at which each line starts
+        """
+        if self._line_starts is None:
+            text = self.text
+            line_starts = [0]
+            newline = text.find("\n")
+            while newline != -1:
+                line_starts.append(newline + 1)
+                newline = text.find("\n", newline + 1)
+            self._line_starts = line_starts
+        return self._line_starts
+
+    def line_and_column(self, offset):
+        """
+        Returns:
+            tuple of (line number, column number) of an offset. Line numbers start at 1 and column numbers at 0.
+        """
+        line_starts = self.line_starts()
+        line = bisect_right(line_starts, offset)
+        return line, offset - line_starts[line - 1]
+
+    def line_text(self, line):
+        """
+        Returns:
+            the text of the given line, without its line ending
+        """
+        line_starts = self.line_starts()
+        start = line_starts[line - 1]
+        end = line_starts[line] - 1 if line < len(line_starts) else len(self.text)
+        return self.text[start:end]
+
+    def excerpt(self, offset):
+        """
+        Returns:
+            the line containing an offset, with a marker underneath pointing at the offset, e.g.
+                  3 |     field(VAL "1")
+                    |               ^
+        """
+        line, col = self.line_and_column(offset)
+        text = self.line_text(line).rstrip("\r")
+
+        start = max(0, min(col - EXCERPT_WIDTH // 2, len(text) - EXCERPT_WIDTH))
+        shown = text[start : start + EXCERPT_WIDTH]
+        prefix = "..." if start > 0 else ""
+        suffix = "..." if start + EXCERPT_WIDTH < len(text) else ""
+        # Keep tabs in the marker line so that it lines up with the source line
+        marker = "".join(c if c == "\t" else " " for c in prefix + shown[: col - start]) + "^"
+
+        number = str(line)
+        return "    {} | {}{}{}\n    {} | {}".format(
+            number, prefix, shown, suffix, " " * len(number), marker
+        )
@@ -0,0 +1,411 @@
+from array import array
+
+from src.db_parser.bulk_lexer import EOF_CODE, TOKEN_CODES, BulkLexer
+from src.db_parser.common import UNKNOWN_OFFSET, DbSyntaxError, ParsedDb
+from src.db_parser.tokens import TokenTypes
+
+_RECORD = TOKEN_CODES[TokenTypes.RECORD]
+_FIELD = TOKEN_CODES[TokenTypes.FIELD]
+_INFO = TOKEN_CODES[TokenTypes.INFO]
+_ALIAS = TOKEN_CODES[TokenTypes.ALIAS]
+_L_BRACKET = TOKEN_CODES[TokenTypes.L_BRACKET]
+_R_BRACKET = TOKEN_CODES[TokenTypes.R_BRACKET]
+_L_BRACE = TOKEN_CODES[TokenTypes.L_BRACE]
+_R_BRACE = TOKEN_CODES[TokenTypes.R_BRACE]
+_COMMA = TOKEN_CODES[TokenTypes.COMMA]
+_QUOTED_STRING = TOKEN_CODES[TokenTypes.QUOTED_STRING]
+_LITERAL = TOKEN_CODES[TokenTypes.LITERAL]
+
+"""
+Type code for tokens of types which never appear in a valid DB (e.g. from a lexer other than BulkLexer).
+"""
+_OTHER = len(TOKEN_CODES)
+
+"""
+Type code of the sentinel added after the last token if the tokens do not end with an EOF token, i.e. if lexing
+failed or the lexer ran out of tokens. Reaching it raises the error the lexer raised.
+"""
+_END = _OTHER + 1
+
+"""
+Token type names by type code, for error messages.
+"""
+_TOKEN_TYPE_NAMES = {code: token_type for token_type, code in TOKEN_CODES.items()}
+
+
+class FastParser(object):
+    """
+    Parser producing exactly the same results and errors as Parser, but much faster. It works directly on the arrays of
+    token type codes and offsets produced by BulkLexer, rather than on Token objects: the current position is an index
+    into the arrays, productions are inlined rather than using context managers, and strings are only sliced out of
+    the file for values.
+
+    Other lexers (such as Lexer) are also accepted. Their tokens are read into the same arrays up front.
+    Args:
+        lexer: the lexer to take tokens from. Fastest if it is a BulkLexer which has not been read from yet.
+        record_filter: optional RecordFilter. Records and fields it excludes are skipped rather than returned.
+    """
+
+    def __init__(self, lexer, record_filter=None):
+        self.record_filter = record_filter
+
+        if isinstance(lexer, BulkLexer):
+            self.lexer = lexer
+            self.tokens = None
+            self.types, self.starts, self.ends = lexer.types, lexer.starts, lexer.ends
+            self.offsets = lexer.starts
+            self.text = lexer.file_contents
+            self.lexer_error = lexer.error
+            self.position = lexer.index
+        else:
+            self.lexer = None
+            self._read_tokens(lexer)
+            self.position = 0
+
+        if len(self.types) == 0 or self.types[-1] != EOF_CODE:
+            # Copy rather than append to the lexer's arrays
+            self.types = array("B", self.types)
+            self.starts = array("q", self.starts)
+            self.ends = array("q", self.ends)
+            self.types.append(_END)
+            self.starts.append(len(self.text))
+            self.ends.append(len(self.text))
+
+        if self.types[self.position] == _END:
+            self.raise_error("", self.position)
+
+    def _read_tokens(self, lexer):
+        """
+        Reads all the tokens from a lexer into arrays, as if they came from a BulkLexer. The text of the tokens is
+        joined together so that values can be sliced out in the same way, and the offsets of the tokens in the file
+        are kept separately.
+        """
+        self.types, self.starts, self.ends = array("B"), array("q"), array("q")
+        self.offsets = array("q")
+        self.tokens = []
+        self.lexer_error = None
+        contents = []
+        offset = 0
+        try:
+            while True:
+                token = next(lexer)
+                text = token.contents if token.contents is not None else ""
+                self.tokens.append(token)
+                self.types.append(TOKEN_CODES.get(token.type, _OTHER))
+                self.offsets.append(token.offset if token.offset is not None else UNKNOWN_OFFSET)
+                self.starts.append(offset)
+                offset += len(text)
+                self.ends.append(offset)
+                contents.append(text)
+                if token.type == TokenTypes.EOF:
+                    break
+        except StopIteration:
+            pass
+        except DbSyntaxError as e:
+            self.lexer_error = e
+        self.text = "".join(contents)
+
+    @property
+    def current_token(self):
+        """
+        Returns:
+            the current token as a Token, or None if there are no more tokens
+        """
+        return self.token(self.position)
+
+    def token(self, index):
+        """
+        Returns:
+            the token at the given index as a Token, or None if there is no such token
+        """
+        if self.types[index] == _END:
+            return None
+        if self.tokens is not None:
+            return self.tokens[index]
+        return self.lexer.token(index)
+
+    def raise_error(self, message, index=None):
+        """
+        Raises an error for an unexpected token, in the same form as Parser.raise_error.
+        Args:
+            message: A message to add to the error
+            index: the index of the unexpected token. Defaults to the current position.
+        """
+        if index is None:
+            index = self.position
+
+        if self.types[index] == _END:
+            # Parser would have failed when trying to move onto this token.
+            if self.lexer_error is not None:
+                raise self.lexer_error
+            if index == 0:
+                raise DbSyntaxError("No tokens found.")
+            index -= 1
+            message = "Next token was requested, but none exists."
+
+        token = self.token(index)
+        raise DbSyntaxError(
+            "Unexpected token '{}' encountered at {}:{}: {}".format(
+                token, token.line, token.col, message
+            ),
+            token.line,
+            token.col,
+            token.excerpt(),
+        )
+
+    def _expected(self, index, code):
+        self.raise_error("Expected '{}'.".format(_TOKEN_TYPE_NAMES[code]), index)
+
+    def consume(self, token_type):
+        """
+        Verifies that the current token is of the given type, and then advances by one token.
+        Returns:
+            the contents of the consumed token
+        """
+        token = self.token(self.position)
+        if token is None or token.type != token_type:
+            self.raise_error("Expected '{}'.".format(token_type))
+        self.position += 1
+        if self.types[self.position] == _END:
+            self.raise_error("")
+        return token.contents
+
+    def _value(self, index):
+        """
+        Parses a value (quoted or not) at the given index.
+        Returns:
+            tuple of (the value with quotes stripped, the index after it)
+        """
+        code = self.types[index]
+        if code == _QUOTED_STRING:
+            return self.text[self.starts[index] + 1 : self.ends[index] - 1], index + 1
+        elif code == _LITERAL:
+            return self.text[self.starts[index] : self.ends[index]], index + 1
+        else:
+            self.raise_error("Expected either a literal or a string literal.", index)
+
+    def _key_value_pair(self, index):
+        """
+        Parses a bracketed key value pair at the given index.
+        Returns:
+            tuple of (key, value, the index after the pair)
+        """
+        types, starts, ends, text = self.types, self.starts, self.ends, self.text
+
+        if types[index] != _L_BRACKET:
+            self._expected(index, _L_BRACKET)
+        index += 1
+
+        code = types[index]
+        if code == _QUOTED_STRING:
+            key = text[starts[index] + 1 : ends[index] - 1]
+        elif code == _LITERAL:
+            key = text[starts[index] : ends[index]]
+        else:
+            self.raise_error("Expected either a literal or a string literal.", index)
+        index += 1
+
+        if types[index] != _COMMA:
+            self._expected(index, _COMMA)
+        index += 1
+
+        code = types[index]
+        if code == _QUOTED_STRING:
+            value = text[starts[index] + 1 : ends[index] - 1]
+        elif code == _LITERAL:
+            value = text[starts[index] : ends[index]]
+        else:
+            self.raise_error("Expected either a literal or a string literal.", index)
+        index += 1
+
+        if types[index] != _R_BRACKET:
+            self._expected(index, _R_BRACKET)
+        return key, value, index + 1
+
+    def _keyword_key_value_pair(self, code):
+        if self.types[self.position] != code:
+            self._expected(self.position, code)
+        key, value, self.position = self._key_value_pair(self.position + 1)
+        return key, value
+
+    def value(self):
+        """
+        Handler for values which are allowed to be quoted or not. See Parser.value.
+        """
+        value, self.position = self._value(self.position)
+        return value
+
+    def key_value_pair(self):
+        """
+        Handler for key value pairs surrounded by brackets. See Parser.key_value_pair.
+        """
+        key, value, self.position = self._key_value_pair(self.position)
+        return key, value
+
+    def field(self):
+        """
+        Handler for an EPICS DB field. See Parser.field.
+        """
+        return self._keyword_key_value_pair(_FIELD)
+
+    def info(self):
+        """
+        Handler for an EPICS DB info field. See Parser.info.
+        """
+        return self._keyword_key_value_pair(_INFO)
+
+    def alias(self):
+        """
+        Handler for an EPICS alias (DB level). See Parser.alias.
+        """
+        return self._keyword_key_value_pair(_ALIAS)
+
+    def alias_field(self):
+        """
+        Handler for an EPICS alias within a DB record. See Parser.alias_field.
+        """
+        index = self.position
+        if self.types[index] != _ALIAS:
+            self._expected(index, _ALIAS)
+        if self.types[index + 1] != _L_BRACKET:
+            self._expected(index + 1, _L_BRACKET)
+        value, index = self._value(index + 2)
+        if self.types[index] != _R_BRACKET:
+            self._expected(index, _R_BRACKET)
+        self.position = index + 1
+        return value
+
+    def skip_brace_delimited_block(self):
+        """
+        Consumes a block surrounded by braces without interpreting its contents.
+        """
+        self.position = self._skip_brace_delimited_block(self.position)
+
+    def _skip_brace_delimited_block(self, index):
+        types = self.types
+        if types[index] != _L_BRACE:
+            self._expected(index, _L_BRACE)
+        index += 1
+        while types[index] != _R_BRACE:
+            if types[index] == EOF_CODE or types[index] == _END:
+                self._expected(index, _R_BRACE)
+            index += 1
+        return index + 1
+
+    def record(self, offsets=None):
+        """
+        Handler for an EPICS DB record. See Parser.record.
+        Args:
+            offsets: optional array to append the offsets of the record and its fields to (see ParsedDb)
+        Returns:
+            dict of the record, or None if the record is excluded by the record filter.
+        """
+        record, self.position = self._record(self.position, offsets)
+        return record
+
+    def _record(self, index, db_offsets):
+        """
+        Parses a record at the given index, appending the offsets of the record and its fields to db_offsets (if
+        not None).
+        Returns:
+            tuple of (the record dict or None if it is excluded, the index after the record)
+        """
+        types, starts, ends, text = self.types, self.starts, self.ends, self.text
+        offsets = self.offsets
+        key_value_pair = self._key_value_pair
+
+        if types[index] != _RECORD:
+            self._expected(index, _RECORD)
+        record_offset = offsets[index]
+        record_type, record_name, index = key_value_pair(index + 1)
+
+        record_filter = self.record_filter
+        if record_filter is not None and not record_filter.includes_record(
+            record_type, record_name
+        ):
+            if types[index] == _L_BRACE:
+                index = self._skip_brace_delimited_block(index)
+            return None, index
+
+        if db_offsets is not None:
+            db_offsets.append(record_offset)
+
+        fields = []
+        infos = []
+        aliases = []
+        record = {
+            "type": record_type,
+            "name": record_name,
+            "fields": fields,
+            "infos": infos,
+            "aliases": aliases,
+        }
+
+        # Special case for records with no body
+        if types[index] != _L_BRACE:
+            return record, index
+        index += 1
+
+        while True:
+            code = types[index]
+            if code == _FIELD:
+                field_offset = offsets[index]
+                field = key_value_pair(index + 1)
+                index = field[2]
+                if record_filter is None or record_filter.includes_field(field[0]):
+                    fields.append(field[:2])
+                    if db_offsets is not None:
+                        db_offsets.append(field_offset)
+            elif code == _R_BRACE:
+                return record, index + 1
+            elif code == _INFO:
+                info = key_value_pair(index + 1)
+                index = info[2]
+                infos.append(info[:2])
+            elif code == _ALIAS:
+                if types[index + 1] != _L_BRACKET:
+                    self._expected(index + 1, _L_BRACKET)
+                index += 2
+                code = types[index]
+                if code == _QUOTED_STRING:
+                    aliases.append(text[starts[index] + 1 : ends[index] - 1])
+                elif code == _LITERAL:
+                    aliases.append(text[starts[index] : ends[index]])
+                else:
+                    self.raise_error("Expected either a literal or a string literal.", index)
+                index += 1
+                if types[index] != _R_BRACKET:
+                    self._expected(index, _R_BRACKET)
+                index += 1
+            else:
+                self.raise_error("Expected info, field or alias", index)
+
+    def db(self):
+        """
+        Top-level handler for an EPICS DB. See Parser.db.
+        """
+        types = self.types
+        parse_record = self._record
+        index = self.position
+        records = ParsedDb()
+        offsets = records.offsets
+        while True:
+            code = types[index]
+            if code == _RECORD:
+                record, index = parse_record(index, offsets)
+                if record is not None:
+                    records.append(record)
+            elif code == EOF_CODE:
+                break
+            elif code == _ALIAS:
+                pv, alias, index = self._key_value_pair(index + 1)
+                # Find the record that this alias belongs to, and add the alias to it.
+                # Don't error if we can't find the record that it belongs to - it might be in another DB
+                for rec in records:
+                    if pv == rec["name"] or pv in rec["aliases"]:
+                        rec["aliases"].append(alias)
+                        break
+            else:
+                self.raise_error("Expected record or alias", index)
+        self.position = index
+        return records
@@ -1,26 +1,54 @@
 import re
 from collections import OrderedDict
 
-from src.db_parser.common import DbSyntaxError
+from src.db_parser.common import DbSyntaxError, SourcePositions
 from src.db_parser.tokens import TokenTypes
 
 
 class Token(object):
     """
     Class representing a lexer token. Tokens are considered equal if their types are equal.
+
+    Lexers give tokens their offset in the file rather than their line and column numbers, which are only worked out
+    (from the file's SourcePositions) if they are asked for.
     Args:
         type: the type of this token. Should be one of TokenTypes
-        linenum: the line number this token was found on
-        colnum: the column number this token was found on
+        linenum: the line number this token was found on, or None to work it out from the offset
+        colnum: the column number this token was found on, or None to work it out from the offset
         contents: the original text that this token was parsed from
+        offset: the offset in the file this token was found at
+        positions: SourcePositions of the file this token was found in
     """
 
-    def __init__(self, type, linenum, colnum, contents=None):
+    def __init__(self, type, linenum=None, colnum=None, contents=None, offset=None, positions=None):
         self.type = type
         self.contents = contents
+        self.offset = offset
+        self.positions = positions
+
+        self._line = linenum
+        self._col = colnum
+
+    @property
+    def line(self):
+        if self._line is None and self.positions is not None:
+            self._line, self._col = self.positions.line_and_column(self.offset)
+        return self._line
 
-        self.line = linenum
-        self.col = colnum
+    @property
+    def col(self):
+        if self._col is None and self.positions is not None:
+            self._line, self._col = self.positions.line_and_column(self.offset)
+        return self._col
+
+    def excerpt(self):
+        """
+        Returns:
+            the source around this token (see SourcePositions.excerpt), or None if its position in the file is unknown
+        """
+        if self.positions is None:
+            return None
+        return self.positions.excerpt(self.offset)
 
     def __str__(self):
         return "{} (contents={})".format(self.type, self.contents)
@@ -91,32 +119,55 @@ class Lexer:
 
     def __init__(self, file_contents):
         self.file_contents = file_contents
+        self.positions = SourcePositions(file_contents)
         self.gen = None
 
     def token_generator(self):
         """
-        Token generator function.
+        Token generator function. Each line is matched separately, but in place, so only offsets are tracked.
         yields:
             Tokens corresponding to the lexed input.
         """
-        lines = self.file_contents.split("\n")
-        for linenum, line in enumerate(lines, 1):
-            column = 0
-            while column < len(line):
-                for regexp in Lexer.TOKEN_MAPPING:
-                    match_text = self._text_matches_regex(line[column:], regexp)
-                    if match_text is not None:
-                        yield Token(Lexer.TOKEN_MAPPING[regexp], linenum, column, match_text)
-                        column += len(match_text)
+        text = self.file_contents
+        positions = self.positions
+        pos = 0
+        while True:
+            line_end = text.find("\n", pos)
+            if line_end == -1:
+                line_end = len(text)
+
+            while pos < line_end:
+                for regexp, token_type in _COMPILED_TOKEN_MAPPING:
+                    match = regexp.match(text, pos, line_end)
+                    if match is not None:
+                        match_text = match.group(1)
+                        yield Token(token_type, None, None, match_text, pos, positions)
+                        pos += len(match_text)
                         break
                 else:
-                    raise DbSyntaxError(
-                        "No matching rules found at {}:{}. Line contents: '{}'".format(
-                            linenum, column, line
-                        )
-                    )
+                    raise Lexer.no_matching_rules_error(positions, pos)
+
+            if line_end == len(text):
+                break
+            pos = line_end + 1
+
+        yield Token(TokenTypes.EOF, None, None, None, len(text), positions)
 
-        yield Token(TokenTypes.EOF, len(lines), len(lines[len(lines) - 1]))
+    @staticmethod
+    def no_matching_rules_error(positions, offset):
+        """
+        Returns:
+            DbSyntaxError for a position in a file which does not match any of the rules
+        """
+        line, col = positions.line_and_column(offset)
+        return DbSyntaxError(
+            "No matching rules found at {}:{}. Line contents: '{}'".format(
+                line, col, positions.line_text(line)
+            ),
+            line,
+            col,
+            positions.excerpt(offset),
+        )
 
     def __next__(self):
         """
@@ -130,18 +181,10 @@ class Lexer:
             tok = next(self.gen)
         return tok
 
-    @staticmethod
-    def _text_matches_regex(text, rx):
-        """
-        Attempts to match the given text with a given regex.
 
-        Args:
-            text:
-            rx: the regex to apply
-        Returns:
-             The text of the match if the match succeeded, None otherwise
-        """
-        match = re.match(rx, text)
-        if match:
-            return match.group(1)
-        return None
+"""
+The rules of Lexer.TOKEN_MAPPING, in order, with their regexes compiled.
+"""
+_COMPILED_TOKEN_MAPPING = [
+    (re.compile(regexp), token_type) for regexp, token_type in Lexer.TOKEN_MAPPING.items()
+]
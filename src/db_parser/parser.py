@@ -1,16 +1,20 @@
 from contextlib import contextmanager
 
-from src.db_parser.common import DbSyntaxError
+from src.db_parser.common import UNKNOWN_OFFSET, DbSyntaxError, ParsedDb
 from src.db_parser.tokens import TokenTypes
 
 
 class Parser(object):
     """
     Main db_parser. Takes input tokens from the given lexer and builds an EPICS DB out of them.
+    Args:
+        lexer: the lexer to take tokens from
+        record_filter: optional RecordFilter. Records and fields it excludes are skipped rather than returned.
     """
 
-    def __init__(self, lexer):
+    def __init__(self, lexer, record_filter=None):
         self.lexer = lexer
+        self.record_filter = record_filter
         self.current_token = None
         self.next_token()
 
@@ -39,17 +43,22 @@ class Parser(object):
 
     def raise_error(self, message):
         """
-        Error function if an unexpected token was encountered. Line numbers and current token information will be added.
+        Error function if an unexpected token was encountered. Line numbers, current token information and (if the
+        token's position in the file is known) an excerpt of the file will be added.
         Args:
             message: A message to add to the error
         """
-        if self.current_token is None:
+        token = self.current_token
+        if token is None:
             raise DbSyntaxError("No tokens found.")
         else:
             raise DbSyntaxError(
                 "Unexpected token '{}' encountered at {}:{}: {}".format(
-                    self.current_token, self.current_token.line, self.current_token.col, message
-                )
+                    token, token.line, token.col, message
+                ),
+                token.line,
+                token.col,
+                token.excerpt(),
             )
 
     @contextmanager
@@ -76,6 +85,17 @@ class Parser(object):
         """
         return self.delimited_block(start=TokenTypes.L_BRACE, end=TokenTypes.R_BRACE)
 
+    def skip_brace_delimited_block(self):
+        """
+        Consumes a block surrounded by braces without interpreting its contents.
+        """
+        self.consume(TokenTypes.L_BRACE)
+        while self.current_token.type != TokenTypes.R_BRACE:
+            if self.current_token.type == TokenTypes.EOF:
+                self.raise_error("Expected '{}'.".format(TokenTypes.R_BRACE))
+            self.next_token()
+        self.consume(TokenTypes.R_BRACE)
+
     def value(self):
         """
         Handler for values which are allowed to be quoted or not.
@@ -141,7 +161,7 @@ class Parser(object):
         with self.bracket_delimited_block():
             return self.value()
 
-    def record(self):
+    def record(self, offsets=None):
         """
         Handler for an EPICS DB record.
         Example:
@@ -158,14 +178,29 @@ class Parser(object):
                 "fields": list of fields. Each item in the list is a (key, value) tuple
                 "infos": list of info fields. Each item in the list is a (key, value) tuple
                 "aliases": list of record names aliased to this record
+            or None if the record is excluded by the record filter.
+        Args:
+            offsets: optional array to append the offsets of the record and its fields to (see ParsedDb)
         """
         fields = []
         infos = []
         aliases = []
 
+        record_offset = self._current_offset()
         self.consume(TokenTypes.RECORD)
         record_type, record_name = self.key_value_pair()
 
+        record_filter = self.record_filter
+        if record_filter is not None and not record_filter.includes_record(
+            record_type, record_name
+        ):
+            if self.current_token.type == TokenTypes.L_BRACE:
+                self.skip_brace_delimited_block()
+            return None
+
+        if offsets is not None:
+            offsets.append(record_offset)
+
         # Special case for records with no body
         if self.current_token.type != TokenTypes.L_BRACE:
             return {
@@ -179,7 +214,12 @@ class Parser(object):
         with self.brace_delimited_block():
             while self.current_token.type != TokenTypes.R_BRACE:
                 if self.current_token.type == TokenTypes.FIELD:
-                    fields.append(self.field())
+                    field_offset = self._current_offset()
+                    field = self.field()
+                    if record_filter is None or record_filter.includes_field(field[0]):
+                        fields.append(field)
+                        if offsets is not None:
+                            offsets.append(field_offset)
                 elif self.current_token.type == TokenTypes.INFO:
                     infos.append(self.info())
                 elif self.current_token.type == TokenTypes.ALIAS:
@@ -195,6 +235,10 @@ class Parser(object):
             "aliases": aliases,
         }
 
+    def _current_offset(self):
+        offset = self.current_token.offset
+        return offset if offset is not None else UNKNOWN_OFFSET
+
     def alias(self):
         """
         Handler for an EPICS alias (DB level).
@@ -210,12 +254,15 @@ class Parser(object):
         """
         Top-level handler for an EPICS DB. A db is described as being a collection of records.
         Returns:
-            List of records, aliases where each record follows the format described in  record()
+            ParsedDb of records, aliases where each record follows the format described in  record(). Records excluded
+            by the record filter are not included.
         """
-        records = []
+        records = ParsedDb()
         while self.current_token.type != TokenTypes.EOF:
             if self.current_token.type == TokenTypes.RECORD:
-                records.append(self.record())
+                record = self.record(records.offsets)
+                if record is not None:
+                    records.append(record)
             elif self.current_token.type == TokenTypes.ALIAS:
                 pv, alias = self.alias()
                 # Find the record that this alias belongs to, and add the alias to it.
@@ -0,0 +1,242 @@
+import re
+
+from src.db_parser.common import DbSyntaxError
+from src.field_values import canonical_number, canonical_value
+from src.release_cache import load_cached_release_data
+from src.release_sources import release_source, walk_source
+
+SCHEMA_CACHE_VERSION = 2
+
+"""
+Field types whose values are numbers, and so default to 0 if no initial value is given.
+"""
+NUMERIC_DBF_TYPES = frozenset(
+    [
+        "DBF_CHAR",
+        "DBF_UCHAR",
+        "DBF_SHORT",
+        "DBF_USHORT",
+        "DBF_LONG",
+        "DBF_ULONG",
+        "DBF_INT64",
+        "DBF_UINT64",
+        "DBF_FLOAT",
+        "DBF_DOUBLE",
+        "DBF_ENUM",
+    ]
+)
+
+_DBD_TOKEN = re.compile(
+    r"""
+    (?P<skip>\s+|\#[^\n]*|%[^\n]*)      # whitespace, comments and C code passed through to generated headers
+    |(?P<string>"(?:[^"\\\n]|\\.)*")
+    |(?P<punctuation>[(){},])
+    |(?P<word>[^\s(){},"\#%]+)
+    """,
+    re.VERBOSE,
+)
+
+
+def _dbd_tokens(text):
+    """
+    Generator of the significant tokens in a DBD file.
+    Yields:
+        tuples of (kind, text), where kind is "string", "punctuation" or "word". Strings have their quotes removed.
+    """
+    pos = 0
+    for match in _DBD_TOKEN.finditer(text):
+        if match.start() != pos:
+            break
+        pos = match.end()
+        kind = match.lastgroup
+        if kind == "string":
+            yield kind, match.group()[1:-1]
+        elif kind != "skip":
+            yield kind, match.group()
+
+    if pos != len(text):
+        raise DbSyntaxError(
+            "No matching rules found in DBD at line {}".format(text.count("\n", 0, pos) + 1)
+        )
+
+
+def parse_dbd(text):
+    """
+    Parses a DBD file into a list of statements. DBD files consist of statements of the form
+    keyword(arg1, arg2) { nested statements }, where the arguments and the body are optional, or keyword "string".
+    Returns:
+        list of (keyword, list of arguments, list of nested statements)
+    """
+    tokens = list(_dbd_tokens(text))
+    statements, pos = _parse_statements(tokens, 0)
+    if pos != len(tokens):
+        raise DbSyntaxError("Unexpected '{}' in DBD".format(tokens[pos][1]))
+    return statements
+
+
+def _parse_statements(tokens, pos):
+    statements = []
+    while pos < len(tokens) and tokens[pos] != ("punctuation", "}"):
+        kind, keyword = tokens[pos]
+        if kind != "word":
+            raise DbSyntaxError("Expected a keyword in DBD but got '{}'".format(keyword))
+        pos += 1
+
+        args, body = [], []
+        if pos < len(tokens) and tokens[pos][0] == "string":
+            args.append(tokens[pos][1])
+            pos += 1
+        elif pos < len(tokens) and tokens[pos] == ("punctuation", "("):
+            pos += 1
+            while pos < len(tokens) and tokens[pos] != ("punctuation", ")"):
+                if tokens[pos] != ("punctuation", ","):
+                    args.append(tokens[pos][1])
+                pos += 1
+            if pos == len(tokens):
+                raise DbSyntaxError("Unterminated arguments to '{}' in DBD".format(keyword))
+            pos += 1
+
+        if pos < len(tokens) and tokens[pos] == ("punctuation", "{"):
+            body, pos = _parse_statements(tokens, pos + 1)
+            if pos == len(tokens):
+                raise DbSyntaxError("Unterminated body of '{}' in DBD".format(keyword))
+            pos += 1
+
+        statements.append((keyword, args, body))
+    return statements, pos
+
+
+class RecordTypeSchema(object):
+    """
+    The record types, fields and default values defined by the DBD files of a release.
+    """
+
+    def __init__(self, record_types=None, menus=None, devices=None):
+        """
+        Args:
+            record_types: dict of record type -> dict of field name -> [DBF type, initial value or None, menu or None]
+            menus: dict of menu name -> list of choice strings, in index order
+            devices: dict of record type -> choice string of the first device support defined for it
+        """
+        self.record_types = record_types if record_types is not None else {}
+        self.menus = menus if menus is not None else {}
+        self.devices = devices if devices is not None else {}
+
+    def add_dbd(self, text):
+        """
+        Adds the definitions in a DBD file to this schema. Where a record type, menu or device is defined more than
+        once, the first definition is kept.
+        """
+        for keyword, args, body in parse_dbd(text):
+            if keyword == "menu" and args:
+                self.menus.setdefault(
+                    args[0], [a[1] for k, a, _ in body if k == "choice" and len(a) >= 2]
+                )
+            elif keyword == "recordtype" and args:
+                self.record_types.setdefault(args[0], self._record_type_fields(body))
+            elif keyword == "device" and len(args) >= 4:
+                self.devices.setdefault(args[0], args[3])
+
+    @staticmethod
+    def _record_type_fields(body):
+        fields = {}
+        for keyword, args, field_body in body:
+            if keyword == "field" and len(args) >= 2:
+                attributes = {k: a[0] for k, a, _ in field_body if a}
+                fields[args[0]] = [args[1], attributes.get("initial"), attributes.get("menu")]
+        return fields
+
+    def default_value(self, record_type, field_name):
+        """
+        Returns:
+            the default value of the field in records of the given type, or None if it is not known.
+        """
+        field = self.record_types.get(record_type, {}).get(field_name)
+        if field is None:
+            return None
+
+        dbf_type, initial, menu = field
+        if initial is not None:
+            return initial
+        elif dbf_type == "DBF_MENU":
+            choices = self.menus.get(menu)
+            return choices[0] if choices else None
+        elif dbf_type == "DBF_DEVICE":
+            return self.devices.get(record_type)
+        elif dbf_type in NUMERIC_DBF_TYPES:
+            return "0"
+        else:
+            return ""
+
+    def is_default_value(self, record_type, field_name, value):
+        """
+        Returns whether the given value of a field is the same as the field's default, so that removing the field from
+        a record does not change the record's behaviour.
+        """
+        default = self.default_value(record_type, field_name)
+        if default is None:
+            return False
+        dbf_type, _, menu = self.record_types[record_type][field_name]
+
+        if dbf_type == "DBF_MENU" and menu in self.menus:
+            choices = self.menus[menu]
+            try:
+                index = int(value)
+                value = choices[index] if 0 <= index < len(choices) else value
+            except ValueError:
+                pass
+        elif dbf_type in NUMERIC_DBF_TYPES:
+            number = canonical_number(value.strip())
+            if number is not None:
+                return number == canonical_number(default.strip())
+
+        return canonical_value(field_name, value, record_type) == canonical_value(
+            field_name, default, record_type
+        )
+
+    def to_dict(self):
+        return {"record_types": self.record_types, "menus": self.menus, "devices": self.devices}
+
+    @staticmethod
+    def from_dict(data):
+        return RecordTypeSchema(
+            record_types=data["record_types"], menus=data["menus"], devices=data["devices"]
+        )
+
+
+def build_release_schema(release_path, path_matcher):
+    """
+    Builds the schema for a release (a directory or archive) by parsing all of its DBD files. DBD files which cannot be
+    parsed are skipped.
+    """
+    source = release_source(release_path, path_matcher)
+    schema = RecordTypeSchema()
+    for path in walk_source(source, path_matcher):
+        try:
+            schema.add_dbd(source.read(path))
+        except (IOError, UnicodeDecodeError, DbSyntaxError):
+            continue
+    return schema
+
+
+def load_release_schema(release_path, path_matcher, cache_dir=None):
+    """
+    Loads the schema for a release, building it only if it is not already cached on disk (see
+    load_cached_release_data), so the DBD files are only parsed again if one of them has changed.
+    Args:
+        release_path: path to the release
+        path_matcher: PathMatcher selecting the DBD files of the release
+        cache_dir: directory to cache schemas in. Schemas are not cached if None.
+    Returns:
+        RecordTypeSchema for the release
+    """
+    return RecordTypeSchema.from_dict(
+        load_cached_release_data(
+            cache_dir,
+            "schema",
+            SCHEMA_CACHE_VERSION,
+            release_path,
+            path_matcher,
+            lambda path, matcher: build_release_schema(path, matcher).to_dict(),
+        )
+    )
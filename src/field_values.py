@@ -0,0 +1,269 @@
+import functools
+import math
+import re
+
+"""
+Number of (field name, value) pairs to remember canonical values for. The same values occur many times across a
+release, so a bounded cache is enough to make normalisation nearly free.
+"""
+CANONICAL_VALUE_CACHE_SIZE = 65536
+
+
+class FieldKinds(object):
+    NUMERIC = "NUMERIC"
+    MENU = "MENU"
+    LINK = "LINK"
+    STRING = "STRING"
+
+
+"""
+Choices of the EPICS base menus, in index order, keyed by the fields that use them. A menu field may be given either
+as the choice string or as its index.
+"""
+_PINI_CHOICES = ["NO", "YES", "RUN", "RUNNING", "PAUSE", "PAUSED"]
+_SCAN_CHOICES = [
+    "Passive",
+    "Event",
+    "I/O Intr",
+    "10 second",
+    "5 second",
+    "2 second",
+    "1 second",
+    ".5 second",
+    ".2 second",
+    ".1 second",
+]
+_ALARM_SEVERITY_CHOICES = ["NO_ALARM", "MINOR", "MAJOR", "INVALID"]
+_YES_NO_CHOICES = ["NO", "YES"]
+_FIELD_TYPE_CHOICES = [
+    "STRING",
+    "CHAR",
+    "UCHAR",
+    "SHORT",
+    "USHORT",
+    "LONG",
+    "ULONG",
+    "INT64",
+    "UINT64",
+    "FLOAT",
+    "DOUBLE",
+    "ENUM",
+]
+
+MENU_FIELDS = {
+    "PINI": _PINI_CHOICES,
+    "SCAN": _SCAN_CHOICES,
+    "PRIO": ["LOW", "MEDIUM", "HIGH"],
+    "SIMM": ["NO", "YES", "RAW"],
+    "OMSL": ["supervisory", "closed_loop"],
+    "IVOA": ["Continue normally", "Don't drive outputs", "Set output to IVOV"],
+    "ACKT": _YES_NO_CHOICES,
+    "FTVL": _FIELD_TYPE_CHOICES,
+}
+for _letter in "ABCDEFGHIJKLMNOPQRSTU":  # The types of the inputs and outputs of aSub records
+    MENU_FIELDS["FT" + _letter] = _FIELD_TYPE_CHOICES
+    MENU_FIELDS["FTV" + _letter] = _FIELD_TYPE_CHOICES
+for _severity_field in [
+    "DISS",
+    "HHSV",
+    "HSV",
+    "LSV",
+    "LLSV",
+    "ZSV",
+    "OSV",
+    "COSV",
+    "SIMS",
+    "UNSV",
+    "ZRSV",
+    "ONSV",
+    "TWSV",
+    "THSV",
+    "FRSV",
+    "FVSV",
+    "SXSV",
+    "SVSV",
+    "EISV",
+    "NISV",
+    "TESV",
+    "ELSV",
+    "TVSV",
+    "TTSV",
+    "FTSV",
+    "FFSV",
+]:
+    MENU_FIELDS.setdefault(_severity_field, _ALARM_SEVERITY_CHOICES)
+
+"""
+Fields which hold numbers in the common record types. Values which do not parse as numbers are left as strings. In
+the record types in STRING_VALUE_RECORD_TYPES, VAL holds a string instead.
+"""
+NUMERIC_FIELDS = frozenset(
+    [
+        "VAL",
+        "PREC",
+        "HOPR",
+        "LOPR",
+        "DRVH",
+        "DRVL",
+        "HIHI",
+        "HIGH",
+        "LOW",
+        "LOLO",
+        "HYST",
+        "ADEL",
+        "MDEL",
+        "EGUF",
+        "EGUL",
+        "ESLO",
+        "EOFF",
+        "ASLO",
+        "AOFF",
+        "SMOO",
+        "ROFF",
+        "OROC",
+        "DISV",
+        "DISP",
+        "PHAS",
+        "NELM",
+        "NOBT",
+        "MASK",
+        "SHFT",
+        "TSE",
+        "ODLY",
+        "DLY",
+        "ZRVL",
+        "ONVL",
+        "TWVL",
+        "THVL",
+        "FRVL",
+        "FVVL",
+        "SXVL",
+        "SVVL",
+        "EIVL",
+        "NIVL",
+        "TEVL",
+        "ELVL",
+        "TVVL",
+        "TTVL",
+        "FFVL",
+    ]
+)
+
+"""
+Record types whose VAL field holds a string rather than a number, so that e.g. "1.0" and "1" are different values.
+"""
+STRING_VALUE_RECORD_TYPES = frozenset(["stringin", "stringout", "lsi", "lso", "printf"])
+
+"""
+Fields which hold links. As well as the single fields, calc-like records have INPA-INPU/OUTA-OUTU, and fanout/seq
+records have LNK0-LNKF/DOL0-DOLF.
+"""
+LINK_FIELDS = frozenset(
+    ["INP", "OUT", "FLNK", "DOL", "SDIS", "SIML", "SIOL", "TSEL", "SELL", "NVL", "SUBL", "SGNL"]
+)
+_LINK_FIELD_FAMILY = re.compile(r"^(?:(?:INP|OUT)[A-U]|(?:LNK|DOL)[0-9A-F])$")
+
+LINK_FLAGS = frozenset(["PP", "NPP", "CP", "CPP", "CA", "MS", "NMS", "MSS", "MSI"])
+
+"""
+Link flags which are the defaults and so equivalent to not giving a flag at all.
+"""
+DEFAULT_LINK_FLAGS = frozenset(["NPP", "NMS"])
+
+
+@functools.lru_cache(maxsize=None)
+def field_kind(field_name, record_type=None):
+    """
+    Args:
+        field_name: the name of the field
+        record_type: the type of the record the field is in, or None if it is not known
+    Returns:
+        the kind of value held by the named field. One of FieldKinds
+    """
+    if field_name in MENU_FIELDS:
+        return FieldKinds.MENU
+    if field_name in LINK_FIELDS or _LINK_FIELD_FAMILY.match(field_name):
+        return FieldKinds.LINK
+    if field_name in NUMERIC_FIELDS:
+        if field_name == "VAL" and record_type in STRING_VALUE_RECORD_TYPES:
+            return FieldKinds.STRING
+        return FieldKinds.NUMERIC
+    return FieldKinds.STRING
+
+
+def canonical_number(value):
+    """
+    Returns:
+        canonical form of a number written in any of the forms EPICS accepts (e.g. "1", "1.0", "1e0", "0x1"), or None
+        if the value is not a number. Integers are kept exact, however large they are.
+    """
+    try:
+        return str(int(value, 0))
+    except ValueError:
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+
+    if math.isnan(number) or math.isinf(number):
+        return repr(number)
+    if number.is_integer():
+        return str(int(number))
+    return repr(number)
+
+
+def _canonical_menu(field_name, value):
+    choices = MENU_FIELDS[field_name]
+    try:
+        index = int(value)
+    except ValueError:
+        return value
+    return choices[index] if 0 <= index < len(choices) else value
+
+
+def _canonical_link(value):
+    if not value or value[0] in "@#":  # Hardware links are passed through to device support as-is.
+        return value
+
+    number = canonical_number(value)
+    if number is not None:  # Constant link
+        return number
+
+    parts = value.split()
+    flags = parts[1:]  # Flags are case sensitive, e.g. "ms" is not MS
+    if any(flag not in LINK_FLAGS for flag in flags):
+        return " ".join(parts)
+
+    target = parts[0][: -len(".VAL")] if parts[0].endswith(".VAL") else parts[0]
+    return " ".join(
+        [target] + sorted(flag for flag in set(flags) if flag not in DEFAULT_LINK_FLAGS)
+    )
+
+
+@functools.lru_cache(maxsize=CANONICAL_VALUE_CACHE_SIZE)
+def canonical_value(field_name, value, record_type=None):
+    """
+    Converts a field value to a canonical form, so that values which EPICS treats identically compare equal.
+    Examples:
+        canonical_value("PREC", "1.0") == canonical_value("PREC", "1")
+        canonical_value("PINI", "1") == canonical_value("PINI", "YES")
+        canonical_value("INP", "$(P)X  MS CP") == canonical_value("INP", "$(P)X CP MS")
+    Args:
+        field_name: the name of the field, which determines how its value is interpreted
+        value: the value of the field as written in the DB
+        record_type: the type of the record the field is in, or None if it is not known
+    Returns:
+        the canonical value
+    """
+    kind = field_kind(field_name, record_type)
+    if kind == FieldKinds.STRING:
+        return value
+
+    value = value.strip()
+    if kind == FieldKinds.NUMERIC:
+        number = canonical_number(value)
+        return number if number is not None else value
+    elif kind == FieldKinds.MENU:
+        return _canonical_menu(field_name, value)
+    else:
+        return _canonical_link(value)
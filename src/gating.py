@@ -0,0 +1,74 @@
+from src.db_diff import ChangeKinds, DifferenceKinds
+
+"""
+Kinds of change which a comparison can be made to fail on, by the names they are given on the command line. Each is
+either a kind of DbChange or a kind of Difference.
+"""
+FAIL_ON_KINDS = {
+    "removed-records": DifferenceKinds.RECORD_REMOVED,
+    "removed-fields": DifferenceKinds.FIELD_REMOVED,
+    "changed-fields": DifferenceKinds.FIELD_CHANGED,
+    "deleted-dbs": ChangeKinds.DELETED,
+    "parse-errors": ChangeKinds.PARSE_ERROR,
+    "broken-links": DifferenceKinds.LINK_BROKEN,
+}
+
+"""
+Kinds of change in FAIL_ON_KINDS which are only found when links are checked.
+"""
+LINK_FAIL_ON_KINDS = {"broken-links"}
+
+"""
+Exit code of a comparison which found more changes of the kinds it fails on than its budget allows. This is distinct
+from the exit codes for invalid arguments (2) and invalid releases (1), so that CI can tell a failed check from a
+broken one.
+"""
+EXIT_OVER_BUDGET = 3
+
+
+class ChangeBudget(object):
+    """
+    Counts the changes of some kinds found by a comparison, and stops the comparison as soon as there are more of them
+    than are allowed.
+    Args:
+        kinds: the kinds of DbChange or Difference to count. Should be values of FAIL_ON_KINDS.
+        max_changes: the number of changes of those kinds which are allowed
+    """
+
+    def __init__(self, kinds, max_changes=0):
+        self.kinds = frozenset(kinds)
+        self.max_changes = max_changes
+        self.found = 0
+
+    @property
+    def exceeded(self):
+        """
+        Whether more changes of the counted kinds have been found than are allowed.
+        """
+        return self.found > self.max_changes
+
+    def count(self, change):
+        """
+        Returns:
+            the number of changes of the counted kinds in a DbChange: the change itself and each of its differences
+        """
+        found = 1 if change.kind in self.kinds else 0
+        return found + sum(1 for difference in change.differences if difference.kind in self.kinds)
+
+    def limit(self, changes):
+        """
+        Generator that returns changes until the budget is exceeded. The change which exceeds it is returned, and then
+        the changes are closed (if they are a generator), so that no more work is done to find them.
+        Args:
+            changes: iterable of DbChanges, e.g. DbChangesIterator.change_descriptions()
+        """
+        try:
+            for change in changes:
+                self.found += self.count(change)
+                yield change
+                if self.exceeded:
+                    return
+        finally:
+            close = getattr(changes, "close", None)
+            if close is not None:
+                close()
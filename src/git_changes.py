@@ -0,0 +1,225 @@
+import os
+import subprocess
+
+from src.db_diff import (
+    DEFAULT_MAX_TEXT_DIFF_SIZE,
+    DEFAULT_PARSER,
+    ChangeKinds,
+    DbChange,
+    DbDiffer,
+)
+from src.db_iterators import whole_tree_path_matcher
+from src.release_sources import decode_text
+
+"""
+Git file modes of regular files. Other tree entries (symlinks and submodules) are never compared.
+"""
+GIT_FILE_MODES = ["100644", "100755"]
+
+"""
+Object ID git uses for a side of a change on which the path does not exist.
+"""
+GIT_NULL_OID = "0" * 40
+
+
+class GitRepository(object):
+    """
+    Reads objects from a local git repository by running git.
+    Args:
+        path: the path to the repository (or any directory in its working tree)
+        git: the git executable to run
+    """
+
+    def __init__(self, path, git="git"):
+        self.path = path
+        self.git = git
+
+    def _command(self, *args):
+        return [self.git, "-C", self.path] + list(args)
+
+    def _run(self, *args):
+        """
+        Runs a git command.
+        Returns:
+            the output of the command, as bytes
+        Raises:
+            ValueError: if the command fails, e.g. because a revision does not exist, or git can not be run
+        """
+        try:
+            result = subprocess.run(
+                self._command(*args), stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+        except OSError as e:
+            raise ValueError("git {} failed: {}".format(" ".join(args), e))
+        if result.returncode != 0:
+            raise ValueError(
+                "git {} failed: {}".format(
+                    " ".join(args), result.stderr.decode("utf-8", "replace").strip()
+                )
+            )
+        return result.stdout
+
+    def changed_files(self, old_revision, new_revision):
+        """
+        Finds the files which differ between two revisions by comparing their trees. Git compares the object IDs of
+        trees and blobs, so unchanged directories and files are never read.
+        Args:
+            old_revision: the old revision, e.g. a tag or commit
+            new_revision: the new revision
+        Returns:
+            list of tuples of (path using "/" separators, object ID of the old blob, object ID of the new blob), sorted
+            by path. The object ID is None on the side where the path is not a regular file.
+        """
+        output = self._run(
+            "diff-tree", "-r", "-z", "--no-renames", old_revision, new_revision, "--"
+        )
+        # Each change is ":old_mode new_mode old_oid new_oid status" followed by the path, each terminated by NUL.
+        fields = output.split(b"\0")
+        changes = []
+        for header, path in zip(fields[0:-1:2], fields[1::2]):
+            old_mode, new_mode, old_oid, new_oid, _ = header[1:].decode("ascii").split(" ")
+            old_oid = old_oid if old_mode in GIT_FILE_MODES and old_oid != GIT_NULL_OID else None
+            new_oid = new_oid if new_mode in GIT_FILE_MODES and new_oid != GIT_NULL_OID else None
+            if old_oid is not None or new_oid is not None:
+                changes.append((path.decode("utf-8", "surrogateescape"), old_oid, new_oid))
+        return sorted(changes)
+
+    def blob_reader(self):
+        """
+        Returns:
+            a GitBlobReader for this repository, which should be closed (or used as a context manager) when done
+        """
+        return GitBlobReader(self._command("cat-file", "--batch"))
+
+
+class GitBlobReader(object):
+    """
+    Reads blobs from a single long-running "git cat-file --batch" process, so that reading each blob doesn't start a
+    new process. Blobs are requested one at a time, so only the blobs which are needed are ever read.
+    Args:
+        command: the command which runs "git cat-file --batch"
+    Raises:
+        ValueError: if git can not be run
+    """
+
+    def __init__(self, command):
+        try:
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        except OSError as e:
+            raise ValueError("{} failed: {}".format(" ".join(command), e))
+
+    def read(self, oid):
+        """
+        Returns:
+            the contents of the blob with the given object ID, as bytes
+        Raises:
+            ValueError: if the blob does not exist
+        """
+        self._process.stdin.write("{}\n".format(oid).encode("ascii"))
+        self._process.stdin.flush()
+
+        header = self._process.stdout.readline().decode("ascii").split()
+        if len(header) != 3 or header[1] != "blob":
+            raise ValueError("Unable to read blob {} from git: {}".format(oid, " ".join(header)))
+        # The contents are followed by a newline
+        data = self._process.stdout.read(int(header[2]) + 1)
+        return data[:-1]
+
+    def close(self):
+        self._process.stdin.close()
+        self._process.stdout.close()
+        self._process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class GitDbChangesIterator(object):
+    """
+    Finds the changes to DB files between two revisions of a git repository, in the same way as DbChangesIterator
+    finds them between two releases. Only the contents of DBs which git reports as changed are read.
+    """
+
+    def __init__(
+        self,
+        repository,
+        old_revision,
+        new_revision,
+        report_additions=False,
+        path_matcher=None,
+        record_filter=None,
+        normalise_values=True,
+        text_diff=False,
+        max_text_diff_size=DEFAULT_MAX_TEXT_DIFF_SIZE,
+        parser=DEFAULT_PARSER,
+    ):
+        """
+        Args:
+            repository: the GitRepository to compare revisions of
+            old_revision: the old revision to be compared, e.g. a tag or commit
+            new_revision: the new revision to compare
+            path_matcher: PathMatcher deciding which files are compared. Defaults to whole_tree_path_matcher()
+            Other arguments are as for DbChangesIterator.
+        """
+        self.repository = repository
+        self.old_revision = old_revision
+        self.new_revision = new_revision
+        self.report_additions = report_additions
+        self.path_matcher = path_matcher if path_matcher is not None else whole_tree_path_matcher()
+        self.record_filter = record_filter
+        self.differ = DbDiffer(
+            old_revision,
+            new_revision,
+            report_additions=report_additions,
+            record_filter=record_filter,
+            normalise_values=normalise_values,
+            text_diff=text_diff,
+            max_text_diff_size=max_text_diff_size,
+            parser=parser,
+        )
+
+    def changed_dbs(self):
+        """
+        Returns:
+            list of tuples of (relative path to the DB, object ID in the old revision, object ID in the new revision)
+            for each DB which differs between the revisions. The object ID is None on the side the DB does not exist.
+        """
+        dbs = []
+        for path, old_oid, new_oid in self.repository.changed_files(
+            self.old_revision, self.new_revision
+        ):
+            path = path.replace("/", os.sep)
+            if not self.path_matcher.is_path_included(path):
+                continue
+            if self.record_filter is not None and not self.record_filter.includes_path(path):
+                continue
+            dbs.append((path, old_oid, new_oid))
+        return dbs
+
+    def change_descriptions(self):
+        """
+        Generator that returns the changes for each DB, as DbChangesIterator.change_descriptions does: changed DBs,
+        then deleted DBs, then (if additions are being reported) added DBs.
+        """
+        deleted, added = [], []
+        with self.repository.blob_reader() as blobs:
+            for db, old_oid, new_oid in self.changed_dbs():
+                if old_oid is not None and new_oid is not None:
+                    diff = self.differ.diff_db_contents(
+                        db, decode_text(blobs.read(old_oid)), decode_text(blobs.read(new_oid))
+                    )
+                    if diff is not None:
+                        yield diff
+                elif old_oid is not None:
+                    deleted.append(db)
+                elif self.report_additions:
+                    added.append(db)
+
+        for db in deleted:
+            yield DbChange(ChangeKinds.DELETED, db, "A DB file was deleted from {}".format(db))
+
+        for db in added:
+            yield DbChange(ChangeKinds.ADDED, db, "A DB file was added at {}".format(db))
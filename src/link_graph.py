@@ -0,0 +1,134 @@
+import re
+from collections import OrderedDict, namedtuple
+
+from src.db_diff import ChangeKinds, DbChange, Difference, DifferenceKinds
+from src.field_values import LINK_FLAGS, FieldKinds, canonical_number, field_kind
+
+"""
+A field of a record which links to another record.
+Fields:
+    db_path: the path of the DB holding the linking record, relative to the release
+    record: the name of the linking record
+    field: the name of the link field
+    target: the name of the record linked to
+"""
+LinkReference = namedtuple("LinkReference", ["db_path", "record", "field", "target"])
+
+"""
+Matches a link to a field of a record, e.g. "$(P)TEMP.HIHI", separating the record name from the field name.
+"""
+_FIELD_SUFFIX = re.compile(r"^(.+)\.([A-Z][A-Z0-9]*)$")
+
+
+def link_target(value):
+    """
+    Finds the record a link field points at. Flags (e.g. "PP", "CP", "MS") and any field name are removed, so links
+    to any field of a record with any flags give the same record.
+    Examples:
+        link_target("$(P)TEMP.HIHI CP MS") == "$(P)TEMP"
+        link_target("@asyn($(PORT))") is None
+    Args:
+        value: the value of the link field as written in the DB
+    Returns:
+        the name of the record linked to, or None if the link is empty, a constant, a hardware address or a JSON link
+    """
+    value = value.strip()
+    if not value or value[0] in '@#{["':
+        return None
+    if canonical_number(value) is not None:  # Constant link
+        return None
+
+    parts = value.split()
+    if any(flag.upper() not in LINK_FLAGS for flag in parts[1:]):
+        return None  # Not a link to a record, e.g. a string constant containing spaces
+
+    match = _FIELD_SUFFIX.match(parts[0])
+    return match.group(1) if match is not None else parts[0]
+
+
+class LinkGraph(object):
+    """
+    The links between the records of a release, with an index of the names of the records (and aliases) defined in
+    it. Each DB is added in a single pass over its parsed records, so the graph can be built as a release is walked.
+
+    Record names are compared as written, so links and records only match if they use the same macros.
+    """
+
+    def __init__(self):
+        self.record_dbs = {}  # Name of each record or alias -> path of the first DB defining it
+        self.links = []  # LinkReferences, in the order their DBs were added
+
+    def add_db(self, db_path, db):
+        """
+        Adds the records of a parsed DB, and their links, to the graph.
+        Args:
+            db_path: the path of the DB, relative to the release
+            db: the parsed DB
+        """
+        for record in db:
+            name = record["name"]
+            self.record_dbs.setdefault(name, db_path)
+            for alias in record["aliases"]:
+                self.record_dbs.setdefault(alias, db_path)
+            for field_name, value in record["fields"]:
+                if field_kind(field_name) == FieldKinds.LINK:
+                    target = link_target(value)
+                    if target is not None:
+                        self.links.append(LinkReference(db_path, name, field_name, target))
+
+    def defines(self, name):
+        """
+        Returns whether a record or alias with the given name is defined in any DB of the graph.
+        """
+        return name in self.record_dbs
+
+    def links_to(self, names):
+        """
+        Generator that returns the links to any of the named records, in the order their DBs were added.
+        """
+        names = set(names)
+        for link in self.links:
+            if link.target in names:
+                yield link
+
+    def broken_links(self, removed_records):
+        """
+        Generator that returns the links to records which were removed and are not defined anywhere in the graph. Links
+        to records which were moved to another DB are not broken.
+        Args:
+            removed_records: names of the records which were removed
+        """
+        return self.links_to(name for name in removed_records if not self.defines(name))
+
+    def broken_link_changes(self, removed_records):
+        """
+        Finds the DBs in the graph with links to removed records.
+        Args:
+            removed_records: names of the records which were removed
+        Returns:
+            list of DbChanges, one per DB with broken links, in the order the DBs were added
+        """
+        differences_by_db = OrderedDict()
+        for link in self.broken_links(removed_records):
+            differences_by_db.setdefault(link.db_path, []).append(
+                Difference(
+                    DifferenceKinds.LINK_BROKEN,
+                    "Field '{}' of record '{}' links to removed record '{}'".format(
+                        link.field, link.record, link.target
+                    ),
+                    record=link.record,
+                    field=link.field,
+                )
+            )
+
+        return [
+            DbChange(
+                ChangeKinds.BROKEN_LINKS,
+                db_path,
+                "DB at '{}' links to records which were removed.\n  - {}".format(
+                    db_path, "\n  - ".join(differences)
+                ),
+                differences,
+            )
+            for db_path, differences in differences_by_db.items()
+        ]
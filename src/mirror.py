@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from src.release_sources import release_source, walk_source
+
+DEFAULT_MIRROR_WORKERS = 8
+
+
+class MirrorResult(object):
+    """
+    Counts of what happened to the files of a release while mirroring it.
+    """
+
+    def __init__(self):
+        self.copied = 0  # Files whose contents were not in the store, so were copied
+        self.deduplicated = 0  # Files whose contents were already in the store
+        self.skipped = 0  # Files already mirrored by a previous (possibly interrupted) run
+        self.removed = 0  # Files mirrored by a previous run which are no longer in the release
+        self.bytes_copied = 0
+
+    def __str__(self):
+        return (
+            "{} files copied ({} bytes), {} deduplicated, {} already mirrored, {} removed".format(
+                self.copied, self.bytes_copied, self.deduplicated, self.skipped, self.removed
+            )
+        )
+
+
+class ReleaseMirror(object):
+    """
+    Mirrors the interesting files of releases into a local content-addressed store, so that comparisons can run off
+    local disk rather than the releases share.
+
+    Layout of the store:
+        objects/<first 2 characters of hash>/<sha256 of contents>: one copy of each distinct file contents
+        releases/<release>/<path>: each mirrored file, hard-linked to its object where possible
+        manifests/<release>.jsonl: one line per mirrored file, appended as each file completes
+
+    The releases directory can be used as the releases directory for comparisons. Files with identical contents
+    (within or across releases) are stored once. Mirroring is resumable: files which are in the manifest with the
+    same size and modification time as the source are not copied again. Releases are read as they are compared (see
+    release_source), so an archived release is mirrored as a directory.
+    """
+
+    def __init__(self, store_dir, path_matcher, workers=DEFAULT_MIRROR_WORKERS):
+        """
+        Args:
+            store_dir: the directory of the store
+            path_matcher: PathMatcher selecting which files of a release are mirrored
+            workers: the number of files to copy in parallel
+        """
+        self.store_dir = store_dir
+        self.path_matcher = path_matcher
+        self.workers = workers
+        self.objects_dir = os.path.join(store_dir, "objects")
+        self.releases_dir = os.path.join(store_dir, "releases")
+        self.manifests_dir = os.path.join(store_dir, "manifests")
+
+    def mirror(self, release_path, release_name):
+        """
+        Mirrors a release into the store. Files mirrored by a previous run which are no longer in the release are
+        removed, so that the mirrored release has the same files as the release.
+        Args:
+            release_path: the path to the release (a directory or archive) to mirror, e.g. on the releases share
+            release_name: the name to mirror the release as
+        Returns:
+            MirrorResult describing what was done
+        """
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        # Releases are only valid if they have an EPICS directory, even if no files in it are interesting.
+        mirrored_release_path = os.path.join(self.releases_dir, release_name)
+        os.makedirs(os.path.join(mirrored_release_path, "EPICS"), exist_ok=True)
+
+        manifest_path = os.path.join(self.manifests_dir, "{}.jsonl".format(release_name))
+        manifest = self._read_manifest(manifest_path)
+        source = release_source(release_path, self.path_matcher)
+        paths = list(walk_source(source, self.path_matcher))
+
+        result = MirrorResult()
+        with open(manifest_path, "a") as manifest_file, ThreadPoolExecutor(
+            max_workers=self.workers
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self._mirror_file, source, mirrored_release_path, path, manifest.get(path)
+                )
+                for path in paths
+            ]
+            for future in futures:
+                entry, outcome, size = future.result()
+                if outcome == "skipped":
+                    result.skipped += 1
+                    continue
+
+                if outcome == "copied":
+                    result.copied += 1
+                    result.bytes_copied += size
+                else:
+                    result.deduplicated += 1
+                manifest_file.write(json.dumps(entry) + "\n")
+                manifest_file.flush()
+
+        result.removed = self._remove_other_files(mirrored_release_path, set(paths))
+        return result
+
+    @staticmethod
+    def _remove_other_files(mirrored_release_path, paths):
+        """
+        Removes the files of a mirrored release which are not at the given paths, and the directories left empty by
+        doing so. The release's EPICS directory is always kept.
+        Returns:
+            the number of files removed
+        """
+        removed = 0
+        keep_directories = {mirrored_release_path, os.path.join(mirrored_release_path, "EPICS")}
+        for directory, _, files in os.walk(mirrored_release_path, topdown=False):
+            for name in files:
+                path = os.path.join(directory, name)
+                if os.path.relpath(path, mirrored_release_path) not in paths:
+                    os.remove(path)
+                    removed += 1
+            if directory not in keep_directories and not os.listdir(directory):
+                os.rmdir(directory)
+        return removed
+
+    @staticmethod
+    def _read_manifest(manifest_path):
+        """
+        Returns:
+            dict of relative path -> manifest entry for the files already mirrored. Later entries take precedence.
+        """
+        manifest = {}
+        try:
+            with open(manifest_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Partially written line from an interrupted run
+                    manifest[entry["path"]] = entry
+        except IOError:
+            pass
+        return manifest
+
+    def _mirror_file(self, source, mirrored_release_path, path, previous_entry):
+        """
+        Mirrors a single file. Runs on a worker thread.
+        Args:
+            source: the source to read the release from (see release_source)
+            mirrored_release_path: the path of the release in the store
+            path: the path of the file, relative to the release
+            previous_entry: the file's manifest entry from a previous run, or None if it was not mirrored before
+        Returns:
+            tuple of (manifest entry, "copied", "deduplicated" or "skipped", number of bytes in the file)
+        """
+        destination = os.path.join(mirrored_release_path, path)
+        size, mtime = source.stat(path) or (None, None)
+        entry = {"path": path, "size": size, "mtime": mtime}
+
+        if (
+            previous_entry is not None
+            and previous_entry["size"] == entry["size"]
+            and previous_entry.get("mtime") == entry["mtime"]
+            and os.path.exists(destination)
+        ):
+            return previous_entry, "skipped", entry["size"]
+
+        contents = source.read_bytes(path)
+        entry["size"] = len(contents)
+        entry["sha256"] = hashlib.sha256(contents).hexdigest()
+
+        object_path = self.object_path(entry["sha256"])
+        if os.path.exists(object_path):
+            outcome = "deduplicated"
+        else:
+            self._write_object(object_path, contents)
+            outcome = "copied"
+
+        self._link(object_path, destination)
+        return entry, outcome, entry["size"]
+
+    def _write_object(self, object_path, contents):
+        """
+        Writes the contents of a file to the store. The contents are written to a temporary file which is then renamed
+        into place, so an interrupted run never leaves a truncated object behind.
+        """
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        temporary_file = tempfile.NamedTemporaryFile(dir=self.objects_dir, delete=False)
+        try:
+            with temporary_file:
+                temporary_file.write(contents)
+            os.replace(temporary_file.name, object_path)
+        except Exception:
+            os.remove(temporary_file.name)
+            raise
+
+    def object_path(self, sha256):
+        """
+        Returns:
+            the path in the store of the file with the given contents hash
+        """
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    @staticmethod
+    def _link(object_path, destination):
+        """
+        Hard-links a mirrored file to its object, falling back to copying if hard links are not supported.
+        """
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if os.path.lexists(destination):
+            os.remove(destination)
+        try:
+            os.link(object_path, destination)
+        except OSError:
+            shutil.copyfile(object_path, destination)
@@ -0,0 +1,162 @@
+import os
+
+from src.db_diff import (
+    DEFAULT_CONTENT_CACHE_SIZE,
+    DEFAULT_MAX_TEXT_DIFF_SIZE,
+    DEFAULT_PARSER,
+    ChangeKinds,
+    DbChange,
+    DbDiffer,
+    LruCache,
+)
+from src.db_iterators import DbChangesIterator, whole_tree_path_matcher
+from src.release_sources import read_text_file
+
+
+def parse_path_pair(line):
+    """
+    Parses a line of a batch of paths to compare: the old path and the new path, separated by a tab (or, if neither
+    contains whitespace, by spaces). Blank lines and lines starting with '#' are ignored.
+    Returns:
+        tuple of (old path, new path), or None if the line should be ignored
+    Raises:
+        ValueError: if the line is not a pair of paths
+    """
+    line = line.rstrip("\r\n")
+    if not line.strip() or line.lstrip().startswith("#"):
+        return None
+    paths = line.split("\t") if "\t" in line else line.split()
+    if len(paths) != 2 or not all(paths):
+        raise ValueError("Expected an old and a new path separated by a tab, got '{}'".format(line))
+    return paths[0], paths[1]
+
+
+class PathComparer(object):
+    """
+    Compares two DB files, or the DBs in two directories, with no release layout. Parsed DBs and differences are cached
+    across comparisons, so comparing many pairs of paths in one process only parses each distinct DB once.
+
+    The paths of the changes found are the paths of the DBs as given: the new DB's, or the old DB's if it was deleted.
+    """
+
+    def __init__(
+        self,
+        path_matcher=None,
+        report_additions=False,
+        record_filter=None,
+        normalise_values=True,
+        text_diff=False,
+        max_text_diff_size=DEFAULT_MAX_TEXT_DIFF_SIZE,
+        parser=DEFAULT_PARSER,
+        content_cache_size=DEFAULT_CONTENT_CACHE_SIZE,
+    ):
+        """
+        Args:
+            path_matcher: PathMatcher deciding which DBs in directories are compared. Defaults to
+                whole_tree_path_matcher()
+            report_additions: Whether to also report DBs, records, fields, infos and aliases that were added
+            record_filter: Optional RecordFilter restricting which DBs, records and fields are compared. Path rules only
+                apply to DBs found in directories.
+            normalise_values: Whether to compare field values in their canonical form rather than as written
+            text_diff: Whether to show line diffs of DBs whose API is unchanged but whose significant tokens differ
+            max_text_diff_size: Size in characters above which line diffs are not computed
+            parser: The name of the parser engine to use. Should be one of PARSERS
+            content_cache_size: The number of parsed DBs, and of differences, to cache across comparisons
+        """
+        self.path_matcher = path_matcher if path_matcher is not None else whole_tree_path_matcher()
+        self.report_additions = report_additions
+        self.record_filter = record_filter
+        self.normalise_values = normalise_values
+        self.text_diff = text_diff
+        self.max_text_diff_size = max_text_diff_size
+        self.parser = parser
+        self._parsed_dbs = LruCache(content_cache_size)
+        self._db_differences = LruCache(content_cache_size)
+
+    def change_descriptions(self, old_path, new_path):
+        """
+        Generator that returns the changes between two DB files or two directories of DBs.
+        Raises:
+            ValueError: if the paths are not both files or both directories
+        """
+        if os.path.isdir(old_path) and os.path.isdir(new_path):
+            changes = self._directory_changes(old_path, new_path)
+        elif os.path.isfile(old_path) and os.path.isfile(new_path):
+            changes = self._file_changes(old_path, new_path)
+        else:
+            raise ValueError(
+                "Can not compare '{}' with '{}': they must both be files or both be directories".format(
+                    old_path, new_path
+                )
+            )
+        for change in changes:
+            yield change
+
+    def compare_pairs(self, lines, errors):
+        """
+        Generator that returns the changes between each pair of paths in a batch, in order.
+        Args:
+            lines: iterable of lines, each naming a pair of paths (see parse_path_pair)
+            errors: list to append the line number and description of each pair which could not be compared to. The
+                other pairs are still compared.
+        """
+        for line_number, line in enumerate(lines, 1):
+            try:
+                pair = parse_path_pair(line)
+                if pair is not None:
+                    for change in self.change_descriptions(*pair):
+                        yield change
+            except (IOError, UnicodeDecodeError, ValueError) as e:
+                errors.append((line_number, str(e)))
+
+    def _differ(self, old_path, new_path):
+        return DbDiffer(
+            old_path,
+            new_path,
+            report_additions=self.report_additions,
+            record_filter=self.record_filter,
+            normalise_values=self.normalise_values,
+            text_diff=self.text_diff,
+            max_text_diff_size=self.max_text_diff_size,
+            parser=self.parser,
+            parsed_db_cache=self._parsed_dbs,
+            differences_cache=self._db_differences,
+        )
+
+    def _file_changes(self, old_path, new_path):
+        old_contents = read_text_file(old_path)
+        new_contents = read_text_file(new_path)
+
+        if old_contents != new_contents:
+            change = self._differ(
+                os.path.dirname(old_path), os.path.dirname(new_path)
+            ).diff_db_contents(new_path, old_contents, new_contents, old_path, new_path)
+            if change is not None:
+                yield change
+
+    def _directory_changes(self, old_path, new_path):
+        iterator = DbChangesIterator(
+            old_path,
+            new_path,
+            report_additions=self.report_additions,
+            path_matcher=self.path_matcher,
+            record_filter=self.record_filter,
+            normalise_values=self.normalise_values,
+            text_diff=self.text_diff,
+            max_text_diff_size=self.max_text_diff_size,
+            parser=self.parser,
+            parsed_db_cache=self._parsed_dbs,
+            differences_cache=self._db_differences,
+        )
+        for change in iterator.change_descriptions():
+            if change.kind == ChangeKinds.DELETED:
+                db_path = os.path.join(old_path, change.db_path)
+                description = "A DB file was deleted from {}".format(db_path)
+            else:
+                db_path = os.path.join(new_path, change.db_path)
+                description = (
+                    "A DB file was added at {}".format(db_path)
+                    if change.kind == ChangeKinds.ADDED
+                    else str(change)
+                )
+            yield DbChange(change.kind, db_path, description, change.differences)
@@ -0,0 +1,201 @@
+import fnmatch
+import json
+import os
+import re
+
+REGEX_RULE_PREFIX = "re:"
+
+CONFIG_KEYS = ["interesting_directories", "exclude_directories", "include_files", "exclude_paths"]
+
+
+def compile_rules(rules):
+    """
+    Compiles a list of rules into a single regex which matches if any of the rules match.
+
+    Rules are globs, unless prefixed with "re:" in which case they are regular expressions matched from the start of
+    the text.
+    Args:
+        rules: list of rules to compile
+    Returns:
+        compiled regex, or None if there are no rules
+    """
+    patterns = []
+    for rule in rules:
+        if rule.startswith(REGEX_RULE_PREFIX):
+            patterns.append(rule[len(REGEX_RULE_PREFIX) :])
+        else:
+            patterns.append(fnmatch.translate(rule))
+
+    if not patterns:
+        return None
+    return re.compile("|".join("(?:{})".format(p) for p in patterns))
+
+
+def _to_posix(relative_path):
+    """
+    Converts a relative path to use forward slashes, so that rules are platform independent.
+    """
+    return relative_path.replace(os.sep, "/")
+
+
+class PathMatcher(object):
+    """
+    Decides which directories of a release get walked and which files in them are interesting.
+
+    All rules of each kind are compiled into one regex up front, so checking a directory entry costs a single regex
+    match however many rules are configured.
+    """
+
+    def __init__(self, roots, exclude_directories=(), include_files=(), exclude_paths=()):
+        """
+        Args:
+            roots: directories, relative to a release, that get walked
+            exclude_directories: rules for directory names that are never walked, wherever they are
+            include_files: rules for the names of files that are interesting
+            exclude_paths: rules for paths, relative to a release and using "/" separators, of directories and files
+                that are not interesting
+        """
+        self.roots = list(roots)
+        self._rules = (list(exclude_directories), list(include_files), list(exclude_paths))
+        self._exclude_directories = compile_rules(exclude_directories)
+        self._include_files = compile_rules(include_files)
+        self._exclude_paths = compile_rules(exclude_paths)
+
+    @property
+    def include_files(self):
+        """
+        The rules for the names of files that are interesting.
+        """
+        return list(self._rules[1])
+
+    def is_directory_excluded(self, name, relative_path):
+        """
+        Returns whether a directory (and everything below it) should be pruned from the walk.
+        Args:
+            name: the name of the directory
+            relative_path: the path of the directory relative to the release
+        """
+        if self._exclude_directories is not None and self._exclude_directories.match(name):
+            return True
+        return self._is_path_excluded(relative_path)
+
+    def is_file_included(self, name, relative_path):
+        """
+        Returns whether a file is interesting.
+        Args:
+            name: the name of the file
+            relative_path: the path of the file relative to the release
+        """
+        if self._include_files is None or not self._include_files.match(name):
+            return False
+        return not self._is_path_excluded(relative_path)
+
+    def walk(self, release_path):
+        """
+        Generator that returns the paths, relative to the release, of all the interesting files in a release.
+        """
+        for root_directory in self.roots:
+            if self.is_directory_excluded(os.path.basename(root_directory), root_directory):
+                continue
+            for root, dirs, files in os.walk(os.path.join(release_path, root_directory)):
+                relative_root = os.path.relpath(root, release_path)
+                dirs[:] = sorted(
+                    d
+                    for d in dirs
+                    if not self.is_directory_excluded(d, os.path.join(relative_root, d))
+                )
+                for f in sorted(files):
+                    relative_path = os.path.join(relative_root, f)
+                    if self.is_file_included(f, relative_path):
+                        yield relative_path
+
+    def is_path_included(self, relative_path):
+        """
+        Returns whether a file would be found by walking a release, for when all the paths in a release are listed at
+        once (e.g. by git) rather than walked. A root of "." covers the whole release.
+        Args:
+            relative_path: the path of the file relative to the release
+        """
+        for root in self.roots:
+            if root == os.curdir:
+                directory, below = None, relative_path
+            elif relative_path.startswith(root + os.sep):
+                if self.is_directory_excluded(os.path.basename(root), root):
+                    continue
+                directory, below = root, relative_path[len(root) + 1 :]
+            else:
+                continue
+
+            names = below.split(os.sep)
+            for name in names[:-1]:
+                directory = name if directory is None else os.path.join(directory, name)
+                if self.is_directory_excluded(name, directory):
+                    break
+            else:
+                if self.is_file_included(names[-1], relative_path):
+                    return True
+        return False
+
+    def with_include_files(self, include_files):
+        """
+        Returns:
+            a PathMatcher walking the same directories as this one, but for different files
+        """
+        exclude_directories, _, exclude_paths = self._rules
+        return PathMatcher(self.roots, exclude_directories, include_files, exclude_paths)
+
+    def _is_path_excluded(self, relative_path):
+        return self._exclude_paths is not None and bool(
+            self._exclude_paths.match(_to_posix(relative_path))
+        )
+
+    @staticmethod
+    def from_config_file(config_path, defaults):
+        """
+        Creates a path matcher from a JSON configuration file. Any of the keys in CONFIG_KEYS may be given, each being a
+        list of rules (or directories for "interesting_directories") which replaces the corresponding default.
+        Args:
+            config_path: path to the configuration file
+            defaults: dict of default rules, keyed by the names in CONFIG_KEYS
+        Returns:
+            PathMatcher configured from the file
+        """
+        with open(config_path) as f:
+            config = json.load(f)
+
+        unknown_keys = set(config) - set(CONFIG_KEYS)
+        if unknown_keys:
+            raise ValueError(
+                "Unknown keys in {}: {}. Valid keys are: {}".format(
+                    config_path, ", ".join(sorted(unknown_keys)), ", ".join(CONFIG_KEYS)
+                )
+            )
+
+        rules = dict(defaults)
+        rules.update(config)
+        return PathMatcher.from_rules(rules)
+
+    def to_rules(self):
+        """
+        Returns:
+            dict of the rules of this path matcher, keyed by the names in CONFIG_KEYS (see from_rules)
+        """
+        exclude_directories, include_files, exclude_paths = self._rules
+        return {
+            "interesting_directories": [_to_posix(r) for r in self.roots],
+            "exclude_directories": list(exclude_directories),
+            "include_files": list(include_files),
+            "exclude_paths": list(exclude_paths),
+        }
+
+    @staticmethod
+    def from_rules(rules):
+        """
+        Creates a path matcher from a dict of rules, keyed by the names in CONFIG_KEYS. Directories use "/" separators.
+        """
+        return PathMatcher(
+            roots=[os.path.join(*r.split("/")) for r in rules.get("interesting_directories", [])],
+            exclude_directories=rules.get("exclude_directories", []),
+            include_files=rules.get("include_files", []),
+            exclude_paths=rules.get("exclude_paths", []),
+        )
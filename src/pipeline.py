@@ -0,0 +1,282 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from src.db_diff import ChangeKinds, DbChange, DbDiffer
+
+"""
+Default number of threads reading DBs. Reading is mostly waiting for the disk or network, so this can be more than the
+number of cores.
+"""
+DEFAULT_PIPELINE_READERS = 8
+
+"""
+Default number of processes parsing and diffing DBs.
+"""
+DEFAULT_PIPELINE_WORKERS = os.cpu_count() or 1
+
+"""
+Default number of DBs which may be waiting between each pair of stages. This bounds the memory used by the pipeline,
+as at most this many DBs (and their contents) are held by each stage at once.
+"""
+DEFAULT_PIPELINE_QUEUE_SIZE = 64
+
+_WALK_DONE = object()
+
+_worker_differ = None
+
+
+def _start_worker(differ_options):
+    """
+    Creates the DbDiffer used by a worker process. Each worker keeps its own caches of parsed DBs and differences.
+    """
+    global _worker_differ
+    _worker_differ = DbDiffer(**differ_options)
+
+
+def _diff_in_worker(db, old_contents, new_contents):
+    """
+    Diffs a DB in a worker process.
+    Returns:
+        tuple of (the DbChange or None, seconds taken)
+    """
+    start = time.perf_counter()
+    change = _worker_differ.diff_db_contents(db, old_contents, new_contents)
+    return change, time.perf_counter() - start
+
+
+class StageStats(object):
+    """
+    Counts of the work done by one stage of a pipeline.
+    """
+
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.characters = 0  # Characters of DB contents handled, where the stage handles them
+        # Time spent working, summed over all the threads or processes of the stage
+        self.seconds = 0.0
+
+    def __str__(self):
+        rate = "{:.0f}/s".format(self.items / self.seconds) if self.seconds > 0 else "-"
+        description = "{:<6} {:>8} {:<10} {:>8.2f} s busy {:>10}".format(
+            self.name, self.items, self.unit, self.seconds, rate
+        )
+        if self.characters:
+            description += " {:>8.1f} MB".format(self.characters / 1e6)
+        return description
+
+
+class PipelineStats(object):
+    """
+    Counts of the work done by each stage of a ChangesPipeline.
+    """
+
+    def __init__(self):
+        self.walk = StageStats("walk", "DBs")
+        self.read = StageStats("read", "DB pairs")
+        self.diff = StageStats("diff", "DBs")
+        self.write = StageStats("write", "changes")
+        self.elapsed = 0.0
+
+    def __str__(self):
+        return "\n".join(
+            [str(stage) for stage in (self.walk, self.read, self.diff, self.write)]
+            + ["Total {:.2f} s".format(self.elapsed)]
+        )
+
+
+class ChangesPipeline(object):
+    """
+    Finds the same changes as DbChangesIterator.change_descriptions, in the same order, but with each stage running
+    concurrently: a thread walks both releases, a pool of threads reads DBs, and a pool of processes parses and diffs
+    them, while the changes found so far are returned to be written.
+
+    The queues between the stages are bounded, so a fast stage waits for a slower one rather than piling up DBs in
+    memory. Changes are returned in the order the DBs were walked, however long each one takes.
+    """
+
+    def __init__(
+        self,
+        db_iterator,
+        workers=DEFAULT_PIPELINE_WORKERS,
+        readers=DEFAULT_PIPELINE_READERS,
+        queue_size=DEFAULT_PIPELINE_QUEUE_SIZE,
+    ):
+        """
+        Args:
+            db_iterator: the DbChangesIterator to walk, read and diff the releases with
+            workers: the number of processes to parse and diff DBs in. If 0, DBs are diffed by db_iterator's differ
+                in this process.
+            readers: the number of threads to read DBs in
+            queue_size: the number of DBs which may be waiting between each pair of stages
+        Raises:
+            ValueError: if db_iterator checks links, as the link graph needs every DB to be parsed in one process
+        """
+        if db_iterator.check_links:
+            raise ValueError("Links can not be checked when DBs are diffed in a pipeline")
+        self.db_iterator = db_iterator
+        self.workers = workers
+        self.readers = readers
+        self.queue_size = queue_size
+        self.stats = PipelineStats()
+
+    def _walk(self, walked, deleted, added, stopping):
+        """
+        Walks both releases, putting each DB in both onto the walked queue. Runs on its own thread, until the walk is
+        finished or stopping is set.
+        """
+        try:
+            dbs = self.db_iterator.dbs_in_both_paths()
+            while not stopping.is_set():
+                start = time.perf_counter()
+                item = next(dbs, None)
+                self.stats.walk.seconds += time.perf_counter() - start
+                if item is None:
+                    break
+
+                db, in_old, in_new = item
+                self.stats.walk.items += 1
+                if in_old and in_new:
+                    self._put_unless_stopping(walked, db, stopping)
+                elif in_old:
+                    deleted.append(db)
+                elif self.db_iterator.report_additions:
+                    added.append(db)
+        except Exception as e:
+            self._put_unless_stopping(walked, e, stopping)
+        self._put_unless_stopping(walked, _WALK_DONE, stopping)
+
+    @staticmethod
+    def _put_unless_stopping(walked, item, stopping):
+        """
+        Puts an item onto the walked queue, waiting for there to be room unless stopping is set while waiting.
+        """
+        while not stopping.is_set():
+            try:
+                walked.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _read(self, db):
+        """
+        Reads a DB from both releases. Runs on a reader thread.
+        Returns:
+            tuple of ((old contents, new contents) or None if they are the same, characters read, seconds taken)
+        """
+        start = time.perf_counter()
+        old_contents, new_contents = self.db_iterator.read_both(db)
+        contents = (old_contents, new_contents) if old_contents != new_contents else None
+        return contents, len(old_contents) + len(new_contents), time.perf_counter() - start
+
+    def _differ_options(self):
+        differ = self.db_iterator.differ
+        return {
+            "old_path": differ.old_path,
+            "new_path": differ.new_path,
+            "report_additions": differ.report_additions,
+            "record_filter": differ.record_filter,
+            "normalise_values": differ.normalise_values,
+            "schema": differ.schema,
+            "text_diff": differ.text_diff,
+            "max_text_diff_size": differ.max_text_diff_size,
+            "parser": differ.parser,
+        }
+
+    def _submit_diff(self, diff_pool, db, old_contents, new_contents):
+        if diff_pool is not None:
+            return diff_pool.submit(_diff_in_worker, db, old_contents, new_contents)
+
+        future = Future()
+        start = time.perf_counter()
+        change = self.db_iterator.differ.diff_db_contents(db, old_contents, new_contents)
+        future.set_result((change, time.perf_counter() - start))
+        return future
+
+    def change_descriptions(self):
+        """
+        Generator that returns the changes for each database, as DbChangesIterator.change_descriptions does.
+
+        If the generator is closed before it is finished (e.g. once enough changes have been found), the walk is
+        stopped and any reads and diffs which have not started are cancelled.
+        """
+        start = time.perf_counter()
+        self.db_iterator.load_schema()  # Before the workers start, so that they all get it
+
+        walked = queue.Queue(maxsize=self.queue_size)
+        deleted, added = [], []
+        stopping = threading.Event()
+        walker = threading.Thread(
+            target=self._walk, args=(walked, deleted, added, stopping), daemon=True
+        )
+        walker.start()
+
+        diff_pool = (
+            ProcessPoolExecutor(
+                self.workers, initializer=_start_worker, initargs=(self._differ_options(),)
+            )
+            if self.workers > 0
+            else None
+        )
+        read_pool = ThreadPoolExecutor(self.readers)
+        try:
+            for change in self._changes(walked, read_pool, diff_pool):
+                self.stats.write.items += 1
+                yield change
+        finally:
+            stopping.set()
+            read_pool.shutdown(cancel_futures=True)
+            if diff_pool is not None:
+                diff_pool.shutdown(cancel_futures=True)
+
+        walker.join()
+        for db in deleted:
+            self.stats.write.items += 1
+            yield DbChange(ChangeKinds.DELETED, db, "A DB file was deleted from {}".format(db))
+        for db in added:
+            self.stats.write.items += 1
+            yield DbChange(ChangeKinds.ADDED, db, "A DB file was added at {}".format(db))
+        self.stats.elapsed = time.perf_counter() - start
+
+    def _changes(self, walked, read_pool, diff_pool):
+        """
+        Moves DBs through the read and diff stages, keeping at most queue_size DBs in each. Each stage's results are
+        taken in the order the DBs were walked, so changes come out in that order.
+        """
+        reads, diffs = deque(), deque()
+        walking = True
+        while True:
+            # Keep the readers busy, without waiting for the walk if there is other work to do.
+            while walking and len(reads) < self.queue_size:
+                try:
+                    db = walked.get(block=not reads and not diffs)
+                except queue.Empty:
+                    break
+                if db is _WALK_DONE:
+                    walking = False
+                elif isinstance(db, Exception):
+                    raise db
+                else:
+                    reads.append((db, read_pool.submit(self._read, db)))
+
+            if diffs and (len(diffs) >= self.queue_size or not reads):
+                change, seconds = diffs.popleft().result()
+                self.stats.diff.seconds += seconds
+                if change is not None:
+                    yield change
+            elif reads:
+                db, read = reads.popleft()
+                contents, characters, seconds = read.result()
+                self.stats.read.items += 1
+                self.stats.read.characters += characters
+                self.stats.read.seconds += seconds
+                if contents is not None:
+                    self.stats.diff.items += 1
+                    diffs.append(self._submit_diff(diff_pool, db, *contents))
+            elif not walking:
+                return
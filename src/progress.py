@@ -0,0 +1,130 @@
+import sys
+import threading
+import time
+
+"""
+Default number of seconds between progress reports.
+"""
+DEFAULT_PROGRESS_INTERVAL = 1.0
+
+
+class ComparisonProgress(object):
+    """
+    Counters of how far a comparison has got. They are only updated once per DB (see DbChangesIterator), and are read
+    by a ProgressReporter on another thread, so keeping them costs almost nothing.
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.dbs_found = 0  # DBs found so far by walking the releases
+        self.walk_finish_time = None  # When the walk finished, or None if it has not
+        self.dbs_to_compare = 0  # DBs in both releases, whose contents need to be compared
+        self.dbs_compared = 0
+        self.dbs_parsed = 0
+        self.characters_read = 0  # Characters of decoded text read from both releases
+        self.read_seconds = 0.0
+        self.diff_seconds = 0.0
+
+    def finish_walk(self, dbs_to_compare):
+        """
+        Records that the walk of both releases has finished.
+        Args:
+            dbs_to_compare: the number of DBs in both releases
+        """
+        self.dbs_to_compare = dbs_to_compare
+        self.walk_finish_time = time.perf_counter()
+
+
+def _duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return "{}:{:02d}:{:02d}".format(hours, minutes, seconds)
+
+
+class ProgressReporter(object):
+    """
+    Writes a line describing the progress of a comparison to a stream (normally standard error, which should be a
+    terminal) at regular intervals, overwriting the previous line. The counters are sampled on a timer, so reporting
+    adds nothing to the work done for each DB.
+
+    The time spent reading and diffing is shown, so that a comparison which is waiting for the disk or network can be
+    told apart from one which is busy parsing.
+    Args:
+        progress: the ComparisonProgress to report
+        stream: file-like object to write to
+        interval: the number of seconds between reports
+    """
+
+    def __init__(self, progress, stream=None, interval=DEFAULT_PROGRESS_INTERVAL):
+        self.progress = progress
+        self.stream = stream if stream is not None else sys.stderr
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+        self._last_length = 0
+
+    def describe(self):
+        """
+        Returns:
+            a one line description of the progress of the comparison
+        """
+        progress = self.progress
+        now = time.perf_counter()
+        if progress.walk_finish_time is None:
+            return "Walking releases: {} DBs found ({})".format(
+                progress.dbs_found, _duration(now - progress.start_time)
+            )
+
+        comparing_seconds = now - progress.walk_finish_time
+        busy_seconds = progress.read_seconds + progress.diff_seconds
+        description = "Compared {}/{} DBs, {:.1f}M characters read, {:.0f} DBs parsed/s".format(
+            progress.dbs_compared,
+            progress.dbs_to_compare,
+            progress.characters_read / 1e6,
+            progress.dbs_parsed / comparing_seconds if comparing_seconds > 0 else 0,
+        )
+        if busy_seconds > 0:
+            description += ", {:.0f}% of time reading".format(
+                100 * progress.read_seconds / busy_seconds
+            )
+        if 0 < progress.dbs_compared < progress.dbs_to_compare:
+            remaining = progress.dbs_to_compare - progress.dbs_compared
+            description += ", ETA {}".format(
+                _duration(comparing_seconds * remaining / progress.dbs_compared)
+            )
+        return description
+
+    def report(self):
+        """
+        Writes the current progress over the previous report.
+        """
+        description = self.describe()
+        self.stream.write("\r{}".format(description.ljust(self._last_length)))
+        self.stream.flush()
+        self._last_length = len(description)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.report()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops reporting, after writing the final progress and ending its line.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.report()
+        self.stream.write("\n")
+        self.stream.flush()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
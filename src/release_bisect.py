@@ -0,0 +1,228 @@
+import re
+
+from src.db_diff import DEFAULT_PARSER, PARSERS, DbDiffer, Difference, DifferenceKinds
+from src.db_filter import RecordFilter
+from src.db_parser.common import DbSyntaxError
+from src.path_matcher import REGEX_RULE_PREFIX
+from src.release_cache import load_cached_release_data
+from src.release_sources import release_source, walk_source
+
+"""
+Version of the format of cached name indexes. Increment this if the format changes, so that old caches are rebuilt.
+"""
+NAME_INDEX_CACHE_VERSION = 2
+
+"""
+Matches the header of a record, e.g. 'record(ai, "$(P)TEMP")', capturing the record's name. This may also match text
+in comments, which only means that a DB is parsed without the record being found in it.
+"""
+_RECORD_HEADER = re.compile(r'\bg?record\s*\(\s*[^,()]*,\s*(?:"([^"]*)"|([^\s()"]+))')
+
+
+def build_name_index(release_path, path_matcher):
+    """
+    Builds an index of the DBs in a release which define each record name. DBs are scanned for record headers rather
+    than parsed, so building the index costs little more than reading the release.
+    Args:
+        release_path: path to the release (a directory or archive)
+        path_matcher: PathMatcher selecting the DBs of the release
+    Returns:
+        dict of record name to list of the paths, relative to the release, of the DBs defining it
+    """
+    source = release_source(release_path, path_matcher)
+    index = {}
+    for path in walk_source(source, path_matcher):
+        try:
+            contents = source.read(path)
+        except (IOError, UnicodeDecodeError):
+            continue
+        names = {quoted or bare for quoted, bare in _RECORD_HEADER.findall(contents)}
+        for name in sorted(names):
+            index.setdefault(name, []).append(path)
+    return index
+
+
+def load_name_index(release_path, path_matcher, cache_dir=None):
+    """
+    Loads the name index for a release, building it only if it is not already cached on disk (see
+    load_cached_release_data), so the DBs are only scanned again if one of them has changed.
+    Args:
+        release_path: path to the release
+        path_matcher: PathMatcher selecting the DBs of the release
+        cache_dir: directory to cache name indexes in. Indexes are not cached if None.
+    Returns:
+        the name index of the release (see build_name_index)
+    """
+    return load_cached_release_data(
+        cache_dir, "names", NAME_INDEX_CACHE_VERSION, release_path, path_matcher, build_name_index
+    )
+
+
+class BisectResult(object):
+    """
+    The first release in which a record (or one of its fields) was removed or changed.
+    Args:
+        last_unchanged: the name of the last release in which the record was as in the first release
+        first_changed: the name of the first release in which it was removed or changed
+        differences: list of Differences between the two releases
+        releases_checked: the names of the releases which were looked at, in the order they were looked at
+    """
+
+    def __init__(self, last_unchanged, first_changed, differences, releases_checked):
+        self.last_unchanged = last_unchanged
+        self.first_changed = first_changed
+        self.differences = differences
+        self.releases_checked = releases_checked
+
+    def __str__(self):
+        return "First changed in {} (unchanged in {}):\n  - {}".format(
+            self.first_changed, self.last_unchanged, "\n  - ".join(self.differences)
+        )
+
+
+class ReleaseBisector(object):
+    """
+    Finds the release in which a record was removed or changed by a binary search over an ordered list of releases,
+    so only O(log n) releases are looked at. In each of them, the name index (see load_name_index) gives the DBs
+    defining the record, and only those DBs are parsed, skipping every other record.
+
+    The search assumes the record changed once. If it changed and then changed back, one of its changes is found.
+    """
+
+    def __init__(
+        self,
+        catalogue,
+        path_matcher,
+        cache_dir=None,
+        normalise_values=True,
+        parser=DEFAULT_PARSER,
+    ):
+        """
+        Args:
+            catalogue: ReleaseCatalogue to find the releases in
+            path_matcher: PathMatcher selecting the DBs of each release
+            cache_dir: directory to cache the name index of each release in, or None to not cache them
+            normalise_values: whether to compare field values in their canonical form rather than as written
+            parser: the name of the parser engine to use. Should be one of PARSERS
+        """
+        self.catalogue = catalogue
+        self.path_matcher = path_matcher
+        self.cache_dir = cache_dir
+        self.normalise_values = normalise_values
+        self.parser_class = PARSERS[parser]
+
+    def record_in_release(self, release, record_name, field=None):
+        """
+        Finds a record in each DB of a release which defines it.
+        Args:
+            release: the name of the release
+            record_name: the name of the record, as written in the DBs
+            field: the name of the only field to keep, or None to keep every field
+        Returns:
+            dict of DB path to the parsed record, containing only the DBs defining the record
+        """
+        release_path = self.catalogue.release_path(release)
+        dbs = load_name_index(release_path, self.path_matcher, self.cache_dir).get(record_name, [])
+        record_filter = RecordFilter(
+            name_patterns=[REGEX_RULE_PREFIX + re.escape(record_name) + r"\Z"],
+            fields=[field] if field is not None else None,
+        )
+
+        source = release_source(release_path, self.path_matcher)
+        records = {}
+        for db in dbs:
+            try:
+                parsed = DbDiffer.parse_db(source.read(db), record_filter, self.parser_class)
+            except (IOError, UnicodeDecodeError, DbSyntaxError):
+                continue
+            for record in parsed:
+                if record["name"] == record_name:
+                    records[db] = record
+                    break
+        return records
+
+    def differences(self, old_release, old_records, new_release, new_records):
+        """
+        Finds the differences in a record between two releases, in each DB which defined it in the old release. A
+        record is matched with the same DB in the new release if it is still there, and otherwise with a DB which only
+        defines it in the new release, so a record which moved to another DB is not reported as removed.
+        Args:
+            old_release: the name of the old release
+            old_records: the record in the old release (see record_in_release)
+            new_release: the name of the new release
+            new_records: the record in the new release (see record_in_release)
+        Returns:
+            list of Differences
+        """
+        differ = DbDiffer(
+            self.catalogue.release_path(old_release),
+            self.catalogue.release_path(new_release),
+            normalise_values=self.normalise_values,
+        )
+        moved_to = [db for db in sorted(new_records) if db not in old_records]
+        differences = []
+        for db, old_record in sorted(old_records.items()):
+            if db in new_records:
+                new_record = new_records[db]
+            elif moved_to:
+                new_record = new_records[moved_to.pop(0)]
+            elif new_records:
+                new_record = new_records[min(new_records)]
+            else:
+                differences.append(
+                    Difference(
+                        DifferenceKinds.RECORD_REMOVED,
+                        "Record removed: {} from {}".format(old_record["name"], db),
+                        record=old_record["name"],
+                    )
+                )
+                continue
+            differences.extend(differ.diff_records(old_record, new_record))
+        return differences
+
+    def bisect(self, releases, record_name, field=None):
+        """
+        Finds the first release in which a record, or one of its fields, was removed or changed.
+        Args:
+            releases: names of the releases to search, oldest first. The record must be in the first of them.
+            record_name: the name of the record, as written in the DBs
+            field: the name of the field to look for changes in, or None to look for changes in any field
+        Returns:
+            BisectResult, or None if the record is unchanged in every release
+        Raises:
+            ValueError: if fewer than two releases are given, or the record is not in the first release
+        """
+        if len(releases) < 2:
+            raise ValueError("At least two releases are needed to bisect")
+
+        records = {}
+
+        def record_in(index):
+            if index not in records:
+                records[index] = self.record_in_release(releases[index], record_name, field)
+            return records[index]
+
+        def differences(old_index, new_index):
+            return self.differences(
+                releases[old_index], record_in(old_index), releases[new_index], record_in(new_index)
+            )
+
+        if not record_in(0):
+            raise ValueError("Record {} is not in release {}".format(record_name, releases[0]))
+
+        unchanged, changed = 0, len(releases) - 1
+        if not differences(0, changed):
+            return None
+        while changed - unchanged > 1:
+            middle = (unchanged + changed) // 2
+            if differences(0, middle):
+                changed = middle
+            else:
+                unchanged = middle
+
+        return BisectResult(
+            releases[unchanged],
+            releases[changed],
+            differences(unchanged, changed),
+            [releases[index] for index in records],
+        )
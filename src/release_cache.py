@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from src.release_sources import release_source, walk_source
+
+
+def release_files_stamp(release_path, path_matcher):
+    """
+    Returns:
+        list of [relative path, size, modification time] of each file a path matcher selects in a release, in the
+        order they are walked. This changes whenever one of the files is added, removed or modified, however deep in
+        the release it is.
+    """
+    source = release_source(release_path, path_matcher)
+    return [[path] + list(source.stat(path) or ()) for path in walk_source(source, path_matcher)]
+
+
+def load_cached_release_data(cache_dir, kind, version, release_path, path_matcher, build):
+    """
+    Loads data built from the files of a release, building it only if it is not already cached on disk.
+
+    Each release and set of path matcher rules has its own cache file. The cache is used only if the size and
+    modification time of every file the path matcher selects are unchanged, so checking it costs a walk of the
+    release (a stat per file) rather than reading every file. Cache files are written to a temporary file and then
+    renamed into place, so an interrupted run never leaves a truncated cache behind.
+    Args:
+        cache_dir: directory to cache the data in. The data is not cached if None.
+        kind: the kind of data, which prefixes the names of its cache files, e.g. "schema"
+        version: the version of the format of the data. Cached data of any other version is rebuilt.
+        release_path: path to the release (a directory or archive)
+        path_matcher: PathMatcher selecting the files of the release which the data is built from
+        build: function which builds the data from the release path and path matcher. The data must be JSON
+            serialisable.
+    Returns:
+        the data, as built or as loaded from the cache
+    """
+    if cache_dir is None:
+        return build(release_path, path_matcher)
+
+    release_path = os.path.abspath(release_path)
+    rules = path_matcher.to_rules()
+    key = json.dumps([release_path, rules], sort_keys=True)
+    cache_path = os.path.join(
+        cache_dir, "{}-{}.json".format(kind, hashlib.sha1(key.encode("utf-8")).hexdigest())
+    )
+    files = release_files_stamp(release_path, path_matcher)
+
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if (
+            cached["version"] == version
+            and cached["release_path"] == release_path
+            and cached["rules"] == rules
+            and cached["files"] == files
+        ):
+            return cached["data"]
+    except (IOError, ValueError, KeyError):
+        pass
+
+    data = build(release_path, path_matcher)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary_file = tempfile.NamedTemporaryFile(
+        "w", dir=cache_dir, prefix=kind, suffix=".tmp", delete=False
+    )
+    try:
+        with temporary_file:
+            json.dump(
+                {
+                    "version": version,
+                    "release_path": release_path,
+                    "rules": rules,
+                    "files": files,
+                    "data": data,
+                },
+                temporary_file,
+            )
+        os.replace(temporary_file.name, cache_path)
+    finally:
+        if os.path.exists(temporary_file.name):
+            os.remove(temporary_file.name)
+    return data
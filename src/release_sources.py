@@ -0,0 +1,374 @@
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+
+"""
+Extensions of archives which can be compared directly as releases, without extracting them.
+"""
+ZIP_EXTENSIONS = [".zip"]
+TAR_EXTENSIONS = [".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz"]
+ARCHIVE_EXTENSIONS = ZIP_EXTENSIONS + TAR_EXTENSIONS
+
+"""
+Directory which every release has at its top level. If an archive has no such directory at its top level, but holds a
+single directory, that directory is taken to be the release.
+"""
+RELEASE_TOP_DIRECTORY = "EPICS"
+
+
+def decode_text(data):
+    """
+    Decodes the contents of a file read as bytes (e.g. from an archive) as reading the file as text would, including
+    translating line endings.
+    """
+    return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", errors="surrogateescape").read()
+
+
+def read_text_file(path):
+    """
+    Returns:
+        the contents of a file, decoded as the files of every release source are (see decode_text) whatever the
+        platform's default encoding is
+    """
+    with open(path, "rb") as f:
+        return decode_text(f.read())
+
+
+def _member_path(name):
+    """
+    Returns:
+        the name of an archive member without any leading "./" or "/", or trailing "/"
+    """
+    name = name.strip("/")
+    while name.startswith("./"):
+        name = name[2:].lstrip("/")
+    return "" if name == "." else name
+
+
+def list_directory(path_matcher, release_path, directory):
+    """
+    Lists the interesting contents of a directory in a single call. Excluded directories are pruned here, so they are
+    never listed themselves.
+    Args:
+        path_matcher: PathMatcher deciding which directories and files are interesting
+        release_path: the path to the release
+        directory: the directory to list, relative to the release
+    Returns:
+        tuple of (sorted subdirectory names, set of file names). Both are empty if the directory does not exist.
+    """
+    dirs, files = [], set()
+    try:
+        entries = list(os.scandir(os.path.join(release_path, directory)))
+    except OSError:
+        return dirs, files
+
+    for entry in entries:
+        relative_path = os.path.join(directory, entry.name)
+        # Like os.walk, don't descend into symlinked directories.
+        if entry.is_dir(follow_symlinks=False):
+            if not path_matcher.is_directory_excluded(entry.name, relative_path):
+                dirs.append(entry.name)
+        elif path_matcher.is_file_included(entry.name, relative_path):
+            files.add(entry.name)
+
+    return sorted(dirs), files
+
+
+def walk_source(source, path_matcher):
+    """
+    Generator that returns the paths, relative to the release, of all the interesting files in a release source, as
+    PathMatcher.walk does for a directory.
+    """
+    for root in path_matcher.roots:
+        if path_matcher.is_directory_excluded(os.path.basename(root), root):
+            continue
+        pending = [root]
+        while pending:
+            directory = pending.pop(0)
+            dirs, files = source.list_directory(path_matcher, directory)
+            for f in sorted(files):
+                yield join_relative_path(directory, f)
+            pending[0:0] = [join_relative_path(directory, d) for d in dirs]
+
+
+def join_relative_path(directory, name):
+    """
+    Returns:
+        the path of a file or directory in a directory relative to a release, without a leading "./" if the directory
+        is the release itself (e.g. a root of ".")
+    """
+    return name if directory == os.curdir else os.path.join(directory, name)
+
+
+def release_source(path, path_matcher=None):
+    """
+    Returns:
+        the source to read the release at the given path from: a ZipSource or TarSource if the path is an archive,
+        otherwise a DirectorySource
+    Args:
+        path: the path to the release directory or archive
+        path_matcher: PathMatcher selecting the files which will be read. Tar archives only keep these files.
+    Raises:
+        ValueError: if the path is a file which is not an archive
+    """
+    if not os.path.isfile(path):
+        return DirectorySource(path)
+    if zipfile.is_zipfile(path):
+        return ZipSource(path)
+    if tarfile.is_tarfile(path):
+        return TarSource(path, path_matcher)
+    raise ValueError("{} is neither a release directory nor a zip or tar archive".format(path))
+
+
+class DirectorySource(object):
+    """
+    Reads a release from a directory tree.
+    Args:
+        path: the path to the release
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def list_directory(self, path_matcher, directory):
+        """
+        Lists the interesting contents of a directory of the release. See list_directory.
+        """
+        return list_directory(path_matcher, self.path, directory)
+
+    def read(self, relative_path):
+        """
+        Returns:
+            the contents of a file in the release
+        """
+        return read_text_file(os.path.join(self.path, relative_path))
+
+    def read_bytes(self, relative_path):
+        """
+        Returns:
+            the contents of a file in the release, as bytes
+        """
+        with open(os.path.join(self.path, relative_path), "rb") as f:
+            return f.read()
+
+    def stat(self, relative_path):
+        """
+        Returns:
+            tuple of (size, modification time in seconds since the epoch) of a file in the release, or None if it can
+            not be found
+        """
+        try:
+            st = os.stat(os.path.join(self.path, relative_path))
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime
+
+
+class _ArchiveSource(object):
+    """
+    Base class for reading a release from an archive. The index of the archive's members is kept as a listing of each
+    directory, so that directories can be listed without looking at the rest of the archive. The archive is opened
+    when it is first used, and may then be read from several threads.
+    Args:
+        path: the path to the archive
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._listings = None
+        self._prefix = ""
+        self._load_lock = threading.Lock()
+
+    def _index(self, names):
+        """
+        Builds the directory listings from the names of the archive's members.
+        Args:
+            names: list of tuples of (member name using "/" separators, whether the member is a directory)
+        """
+        top_level = {_member_path(name).split("/", 1)[0] for name, _ in names} - {""}
+        if RELEASE_TOP_DIRECTORY not in top_level and len(top_level) == 1:
+            self._prefix = top_level.pop() + "/"
+
+        listings = {}
+        for name, is_dir in names:
+            relative_path = self.relative_path(name)
+            if not relative_path:
+                continue
+            parts = relative_path.split(os.sep)
+            for depth in range(len(parts)):
+                directory = os.path.join(*parts[:depth]) if depth > 0 else ""
+                dirs, files = listings.setdefault(directory, (set(), set()))
+                if depth < len(parts) - 1 or is_dir:
+                    dirs.add(parts[depth])
+                else:
+                    files.add(parts[depth])
+        self._listings = listings
+
+    def relative_path(self, name):
+        """
+        Returns:
+            the path relative to the release of the archive member with the given name, or None if it is not in the
+            release
+        """
+        name = _member_path(name)
+        if not name.startswith(self._prefix):
+            return None
+        return name[len(self._prefix) :].replace("/", os.sep)
+
+    def member_name(self, relative_path):
+        """
+        Returns:
+            the name of the archive member at the given path relative to the release
+        """
+        return self._prefix + relative_path.replace(os.sep, "/")
+
+    def _load(self):
+        """
+        Opens the archive, calling _index with the names of its members.
+        """
+        raise NotImplementedError()
+
+    def _ensure_loaded(self):
+        with self._load_lock:
+            if self._listings is None:
+                self._load()
+
+    def list_directory(self, path_matcher, directory):
+        """
+        Lists the interesting contents of a directory of the release from the archive's index. See list_directory.
+        """
+        self._ensure_loaded()
+        dirs, files = self._listings.get(directory, ((), ()))
+        return (
+            sorted(
+                d
+                for d in dirs
+                if not path_matcher.is_directory_excluded(d, os.path.join(directory, d))
+            ),
+            {f for f in files if path_matcher.is_file_included(f, os.path.join(directory, f))},
+        )
+
+
+class ZipSource(_ArchiveSource):
+    """
+    Reads a release from a zip archive. Zip archives have an index at the end, and each member can be read on its own,
+    so only the members which are read are ever decompressed.
+    """
+
+    def __init__(self, path):
+        super(ZipSource, self).__init__(path)
+        self._zip = None
+
+    def _load(self):
+        self._zip = zipfile.ZipFile(self.path)
+        self._index([(info.filename, info.is_dir()) for info in self._zip.infolist()])
+
+    def read(self, relative_path):
+        """
+        Returns:
+            the contents of a file in the release
+        """
+        return decode_text(self.read_bytes(relative_path))
+
+    def read_bytes(self, relative_path):
+        """
+        Returns:
+            the contents of a file in the release, as bytes
+        """
+        self._ensure_loaded()
+        try:
+            return self._zip.read(self.member_name(relative_path))
+        except KeyError:
+            raise IOError("{} is not in {}".format(relative_path, self.path))
+
+    def stat(self, relative_path):
+        """
+        Returns:
+            tuple of (size, modification time in seconds since the epoch) of a file in the release, or None if it is
+            not in the archive
+        """
+        self._ensure_loaded()
+        try:
+            info = self._zip.getinfo(self.member_name(relative_path))
+        except KeyError:
+            return None
+        # Zip archives record the local time the file was modified, to the nearest two seconds
+        return info.file_size, time.mktime(info.date_time + (0, 0, -1))
+
+
+class TarSource(_ArchiveSource):
+    """
+    Reads a release from a (possibly compressed) tar archive. Tar archives have no index and compressed ones can not be
+    read out of order, so the archive is read from start to end once, keeping the contents of the files selected by the
+    path matcher as it goes.
+    Args:
+        path: the path to the archive
+        path_matcher: PathMatcher selecting the files which will be read, or None to keep every file
+    """
+
+    def __init__(self, path, path_matcher=None):
+        super(TarSource, self).__init__(path)
+        self.path_matcher = path_matcher
+        self._contents = None
+        self._stats = None
+
+    def _load(self):
+        names, data = [], {}
+        with tarfile.open(self.path, "r|*") as tar:
+            for member in tar:
+                names.append((member.name, member.isdir()))
+                if member.isfile() and self._may_be_read(member.name):
+                    data[member.name] = (tar.extractfile(member).read(), member.mtime)
+
+        self._index(names)
+        self._contents, self._stats = {}, {}
+        for name, (contents, mtime) in data.items():
+            relative_path = self.relative_path(name)
+            if relative_path:
+                self._contents[relative_path] = contents
+                self._stats[relative_path] = (len(contents), mtime)
+
+    def _may_be_read(self, name):
+        """
+        Returns whether the archive member with the given name may be read. As the archive is only read once, this is
+        decided before it is known whether the archive holds the release in a top level directory, so the member is
+        kept if it would be read in either case.
+        """
+        if self.path_matcher is None:
+            return True
+        name = _member_path(name)
+        candidates = [name] + name.split("/", 1)[1:]
+        return any(
+            self.path_matcher.is_path_included(candidate.replace("/", os.sep))
+            for candidate in candidates
+        )
+
+    def read(self, relative_path):
+        """
+        Returns:
+            the contents of a file in the release
+        """
+        return decode_text(self.read_bytes(relative_path))
+
+    def read_bytes(self, relative_path):
+        """
+        Returns:
+            the contents of a file in the release, as bytes
+        """
+        self._ensure_loaded()
+        try:
+            return self._contents[relative_path]
+        except KeyError:
+            raise IOError("{} is not in {}, or was not selected".format(relative_path, self.path))
+
+    def stat(self, relative_path):
+        """
+        Returns:
+            tuple of (size, modification time in seconds since the epoch) of a file in the release, or None if it is
+            not in the archive or was not selected
+        """
+        self._ensure_loaded()
+        return self._stats.get(relative_path)
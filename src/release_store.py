@@ -0,0 +1,474 @@
+import os
+import sqlite3
+from bisect import bisect_right
+
+from src.db_diff import (
+    DEFAULT_PARSER,
+    PARSERS,
+    ChangeKinds,
+    DbChange,
+    DbDiffer,
+    Difference,
+    DifferenceKinds,
+    content_digest,
+)
+from src.db_parser.common import UNKNOWN_OFFSET, DbSyntaxError, SourcePositions
+from src.field_values import canonical_value
+from src.release_sources import release_source, walk_source
+
+"""
+Tables and indexes of a release store. The parsed contents of each distinct DB are stored once, however many releases
+and paths they appear at, so loading a release mostly stores references to contents which are already loaded.
+Positions are the index of each item within its DB or record, and lines are where it is in the DB (or NULL if not
+known).
+"""
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contents (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    parse_error TEXT
+);
+CREATE TABLE IF NOT EXISTS dbs (
+    release_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    content_id INTEGER NOT NULL,
+    PRIMARY KEY (release_id, path)
+);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    content_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    line INTEGER
+);
+CREATE INDEX IF NOT EXISTS records_by_content ON records (content_id, name, position);
+CREATE INDEX IF NOT EXISTS records_by_name ON records (name);
+CREATE INDEX IF NOT EXISTS records_by_type ON records (type);
+CREATE TABLE IF NOT EXISTS fields (
+    record_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    canonical_value TEXT NOT NULL,
+    line INTEGER
+);
+CREATE INDEX IF NOT EXISTS fields_by_record ON fields (record_id, name, position);
+CREATE INDEX IF NOT EXISTS fields_by_value ON fields (name, canonical_value);
+CREATE TABLE IF NOT EXISTS infos (
+    record_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS infos_by_record ON infos (record_id, name, position);
+CREATE TABLE IF NOT EXISTS aliases (
+    record_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    alias TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS aliases_by_record ON aliases (record_id, alias, position);
+CREATE INDEX IF NOT EXISTS aliases_by_alias ON aliases (alias);
+"""
+
+"""
+The differences between the pairs of DB contents in the _pairs table, in the order DbDiffer.diff_dbs finds them. Each
+row is (path, section, record position, subsection, item position, kind, record, field, old value, new value,
+old line, new line); the section, positions and subsection are only used to order the differences. Removed and changed
+fields are compared with the value column named by {value}. Added fields, infos, aliases and records are only found
+if {additions} is 1.
+
+As in DbDiffer, each old record is compared with the first new record of the same name, and each old field with the
+first new field of the same name.
+"""
+_DIFFERENCES_QUERY = """
+WITH matched AS (
+    SELECT p.path, r.id AS old_id, r.position, r.name, r.line,
+        (SELECT n.id FROM records n WHERE n.content_id = p.new_content AND n.name = r.name
+         ORDER BY n.position LIMIT 1) AS new_id
+    FROM _pairs p JOIN records r ON r.content_id = p.old_content
+),
+first_new_fields AS (
+    SELECT m.path, m.old_id, m.position AS record_position, m.name AS record, f.*
+    FROM matched m JOIN fields f ON f.record_id = m.new_id
+    WHERE f.position = (SELECT MIN(position) FROM fields WHERE record_id = f.record_id AND name = f.name)
+)
+SELECT m.path, 0, m.position, 0, -1, '{removed}', m.name, NULL, NULL, NULL, m.line, NULL
+FROM matched m WHERE m.new_id IS NULL
+UNION ALL
+SELECT m.path, 0, m.position, 0, f.position,
+    CASE WHEN n.record_id IS NULL THEN '{field_removed}' ELSE '{field_changed}' END,
+    m.name, f.name, f.value, n.value, f.line, n.line
+FROM matched m JOIN fields f ON f.record_id = m.old_id
+LEFT JOIN first_new_fields n ON n.old_id = m.old_id AND n.name = f.name
+WHERE m.new_id IS NOT NULL AND (n.record_id IS NULL OR n.{value} != f.{value})
+UNION ALL
+SELECT n.path, 0, n.record_position, 1, n.position, '{field_added}', n.record, n.name, NULL, n.value,
+    NULL, n.line
+FROM first_new_fields n
+WHERE {additions} AND NOT EXISTS (SELECT 1 FROM fields f WHERE f.record_id = n.old_id AND f.name = n.name)
+UNION ALL
+SELECT m.path, 0, m.position, 2, i.position, '{info_added}', m.name, i.name, NULL, i.value, NULL,
+    (SELECT line FROM records WHERE id = m.new_id)
+FROM matched m JOIN infos i ON i.record_id = m.new_id
+WHERE {additions}
+    AND i.position = (SELECT MIN(position) FROM infos WHERE record_id = i.record_id AND name = i.name)
+    AND NOT EXISTS (SELECT 1 FROM infos o WHERE o.record_id = m.old_id AND o.name = i.name)
+UNION ALL
+SELECT m.path, 0, m.position, 3, a.position, '{alias_added}', m.name, a.alias, NULL, NULL, NULL,
+    (SELECT line FROM records WHERE id = m.new_id)
+FROM matched m JOIN aliases a ON a.record_id = m.new_id
+WHERE {additions}
+    AND a.position = (SELECT MIN(position) FROM aliases WHERE record_id = a.record_id AND alias = a.alias)
+    AND NOT EXISTS (SELECT 1 FROM aliases o WHERE o.record_id = m.old_id AND o.alias = a.alias)
+UNION ALL
+SELECT p.path, 1, n.position, 0, 0, '{record_added}', n.name, NULL, NULL, NULL, NULL, n.line
+FROM _pairs p JOIN records n ON n.content_id = p.new_content
+WHERE {additions}
+    AND n.position = (SELECT MIN(position) FROM records WHERE content_id = n.content_id AND name = n.name)
+    AND NOT EXISTS (SELECT 1 FROM records o WHERE o.content_id = p.old_content AND o.name = n.name)
+ORDER BY 1, 2, 3, 4, 5
+"""
+
+
+def _lines(text, db):
+    """
+    Returns:
+        list of the line of each offset of a parsed DB (see ParsedDb), or None where the offset is not known
+    """
+    offsets = getattr(db, "offsets", ())
+    line_starts = SourcePositions(text).line_starts()
+    return [
+        bisect_right(line_starts, offset) if offset != UNKNOWN_OFFSET else None
+        for offset in offsets
+    ]
+
+
+def _difference(kind, record, field, old_value, new_value, old_line, new_line):
+    """
+    Returns:
+        the Difference described by a row of _DIFFERENCES_QUERY, with the same description as DbDiffer gives it
+    """
+    if kind == DifferenceKinds.RECORD_REMOVED:
+        message = "Record removed: {}".format(record)
+    elif kind == DifferenceKinds.FIELD_REMOVED:
+        message = "Field '{}' removed from '{}'".format(field, record)
+    elif kind == DifferenceKinds.FIELD_CHANGED:
+        message = "Field '{}' in record '{}' changed from '{}' to '{}'".format(
+            field, record, old_value, new_value
+        )
+    elif kind == DifferenceKinds.FIELD_ADDED:
+        message = "Field '{}' added to '{}' with value '{}'".format(field, record, new_value)
+    elif kind == DifferenceKinds.INFO_ADDED:
+        message = "Info '{}' added to '{}' with value '{}'".format(field, record, new_value)
+    elif kind == DifferenceKinds.ALIAS_ADDED:
+        message = "Alias '{}' added to '{}'".format(field, record)
+    else:
+        message = "Record added: {}".format(record)
+    return Difference(
+        kind, message, record=record, field=field, old_line=old_line, new_line=new_line
+    )
+
+
+class ReleaseStore(object):
+    """
+    A SQLite database of the parsed DBs of releases, for queries across releases (e.g. which releases define records
+    of a type with a given DTYP) without parsing them again. Releases can also be compared in the database, giving the
+    same changes as DbChangesIterator.
+    Args:
+        path: the path to the SQLite database, which is created if it does not exist
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(STORE_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def release_names(self):
+        """
+        Returns:
+            sorted list of the names of the loaded releases
+        """
+        return [
+            name for name, in self.connection.execute("SELECT name FROM releases ORDER BY name")
+        ]
+
+    def load_release(self, name, release_path, path_matcher, parser=DEFAULT_PARSER):
+        """
+        Loads the DBs of a release into the store, replacing any release already loaded with the same name. The whole
+        release is loaded in a single transaction, with each table's rows inserted in bulk. DB contents which are
+        already in the store are not parsed again.
+        Args:
+            name: the name to load the release as
+            release_path: the path to the release (a directory or archive)
+            path_matcher: PathMatcher selecting the DBs of the release
+            parser: the name of the parser engine to use. Should be one of PARSERS
+        Returns:
+            tuple of (number of DBs loaded, number of those whose contents were not already in the store)
+        """
+        source = release_source(release_path, path_matcher)
+        parser_class = PARSERS[parser]
+        connection = self.connection
+
+        with connection:
+            connection.execute(
+                "DELETE FROM dbs WHERE release_id IN (SELECT id FROM releases WHERE name = ?)",
+                (name,),
+            )
+            connection.execute("DELETE FROM releases WHERE name = ?", (name,))
+            release_id = connection.execute(
+                "INSERT INTO releases (name, path) VALUES (?, ?)",
+                (name, os.path.abspath(release_path)),
+            ).lastrowid
+
+            next_content_id, next_record_id = connection.execute(
+                "SELECT (SELECT COALESCE(MAX(id), 0) + 1 FROM contents), "
+                "(SELECT COALESCE(MAX(id), 0) + 1 FROM records)"
+            ).fetchone()
+            content_ids = {}
+            rows = {table: [] for table in ["contents", "records", "fields", "infos", "aliases"]}
+            dbs = []
+
+            for position, path in enumerate(walk_source(source, path_matcher)):
+                text = source.read(path)
+                digest = content_digest(text)
+                if digest not in content_ids:
+                    row = connection.execute(
+                        "SELECT id FROM contents WHERE digest = ?", (digest,)
+                    ).fetchone()
+                    if row is not None:
+                        content_ids[digest] = row[0]
+                    else:
+                        content_ids[digest] = next_content_id
+                        next_record_id = self._add_content_rows(
+                            rows, next_content_id, next_record_id, digest, text, parser_class
+                        )
+                        next_content_id += 1
+                dbs.append((release_id, path, position, content_ids[digest]))
+
+            connection.executemany("INSERT INTO contents VALUES (?, ?, ?)", rows["contents"])
+            connection.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?)", rows["records"])
+            connection.executemany("INSERT INTO fields VALUES (?, ?, ?, ?, ?, ?)", rows["fields"])
+            connection.executemany("INSERT INTO infos VALUES (?, ?, ?, ?)", rows["infos"])
+            connection.executemany("INSERT INTO aliases VALUES (?, ?, ?)", rows["aliases"])
+            connection.executemany("INSERT INTO dbs VALUES (?, ?, ?, ?)", dbs)
+
+        return len(dbs), len(rows["contents"])
+
+    @staticmethod
+    def _add_content_rows(rows, content_id, record_id, digest, text, parser_class):
+        """
+        Parses the contents of a DB, adding the rows to store them to the lists of rows for each table.
+        Args:
+            rows: dict of table name to the list of rows to insert into it
+            content_id: the id to store the contents with
+            record_id: the id to store the first record with. The records are given consecutive ids.
+            digest: the digest of the contents (see content_digest)
+            text: the contents
+            parser_class: the parser to parse the contents with
+        Returns:
+            the id for the next record to be stored
+        """
+        try:
+            db = DbDiffer.parse_db(text, parser_class=parser_class)
+            parse_error = None
+        except DbSyntaxError as e:
+            db, parse_error = [], "{} {}".format(e.__class__.__name__, e)
+        rows["contents"].append((content_id, digest, parse_error))
+
+        lines = _lines(text, db)
+        offset_index = 0
+        for record_position, record in enumerate(db):
+            record_line = lines[offset_index] if offset_index < len(lines) else None
+            rows["records"].append(
+                (
+                    record_id,
+                    content_id,
+                    record_position,
+                    record["type"],
+                    record["name"],
+                    record_line,
+                )
+            )
+            for field_position, (field_name, value) in enumerate(record["fields"]):
+                line_index = offset_index + 1 + field_position
+                rows["fields"].append(
+                    (
+                        record_id,
+                        field_position,
+                        field_name,
+                        value,
+                        canonical_value(field_name, value, record["type"]),
+                        lines[line_index] if line_index < len(lines) else None,
+                    )
+                )
+            for info_position, (info_name, value) in enumerate(record["infos"]):
+                rows["infos"].append((record_id, info_position, info_name, value))
+            for alias_position, alias in enumerate(record["aliases"]):
+                rows["aliases"].append((record_id, alias_position, alias))
+            offset_index += 1 + len(record["fields"])
+            record_id += 1
+        return record_id
+
+    def query(self, sql, parameters=()):
+        """
+        Runs a query against the store. See STORE_SCHEMA for the tables.
+        Returns:
+            tuple of (list of column names, list of rows)
+        """
+        cursor = self.connection.execute(sql, parameters)
+        columns = [description[0] for description in cursor.description or ()]
+        return columns, cursor.fetchall()
+
+    def releases_defining(self, record_type, field=None, value=None):
+        """
+        Finds the releases with records of a type, optionally only those with a field, or a field with a value.
+        Values are compared in their canonical form (see canonical_value).
+        Returns:
+            sorted list of release names
+        """
+        sql = (
+            "SELECT DISTINCT rel.name FROM releases rel JOIN dbs d ON d.release_id = rel.id "
+            "JOIN records r ON r.content_id = d.content_id WHERE r.type = ?"
+        )
+        parameters = [record_type]
+        if field is not None:
+            sql += " AND EXISTS (SELECT 1 FROM fields f WHERE f.record_id = r.id AND f.name = ?"
+            parameters.append(field)
+            if value is not None:
+                sql += " AND f.canonical_value = ?"
+                parameters.append(canonical_value(field, value, record_type))
+            sql += ")"
+        return [name for name, in self.connection.execute(sql + " ORDER BY rel.name", parameters)]
+
+    def _release(self, name):
+        row = self.connection.execute(
+            "SELECT id, path FROM releases WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            raise ValueError("Release {} is not in the store".format(name))
+        return row
+
+    def _paths_only_in(self, release_id, other_release_id):
+        """
+        Returns:
+            the paths of the DBs in one release which are not in the other, in the order they were walked
+        """
+        return [
+            path
+            for path, in self.connection.execute(
+                "SELECT path FROM dbs d WHERE release_id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM dbs o WHERE o.release_id = ? AND o.path = d.path) ORDER BY position",
+                (release_id, other_release_id),
+            )
+        ]
+
+    def change_descriptions(
+        self, old_release, new_release, report_additions=False, normalise_values=True
+    ):
+        """
+        Compares two loaded releases with set operations in the database, giving the same changes as
+        DbChangesIterator.change_descriptions (without a schema, record filter or line diffs). DBs whose contents are
+        the same in both releases are never looked at.
+        Args:
+            old_release: the name of the old release
+            new_release: the name of the new release
+            report_additions: whether to also report DBs, records, fields, infos and aliases that were added
+            normalise_values: whether to compare field values in their canonical form rather than as written
+        Returns:
+            list of DbChanges
+        Raises:
+            ValueError: if either release is not in the store
+        """
+        old_id, old_path = self._release(old_release)
+        new_id, new_path = self._release(new_release)
+        connection = self.connection
+
+        connection.execute("DROP TABLE IF EXISTS temp._pairs")
+        connection.execute(
+            "CREATE TEMP TABLE _pairs AS "
+            "SELECT o.path, o.position, o.content_id AS old_content, n.content_id AS new_content, "
+            "oc.parse_error AS old_error, nc.parse_error AS new_error "
+            "FROM dbs o JOIN dbs n ON n.release_id = ? AND n.path = o.path "
+            "JOIN contents oc ON oc.id = o.content_id JOIN contents nc ON nc.id = n.content_id "
+            "WHERE o.release_id = ? AND o.content_id != n.content_id",
+            (new_id, old_id),
+        )
+
+        differences = {}
+        for row in connection.execute(
+            _DIFFERENCES_QUERY.format(
+                value="canonical_value" if normalise_values else "value",
+                additions=1 if report_additions else 0,
+                removed=DifferenceKinds.RECORD_REMOVED,
+                field_removed=DifferenceKinds.FIELD_REMOVED,
+                field_changed=DifferenceKinds.FIELD_CHANGED,
+                field_added=DifferenceKinds.FIELD_ADDED,
+                info_added=DifferenceKinds.INFO_ADDED,
+                alias_added=DifferenceKinds.ALIAS_ADDED,
+                record_added=DifferenceKinds.RECORD_ADDED,
+            )
+        ):
+            differences.setdefault(row[0], []).append(_difference(*row[5:]))
+
+        changes = []
+        for path, old_error, new_error in connection.execute(
+            "SELECT path, old_error, new_error FROM _pairs ORDER BY position"
+        ):
+            old_db_path = os.path.join(old_path, path)
+            new_db_path = os.path.join(new_path, path)
+            if old_error is not None or new_error is not None:
+                changes.append(
+                    DbChange(
+                        ChangeKinds.PARSE_ERROR,
+                        path,
+                        "Unable to parse db at {} because: {}".format(
+                            *(
+                                (old_db_path, old_error)
+                                if old_error is not None
+                                else (new_db_path, new_error)
+                            )
+                        ),
+                    )
+                )
+            elif path in differences:
+                changes.append(
+                    DbChange(
+                        ChangeKinds.MODIFIED,
+                        path,
+                        "DBs at '{}' and '{}' are different.\n  - {}".format(
+                            old_db_path, new_db_path, "\n  - ".join(differences[path])
+                        ),
+                        differences[path],
+                    )
+                )
+        connection.execute("DROP TABLE temp._pairs")
+
+        for path in self._paths_only_in(old_id, new_id):
+            changes.append(
+                DbChange(ChangeKinds.DELETED, path, "A DB file was deleted from {}".format(path))
+            )
+        if report_additions:
+            for path in self._paths_only_in(new_id, old_id):
+                changes.append(
+                    DbChange(ChangeKinds.ADDED, path, "A DB file was added at {}".format(path))
+                )
+
+        return changes
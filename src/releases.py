@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import time
+
+from src.release_sources import ARCHIVE_EXTENSIONS
+
+"""
+Default number of seconds that a cached list of releases is used for before the releases directory is listed again.
+"""
+DEFAULT_RELEASE_LIST_TTL = 24 * 60 * 60
+
+
+class ReleaseCatalogue(object):
+    """
+    Finds releases in a releases directory. A release is valid if we built an EPICS version for it (i.e. it is not a
+    client-only hotfix), which is indicated by it having an EPICS directory. A release may instead be a zip or tar
+    archive named after the release (e.g. 3.2.0.zip), which is compared without extracting it.
+
+    Checking whether a named release is valid only looks at that release, so it costs a single stat however many
+    releases there are. Listing every valid release needs a stat per release, so the list can be cached.
+    """
+
+    def __init__(self, releases_dir, cache_dir=None, ttl=DEFAULT_RELEASE_LIST_TTL):
+        """
+        Args:
+            releases_dir: the directory containing the releases, e.g. RELEASES_DIR or a local mirror of it
+            cache_dir: directory to cache the list of valid releases in, or None to not cache it
+            ttl: number of seconds a cached list of releases is valid for
+        """
+        self.releases_dir = releases_dir
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def release_path(self, name):
+        """
+        Returns:
+            the path to the named release: its directory, or if there is no directory its archive if there is one
+        """
+        path = os.path.join(self.releases_dir, name)
+        if not os.path.isdir(path):
+            for extension in ARCHIVE_EXTENSIONS:
+                if os.path.isfile(path + extension):
+                    return path + extension
+        return path
+
+    def is_valid(self, name):
+        """
+        Returns whether the named release exists and has an EPICS build. Archives are assumed to have one, as looking
+        inside them may mean reading the whole archive.
+        """
+        if not name or os.path.basename(name) != name or name in (os.curdir, os.pardir):
+            return False
+        path = self.release_path(name)
+        if path.endswith(tuple(ARCHIVE_EXTENSIONS)) and os.path.isfile(path):
+            return True
+        return os.path.isdir(os.path.join(path, "EPICS"))
+
+    def valid_releases(self):
+        """
+        Returns:
+            sorted list of the names of all valid releases, from the cache if it is younger than the TTL
+        """
+        cache_path = self._cache_path()
+        if cache_path is not None:
+            try:
+                with open(cache_path) as f:
+                    cached = json.load(f)
+                if (
+                    cached["releases_dir"] == self.releases_dir
+                    and 0 <= time.time() - cached["time"] < self.ttl
+                ):
+                    return cached["releases"]
+            except (IOError, ValueError, KeyError):
+                pass
+
+        names = set()
+        for entry in os.listdir(self.releases_dir):
+            for extension in ARCHIVE_EXTENSIONS:
+                if entry.endswith(extension):
+                    entry = entry[: -len(extension)]
+                    break
+            names.add(entry)
+        releases = sorted(name for name in names if self.is_valid(name))
+
+        if cache_path is not None:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(cache_path, "w") as f:
+                json.dump(
+                    {"releases_dir": self.releases_dir, "time": time.time(), "releases": releases},
+                    f,
+                )
+        return releases
+
+    def _cache_path(self):
+        if self.cache_dir is None:
+            return None
+        return os.path.join(
+            self.cache_dir,
+            "releases-{}.json".format(hashlib.sha1(self.releases_dir.encode("utf-8")).hexdigest()),
+        )
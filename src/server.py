@@ -0,0 +1,342 @@
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from urllib.parse import parse_qs, urlparse
+
+from src.db_diff import (
+    DEFAULT_CONTENT_CACHE_SIZE,
+    DEFAULT_MAX_TEXT_DIFF_SIZE,
+    DEFAULT_PARSER,
+    PARSERS,
+    LruCache,
+)
+from src.db_filter import RecordFilter
+from src.db_iterators import DbChangesIterator
+from src.release_sources import release_source, walk_source
+from src.summary import DETAILS_FORMATS, ChangeSummary
+
+DEFAULT_SERVER_HOST = "127.0.0.1"
+DEFAULT_SERVER_PORT = 8720
+
+"""
+Default number of releases whose files are kept in memory. Each loaded release holds the contents of all its
+interesting files.
+"""
+DEFAULT_MAX_RELEASES = 4
+
+"""
+Number of distinct sets of comparison options (e.g. record filters) to keep parse and difference caches for.
+"""
+MAX_CACHED_OPTION_SETS = 8
+
+"""
+Query parameter values which turn a flag on.
+"""
+TRUE_VALUES = ["1", "true", "yes", "on"]
+
+
+class _ListingRecorder(object):
+    """
+    Lists the directories of a release with another source, remembering each listing.
+    Args:
+        source: the source to list the release's directories with (see release_source)
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.listings = {}
+
+    def list_directory(self, path_matcher, directory):
+        listing = self.source.list_directory(path_matcher, directory)
+        self.listings[directory] = listing
+        return listing
+
+
+class ReleaseSnapshot(object):
+    """
+    The interesting files of a release, read into memory once so that it can be compared again without touching the
+    disk. Can be used as the source of a release (see release_source).
+    Args:
+        name: the name of the release
+        path: the path the release was read from
+        listings: dict of each walked directory (relative to the release) to its (sorted subdirectory names, set of
+            file names), as listed by the source it was read from
+        contents: dict of the relative path of each interesting file to its contents
+    """
+
+    def __init__(self, name, path, listings, contents):
+        self.name = name
+        self.path = path
+        self.listings = listings
+        self.contents = contents
+        self.schema = None  # RecordTypeSchema of the release, once it has been needed
+
+    @staticmethod
+    def load(name, path, path_matcher):
+        """
+        Walks a release and reads all its interesting files.
+        Args:
+            name: the name of the release
+            path: the path to the release, which may be a directory or an archive
+            path_matcher: PathMatcher deciding which directories and files are walked
+        Returns:
+            ReleaseSnapshot of the release
+        """
+        source = release_source(path, path_matcher)
+        recorder = _ListingRecorder(source)
+        contents = {
+            relative_path: source.read(relative_path)
+            for relative_path in walk_source(recorder, path_matcher)
+        }
+        return ReleaseSnapshot(name, path, recorder.listings, contents)
+
+    def list_directory(self, path_matcher, directory):
+        """
+        Lists a directory of the release. The listings were already made with the path matcher, so it is not used.
+        """
+        return self.listings.get(directory, ([], set()))
+
+    def read(self, relative_path):
+        return self.contents[relative_path]
+
+
+class SnapshotChangesIterator(DbChangesIterator):
+    """
+    DbChangesIterator which compares two ReleaseSnapshots rather than reading the releases from disk.
+    Args:
+        old_snapshot: the ReleaseSnapshot of the old release
+        new_snapshot: the ReleaseSnapshot of the new release
+        **kwargs: as for DbChangesIterator
+    """
+
+    def __init__(self, old_snapshot, new_snapshot, **kwargs):
+        super(SnapshotChangesIterator, self).__init__(
+            old_snapshot.path,
+            new_snapshot.path,
+            old_source=old_snapshot,
+            new_source=new_snapshot,
+            **kwargs
+        )
+        self.new_snapshot = new_snapshot
+
+    def load_schema(self):
+        """
+        Loads the schema of the new release into the differ as DbChangesIterator.load_schema does, but keeps it with
+        the new release's snapshot so that it is only loaded once.
+        """
+        if self.use_schema and self.differ.schema is None:
+            if self.new_snapshot.schema is None:
+                super(SnapshotChangesIterator, self).load_schema()
+                self.new_snapshot.schema = self.differ.schema
+            self.differ.schema = self.new_snapshot.schema
+
+
+class ComparisonService(object):
+    """
+    Compares releases, keeping the most recently used releases in memory along with the parsed DBs and differences
+    found, so that repeated comparisons are fast. Not thread safe: comparisons should be made one at a time.
+    """
+
+    def __init__(
+        self,
+        catalogue,
+        path_matcher,
+        max_releases=DEFAULT_MAX_RELEASES,
+        max_text_diff_size=DEFAULT_MAX_TEXT_DIFF_SIZE,
+        schema_cache_dir=None,
+    ):
+        """
+        Args:
+            catalogue: ReleaseCatalogue to find releases in
+            path_matcher: PathMatcher deciding which directories and files are compared
+            max_releases: the number of releases to keep in memory
+            max_text_diff_size: Size in characters above which line diffs are not computed
+            schema_cache_dir: Directory to cache release schemas in, or None to not cache them
+        """
+        self.catalogue = catalogue
+        self.path_matcher = path_matcher
+        self.max_text_diff_size = max_text_diff_size
+        self.schema_cache_dir = schema_cache_dir
+        self._releases = LruCache(max_releases)
+        self._parsed_db_caches = LruCache(MAX_CACHED_OPTION_SETS)
+        self._differences_caches = LruCache(MAX_CACHED_OPTION_SETS)
+
+    def release(self, name, reload=False):
+        """
+        Returns:
+            the ReleaseSnapshot of the named release, loading it if it is not already in memory (or if reload is set)
+        Raises:
+            ValueError: if the release is not valid
+        """
+        snapshot = None if reload else self._releases.get(name)
+        if snapshot is None:
+            if not self.catalogue.is_valid(name):
+                raise ValueError("Invalid release '{}'".format(name))
+            snapshot = ReleaseSnapshot.load(
+                name, self.catalogue.release_path(name), self.path_matcher
+            )
+            self._releases.put(name, snapshot)
+            # Differences found with the schema of an earlier snapshot may be wrong if its DBD files have changed
+            for key in [key for key in self._differences_caches.keys() if key[-1] == name]:
+                self._differences_caches.pop(key)
+        return snapshot
+
+    def loaded_releases(self):
+        """
+        Returns:
+            the names of the releases in memory, least recently used first
+        """
+        return list(self._releases.keys())
+
+    @staticmethod
+    def _cache(caches, key):
+        cache = caches.get(key)
+        if cache is None:
+            cache = LruCache(DEFAULT_CONTENT_CACHE_SIZE)
+            caches.put(key, cache)
+        return cache
+
+    def compare(
+        self,
+        old,
+        new,
+        report_additions=False,
+        filter_expression=None,
+        normalise_values=True,
+        use_schema=False,
+        text_diff=False,
+        parser=DEFAULT_PARSER,
+        reload=False,
+    ):
+        """
+        Compares two releases, with the same options as the command line.
+        Args:
+            old: the name of the old release
+            new: the name of the new release
+            filter_expression: optional record filter expression (see RecordFilter.from_expression)
+            reload: whether to read the releases from disk again, even if they are in memory
+            Other arguments are as for DbChangesIterator.
+        Returns:
+            SnapshotChangesIterator comparing the releases
+        Raises:
+            ValueError: if a release, the filter or the parser is not valid
+        """
+        if parser not in PARSERS:
+            raise ValueError("Invalid parser '{}'".format(parser))
+        record_filter = (
+            RecordFilter.from_expression(filter_expression)
+            if filter_expression is not None
+            else None
+        )
+
+        # Parsed DBs only depend on how they are parsed, but differences also depend on how they are compared,
+        # including the schema of the new release if it is used. The name of that release is last, so that the
+        # differences found with its schema can be dropped when it is loaded again (see release).
+        parse_options = (parser, filter_expression)
+        difference_options = parse_options + (
+            report_additions,
+            normalise_values,
+            new if use_schema else None,
+        )
+
+        return SnapshotChangesIterator(
+            self.release(old, reload),
+            self.release(new, reload),
+            report_additions=report_additions,
+            path_matcher=self.path_matcher,
+            record_filter=record_filter,
+            normalise_values=normalise_values,
+            use_schema=use_schema,
+            schema_cache_dir=self.schema_cache_dir,
+            text_diff=text_diff,
+            max_text_diff_size=self.max_text_diff_size,
+            parser=parser,
+            parsed_db_cache=self._cache(self._parsed_db_caches, parse_options),
+            differences_cache=self._cache(self._differences_caches, difference_options),
+        )
+
+
+class ComparisonRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers comparison requests for the ComparisonService of the server (server.service). Endpoints:
+        GET /compare?old=OLD&new=NEW: the details of each change, as written by the command line
+        GET /summary?old=OLD&new=NEW: the summary table of the changes
+        GET /status: JSON object listing the releases in memory
+    /compare and /summary take the optional parameters show_added, raw_values, schema, text_diff and reload (flags),
+    filter, parser and format (/compare only), which behave as the command line options of the same name.
+    Invalid requests get a 400 response, and requests for releases which can not be read a 500 response.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/status":
+                body = json.dumps({"releases": self.server.service.loaded_releases()})
+                self._respond(200, "application/json", body)
+            elif url.path in ("/compare", "/summary"):
+                self._compare(url.path, query)
+            else:
+                self._respond(404, "text/plain", "Unknown path {}\n".format(url.path))
+        except (KeyError, ValueError) as e:
+            self._respond(400, "text/plain", "Bad request: {}\n".format(e))
+        except (IOError, UnicodeDecodeError) as e:
+            # e.g. a release could not be read from the share. The server carries on with the next request.
+            self._respond(500, "text/plain", "Unable to read release: {}\n".format(e))
+
+    def _compare(self, path, query):
+        details_format = query.get("format", "text")
+        if details_format not in DETAILS_FORMATS:
+            raise ValueError("Invalid format '{}'".format(details_format))
+
+        def flag(name):
+            return query.get(name, "").lower() in TRUE_VALUES
+
+        service = self.server.service
+        changes = service.compare(
+            query["old"],
+            query["new"],
+            report_additions=flag("show_added"),
+            filter_expression=query.get("filter"),
+            normalise_values=not flag("raw_values"),
+            use_schema=flag("schema"),
+            text_diff=flag("text_diff"),
+            parser=query.get("parser", DEFAULT_PARSER),
+            reload=flag("reload"),
+        )
+
+        summary = ChangeSummary(service.path_matcher.roots)
+        details = StringIO()
+        summary.consume(changes.change_descriptions(), details, details_format)
+        if path == "/summary":
+            summary_stream = StringIO()
+            summary.write_summary(summary_stream)
+            self._respond(200, "text/plain", summary_stream.getvalue())
+        elif details_format == "json":
+            self._respond(200, "application/x-ndjson", details.getvalue())
+        else:
+            self._respond(200, "text/plain", details.getvalue())
+
+    def _respond(self, status, content_type, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "{}; charset=utf-8".format(content_type))
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def comparison_server(service, host=DEFAULT_SERVER_HOST, port=DEFAULT_SERVER_PORT):
+    """
+    Creates an HTTP server answering comparison requests (see ComparisonRequestHandler). Requests are handled one at a
+    time, so the service's caches are never used concurrently.
+    Args:
+        service: the ComparisonService to answer requests with
+        host: the address to listen on. Defaults to only accepting local connections.
+        port: the port to listen on, or 0 to pick a free port
+    Returns:
+        the HTTPServer, which has not yet been started (see HTTPServer.serve_forever)
+    """
+    server = HTTPServer((host, port), ComparisonRequestHandler)
+    server.service = service
+    return server
@@ -0,0 +1,131 @@
+import json
+import os
+from collections import Counter
+
+from src.db_diff import ChangeKinds, DifferenceKinds
+
+"""
+Separator written between the descriptions of each changed DB.
+"""
+CHANGE_SEPARATOR = "\n-----\n"
+
+"""
+Formats the details of each change can be written in. "text" is the human-readable description of each change,
+separated by CHANGE_SEPARATOR; "json" is one JSON object per line (see DbChange.to_dict).
+"""
+DETAILS_FORMATS = ["text", "json"]
+
+"""
+Counters shown in the summary, in order, with their column headings.
+"""
+SUMMARY_COLUMNS = [
+    (ChangeKinds.MODIFIED, "DBs changed"),
+    (ChangeKinds.DELETED, "DBs deleted"),
+    (ChangeKinds.PARSE_ERROR, "Parse errors"),
+    (DifferenceKinds.RECORD_REMOVED, "Records removed"),
+    (DifferenceKinds.FIELD_REMOVED, "Fields removed"),
+    (DifferenceKinds.FIELD_CHANGED, "Fields changed"),
+]
+
+"""
+Counters which are only shown if any directory has a non-zero count, as they only appear with some options.
+"""
+OPTIONAL_SUMMARY_COLUMNS = [
+    (ChangeKinds.TEXT_CHANGED, "DBs changed textually"),
+    (DifferenceKinds.FIELD_REMOVED_DEFAULT, "Default fields removed"),
+    (ChangeKinds.ADDED, "DBs added"),
+    (DifferenceKinds.RECORD_ADDED, "Records added"),
+    (DifferenceKinds.FIELD_ADDED, "Fields added"),
+    (DifferenceKinds.INFO_ADDED, "Infos added"),
+    (DifferenceKinds.ALIAS_ADDED, "Aliases added"),
+    (DifferenceKinds.LINK_BROKEN, "Broken links"),
+]
+
+
+class ChangeSummary(object):
+    """
+    Aggregates changes into counts per directory (e.g. per IOC or support module) as they are produced.
+
+    Only the counters are kept, so memory use is proportional to the number of directories with changes rather than
+    the number of changes.
+    """
+
+    def __init__(self, roots):
+        """
+        Args:
+            roots: directories, relative to a release, whose immediate subdirectories are summarised separately. DBs
+                outside all of them are summarised by their own directory.
+        """
+        self.roots = [r.rstrip(os.sep) + os.sep for r in roots]
+        self.counts = {}
+
+    def directory_of(self, db_path):
+        """
+        Returns:
+            the directory a DB is summarised under, i.e. the root it is in plus the next directory below that.
+        """
+        for root in self.roots:
+            if db_path.startswith(root):
+                subdirectory = db_path[len(root) :].split(os.sep, 1)
+                if len(subdirectory) > 1:
+                    return root + subdirectory[0]
+                return root.rstrip(os.sep)
+        return os.path.dirname(db_path)
+
+    def add(self, change):
+        """
+        Adds a change to the counts.
+        Args:
+            change: the DbChange to add
+        """
+        counts = self.counts.setdefault(self.directory_of(change.db_path), Counter())
+        counts[change.kind] += 1
+        for difference in change.differences:
+            counts[difference.kind] += 1
+
+    def consume(self, changes, details_stream, details_format="text"):
+        """
+        Writes each change to the details stream as it is produced, adding it to the counts.
+        Args:
+            changes: iterable of DbChanges, e.g. DbChangesIterator.change_descriptions()
+            details_stream: file-like object to write the description of each change to
+            details_format: the format to write the changes in. Should be one of DETAILS_FORMATS
+        """
+        for change in changes:
+            self.add(change)
+            if details_format == "json":
+                details_stream.write(json.dumps(change.to_dict()))
+                details_stream.write("\n")
+            else:
+                details_stream.write(change)
+                details_stream.write("\n{}\n".format(CHANGE_SEPARATOR))
+
+    def write_summary(self, stream):
+        """
+        Writes a table of the counts for each directory, followed by the totals.
+        Args:
+            stream: file-like object to write the summary to
+        """
+        totals = Counter()
+        for counts in self.counts.values():
+            totals.update(counts)
+
+        columns = list(SUMMARY_COLUMNS) + [
+            (kind, heading) for kind, heading in OPTIONAL_SUMMARY_COLUMNS if totals[kind] > 0
+        ]
+        directory_width = max([len("Directory"), len("Total")] + [len(d) for d in self.counts])
+
+        def write_row(name, values):
+            stream.write(
+                "{}  {}\n".format(
+                    name.ljust(directory_width),
+                    "  ".join(
+                        str(v).rjust(len(heading)) for v, (_, heading) in zip(values, columns)
+                    ),
+                )
+            )
+
+        write_row("Directory", [heading for _, heading in columns])
+        for directory in sorted(self.counts):
+            write_row(directory, [self.counts[directory][kind] for kind, _ in columns])
+        write_row("Total", [totals[kind] for kind, _ in columns])
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+RECORD = 'record(ai, "$(P){}") {{\n    field(VAL, "{}")\n}}\n'
+
+DB_PATH = os.path.join("EPICS", "support", "mod", "db", "test.db")
+
+
+def write_file(path, contents):
+    """
+    Writes a file, creating any directories it is in.
+    Returns:
+        the path of the file
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(contents)
+    return path
+
+
+class TemporaryDirectoryTestCase(unittest.TestCase):
+    """
+    Gives each test a temporary directory, self.root, which is removed after the test.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _write_file(self, relative_path, contents):
+        """
+        Returns:
+            the path of the file written at the given path in self.root
+        """
+        return write_file(os.path.join(self.root, relative_path), contents)
+
+
+class ReleasesTestCase(TemporaryDirectoryTestCase):
+    """
+    Writes releases to the temporary directory, self.root.
+    """
+
+    def _release_path(self, release):
+        return os.path.join(self.root, release)
+
+    def _write(self, release, relative_path, contents):
+        """
+        Writes a file of a release.
+        Args:
+            release: the name of the release in self.root, or the path of the release
+            relative_path: the path of the file in the release
+            contents: the contents of the file
+        Returns:
+            the path of the file
+        """
+        return write_file(os.path.join(self._release_path(release), relative_path), contents)
+
+    def _write_releases(self, old_contents, new_contents, old_release="1.0.0", new_release="2.0.0"):
+        """
+        Writes an old and a new release, each with the given contents at DB_PATH. A DB is deleted from the old release
+        and another is added to the new release.
+        """
+        self._write(old_release, DB_PATH, old_contents)
+        self._write(new_release, DB_PATH, new_contents)
+        self._write(old_release, os.path.join("EPICS", "support", "mod", "db", "gone.db"), "")
+        self._write(new_release, os.path.join("EPICS", "support", "mod", "db", "new.db"), "")
@@ -0,0 +1,130 @@
+import unittest
+from unittest import mock
+
+from src.db_parser import bulk_lexer
+from src.db_parser.bulk_lexer import TOKEN_TYPES, BulkLexer, significant_tokens_equal
+from src.db_parser.common import DbSyntaxError
+from src.db_parser.lexer import Lexer
+from src.db_parser.tokens import TokenTypes
+from test import test_lexer
+
+"""
+DBs covering the edge cases of the lexer rules, which must be lexed identically by Lexer and BulkLexer.
+"""
+PARITY_INPUTS = [
+    "",
+    "\n",
+    'record(ai, "$(P)TEST") {\n    field(VAL, "1")\n    info(alarm, "A")\n}\n',
+    'grecord(ao,"$(P)A"){field(DESC,"# not a comment")}\n# comment\nalias("$(P)A","$(P)B")',
+    '  record(ai, "$(P)X")\r\n{\r\n\tfield(INP, "$(P)Y CP MS")\r\n}\r\n',
+    'record(ai, "A") {\n    field(DESC, "an \\"escaped\\" quote")\n    field(VAL, "")\n}',
+    "${MACRO} $(MACRO=VALUE) recordname field1 info:a-b_c.d",
+    '"first" "second"\n"third"',
+    "record\n\n\n   \n",
+    'record(ai, "A") {\n    field(VAL, "unterminated)\n}\n',
+    'record(ai, "A") {\n    field(VAL, 1) @\n}\n',
+    'record(ai, "$(P\n)A")',
+    '"a\n"',
+]
+
+
+def lex_with_positions(lexer):
+    """
+    Returns:
+        list of (type, contents, line, column) for each token produced, followed by the error message if lexing failed
+    """
+    tokens = []
+    try:
+        while True:
+            token = next(lexer)
+            tokens.append((token.type, token.contents, token.line, token.col))
+    except StopIteration:
+        pass
+    except DbSyntaxError as e:
+        tokens.append(str(e))
+    return tokens
+
+
+class BulkLexerTests(test_lexer.LexerTests):
+    lexer_class = BulkLexer
+
+    def test_GIVEN_edge_cases_WHEN_lexed_THEN_tokens_positions_and_errors_match_lexer(self):
+        for contents in PARITY_INPUTS:
+            self.assertListEqual(
+                lex_with_positions(BulkLexer(contents)),
+                lex_with_positions(Lexer(contents)),
+                msg=repr(contents),
+            )
+
+    def test_GIVEN_record_WHEN_lexed_THEN_significant_tokens_stored_as_arrays(self):
+        lexer = BulkLexer('record(ai, "A") # comment\n')
+
+        self.assertListEqual(
+            [TOKEN_TYPES[code] for code in lexer.types],
+            [
+                TokenTypes.RECORD,
+                TokenTypes.L_BRACKET,
+                TokenTypes.LITERAL,
+                TokenTypes.COMMA,
+                TokenTypes.QUOTED_STRING,
+                TokenTypes.R_BRACKET,
+                TokenTypes.EOF,
+            ],
+        )
+        self.assertListEqual(list(lexer.starts), [0, 6, 7, 9, 11, 14, 26])
+        self.assertListEqual(list(lexer.ends), [6, 7, 9, 10, 14, 15, 26])
+        self.assertEqual(lexer.contents(4), '"A"')
+        self.assertIsNone(lexer.contents(6))
+
+    def test_GIVEN_error_after_some_tokens_WHEN_lexed_THEN_error_raised_when_it_is_reached(self):
+        lexer = BulkLexer("record @")
+
+        self.assertEqual(next(lexer).type, TokenTypes.RECORD)
+        with self.assertRaises(DbSyntaxError):
+            next(lexer)
+
+
+class SignificantTokensEqualTests(unittest.TestCase):
+    def test_GIVEN_contents_differing_only_in_whitespace_and_comments_WHEN_compared_THEN_equal(
+        self,
+    ):
+        first = 'record(ai, "$(P)TEST") {\n    field(VAL, "1")\n}\n'
+        second = '# A comment\nrecord(ai,"$(P)TEST"){field(VAL, "1")}'
+
+        self.assertTrue(significant_tokens_equal(first, second))
+
+    def test_GIVEN_contents_differing_in_a_value_WHEN_compared_THEN_not_equal(self):
+        first = 'record(ai, "$(P)TEST") {\n    field(VAL, "1")\n}\n'
+        second = 'record(ai, "$(P)TEST") {\n    field(VAL, "2")\n}\n'
+
+        self.assertFalse(significant_tokens_equal(first, second))
+
+    def test_GIVEN_one_content_is_a_prefix_of_the_other_WHEN_compared_THEN_not_equal(self):
+        self.assertFalse(significant_tokens_equal("record", "record record"))
+
+    def test_GIVEN_contents_differ_before_a_syntax_error_WHEN_compared_THEN_not_equal(self):
+        self.assertFalse(significant_tokens_equal('record "unterminated', 'field "unterminated'))
+
+    def test_GIVEN_contents_with_many_tokens_after_difference_WHEN_compared_THEN_lexing_stops_early(
+        self,
+    ):
+        lexed = []
+        significant_tokens = bulk_lexer._significant_tokens
+
+        def counting_tokens(contents):
+            for token in significant_tokens(contents):
+                lexed.append(token)
+                yield token
+
+        record = 'record(ai, "$(P)TEST") {\n    field(VAL, "1")\n}\n'
+        with mock.patch.object(bulk_lexer, "_significant_tokens", side_effect=counting_tokens):
+            equal = significant_tokens_equal("field" + record * 1000, "info" + record * 1000)
+
+        self.assertFalse(equal)
+        self.assertEqual(len(lexed), 2 * bulk_lexer.SIGNIFICANT_TOKENS_CHUNK_SIZE)
+
+    def test_GIVEN_equal_contents_longer_than_a_chunk_WHEN_compared_THEN_equal(self):
+        record = 'record(ai, "$(P)TEST") {\n    field(VAL, "1")\n}\n'
+
+        self.assertTrue(significant_tokens_equal(record * 1000, record.replace("\n", " ") * 1000))
+        self.assertFalse(significant_tokens_equal(record * 1000, record * 1001))
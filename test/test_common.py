@@ -0,0 +1,33 @@
+import unittest
+
+from src.db_parser.common import EXCERPT_WIDTH, SourcePositions
+
+
+class SourcePositionsTests(unittest.TestCase):
+    def test_GIVEN_offsets_on_several_lines_WHEN_converted_THEN_line_and_column_correct(self):
+        positions = SourcePositions("ab\ncd\n\nef")
+
+        self.assertEqual(positions.line_and_column(0), (1, 0))
+        self.assertEqual(positions.line_and_column(2), (1, 2))
+        self.assertEqual(positions.line_and_column(3), (2, 0))
+        self.assertEqual(positions.line_and_column(6), (3, 0))
+        self.assertEqual(positions.line_and_column(9), (4, 2))
+
+    def test_GIVEN_positions_WHEN_no_position_requested_THEN_line_index_not_built(self):
+        positions = SourcePositions("ab\ncd")
+
+        self.assertIsNone(positions._line_starts)
+
+    def test_GIVEN_offset_WHEN_excerpt_THEN_line_shown_with_marker_under_offset(self):
+        positions = SourcePositions('record(ai, "A") {\n\tfield(VAL "1")\r\n}')
+
+        self.assertEqual(positions.excerpt(29), '    2 | \tfield(VAL "1")\n      | \t          ^')
+
+    def test_GIVEN_long_line_WHEN_excerpt_THEN_line_cut_down_around_offset(self):
+        positions = SourcePositions("a" * 1000 + "@" + "b" * 1000)
+
+        source_line, marker_line = positions.excerpt(1000).split("\n")
+
+        self.assertLess(len(source_line), EXCERPT_WIDTH + 20)
+        self.assertTrue(source_line.endswith("..."))
+        self.assertEqual(source_line[marker_line.index("^")], "@")
@@ -1,7 +1,9 @@
 import os
+import pickle
 import unittest
 
-from src.db_diff import DbDiffer
+from src.db_diff import DbDiffer, DifferenceKinds
+from src.dbd_schema import RecordTypeSchema
 
 
 class DbDifferTests(unittest.TestCase):
@@ -86,3 +88,184 @@ class DbDifferTests(unittest.TestCase):
 
         # Check that the record name is in the diff
         self.assertIn("$(P)HELLO", differences[0])
+
+    def test_GIVEN_records_with_the_same_name_WHEN_compare_dbs_THEN_records_are_matched_by_name(
+        self,
+    ):
+        old_record = self._emptyrecord("ai", "$(P)HELLO")
+        old_record["fields"].append(("VAL", "1"))
+        new_record = self._emptyrecord("ai", "$(P)HELLO")
+        new_record["fields"].append(("VAL", "2"))
+
+        differences = self.db_change_iterator.diff_dbs(
+            [old_record], [self._emptyrecord("ai", "$(P)OTHER"), new_record]
+        )
+
+        self.assertEqual(len(differences), 1)
+        self.assertEqual(differences[0].kind, DifferenceKinds.FIELD_CHANGED)
+
+    def test_GIVEN_record_added_to_db_WHEN_compare_dbs_without_additions_THEN_no_differences(self):
+        differences = self.db_change_iterator.diff_dbs([], [self._emptyrecord("ai", "$(P)HELLO")])
+
+        self.assertEqual(len(differences), 0)
+
+    def test_GIVEN_field_value_changed_to_an_equivalent_value_WHEN_compared_THEN_no_differences(
+        self,
+    ):
+        old_record = self._emptyrecord("ai", "$(P)HELLO")
+        old_record["fields"].append(("PREC", "1"))
+        old_record["fields"].append(("PINI", "YES"))
+        new_record = self._emptyrecord("ai", "$(P)HELLO")
+        new_record["fields"].append(("PREC", "1.0"))
+        new_record["fields"].append(("PINI", "1"))
+
+        differences = self.db_change_iterator.diff_records(old_record, new_record)
+
+        self.assertEqual(len(differences), 0)
+
+    def test_GIVEN_raw_values_WHEN_field_value_changed_to_an_equivalent_value_THEN_change_reported(
+        self,
+    ):
+        old_record = self._emptyrecord("ai", "$(P)HELLO")
+        old_record["fields"].append(("PREC", "1"))
+        new_record = self._emptyrecord("ai", "$(P)HELLO")
+        new_record["fields"].append(("PREC", "1.0"))
+
+        differences = DbDiffer("old", "new", normalise_values=False).diff_records(
+            old_record, new_record
+        )
+
+        self.assertEqual(len(differences), 1)
+
+    def test_GIVEN_stringin_val_changed_WHEN_diff_db_contents_THEN_change_reported(self):
+        old_contents = 'record(stringin, "A") {\n    field(VAL, "0x10")\n}\n'
+        new_contents = 'record(stringin, "A") {\n    field(VAL, "16")\n}\n'
+
+        change = self.db_change_iterator.diff_db_contents("a.db", old_contents, new_contents)
+
+        self.assertListEqual([d.kind for d in change.differences], [DifferenceKinds.FIELD_CHANGED])
+
+    def test_GIVEN_schema_WHEN_field_with_default_value_removed_THEN_removal_is_non_breaking(self):
+        schema = RecordTypeSchema(record_types={"ai": {"PREC": ["DBF_SHORT", None, None]}})
+        old_record = self._emptyrecord("ai", "$(P)HELLO")
+        old_record["fields"].append(("PREC", "0"))
+        old_record["fields"].append(("VAL", "1"))
+        new_record = self._emptyrecord("ai", "$(P)HELLO")
+
+        differences = DbDiffer("old", "new", schema=schema).diff_records(old_record, new_record)
+
+        self.assertListEqual(
+            [d.kind for d in differences],
+            [DifferenceKinds.FIELD_REMOVED_DEFAULT, DifferenceKinds.FIELD_REMOVED],
+        )
+
+    def test_GIVEN_unparseable_db_at_two_paths_WHEN_diff_db_contents_THEN_parse_error_reported_for_both(
+        self,
+    ):
+        first = self.db_change_iterator.diff_db_contents(
+            "first.db", "record(", 'record(ai, "A") {}'
+        )
+        second = self.db_change_iterator.diff_db_contents(
+            "second.db", "record(", 'record(ai, "B") {}'
+        )
+
+        self.assertIn(os.path.join("old", "first.db"), first)
+        self.assertIn(os.path.join("old", "second.db"), second)
+
+    def test_GIVEN_db_contents_WHEN_diff_db_contents_THEN_differences_give_old_and_new_lines(self):
+        old_contents = (
+            'record(ai, "A") {\n    field(VAL, "1")\n    field(DESC, "x")\n}\nrecord(ai, "B")\n'
+        )
+        new_contents = '\n\nrecord(ai, "A") {\n    field(VAL, "2")\n}\n'
+
+        change = self.db_change_iterator.diff_db_contents("a.db", old_contents, new_contents)
+
+        self.assertListEqual(
+            [(d.kind, d.old_line, d.new_line) for d in change.differences],
+            [
+                (DifferenceKinds.FIELD_CHANGED, 2, 4),
+                (DifferenceKinds.FIELD_REMOVED, 3, None),
+                (DifferenceKinds.RECORD_REMOVED, 5, None),
+            ],
+        )
+        self.assertIn("(old line 2, new line 4)", change.differences[0])
+
+    def test_GIVEN_duplicated_field_WHEN_diff_db_contents_THEN_each_occurrence_gives_its_own_line(
+        self,
+    ):
+        old_contents = 'record(ai, "A") {\n    field(EGU, "mm")\n    field(EGU, "cm")\n}\n'
+        new_contents = 'record(ai, "A") {}\n'
+
+        change = self.db_change_iterator.diff_db_contents("a.db", old_contents, new_contents)
+
+        self.assertListEqual(
+            [(d.kind, d.old_line) for d in change.differences],
+            [(DifferenceKinds.FIELD_REMOVED, 2), (DifferenceKinds.FIELD_REMOVED, 3)],
+        )
+
+    def test_GIVEN_db_change_WHEN_pickled_and_unpickled_THEN_description_and_details_kept(self):
+        change = self.db_change_iterator.diff_db_contents(
+            "a.db", 'record(ai, "A") {\n    field(VAL, "1")\n}\n', 'record(ai, "A") {}'
+        )
+
+        restored = pickle.loads(pickle.dumps(change))
+
+        self.assertEqual(restored, change)
+        self.assertDictEqual(restored.to_dict(), change.to_dict())
+
+
+class DbDifferAdditionsTests(unittest.TestCase):
+    def setUp(self):
+        self.differ = DbDiffer("old", "new", report_additions=True)
+
+    def _emptyrecord(self, rec_type, name):
+        return {
+            "name": name,
+            "type": rec_type,
+            "fields": [],
+            "infos": [],
+            "aliases": [],
+        }
+
+    def test_GIVEN_record_added_to_db_WHEN_compare_dbs_THEN_record_added_message_in_changes(self):
+        differences = self.differ.diff_dbs([], [self._emptyrecord("ai", "$(P)HELLO")])
+
+        self.assertEqual(len(differences), 1)
+        self.assertEqual(differences[0].kind, DifferenceKinds.RECORD_ADDED)
+        self.assertIn("$(P)HELLO", differences[0])
+
+    def test_GIVEN_field_info_and_alias_added_to_record_WHEN_compared_THEN_all_additions_reported(
+        self,
+    ):
+        old_record = self._emptyrecord("ai", "$(P)HELLO")
+        old_record["fields"].append(("VAL", "1"))
+
+        new_record = self._emptyrecord("ai", "$(P)HELLO")
+        new_record["fields"].append(("VAL", "1"))
+        new_record["fields"].append(("PINI", "YES"))
+        new_record["infos"].append(("alarm", "TEST_01"))
+        new_record["aliases"].append("$(P)ALIAS")
+
+        differences = self.differ.diff_records(old_record, new_record)
+
+        self.assertListEqual(
+            [d.kind for d in differences],
+            [DifferenceKinds.FIELD_ADDED, DifferenceKinds.INFO_ADDED, DifferenceKinds.ALIAS_ADDED],
+        )
+        self.assertIn("PINI", differences[0])
+        self.assertIn("alarm", differences[1])
+        self.assertIn("$(P)ALIAS", differences[2])
+
+    def test_GIVEN_field_removed_and_another_added_WHEN_compared_THEN_both_reported(self):
+        old_record = self._emptyrecord("ai", "$(P)HELLO")
+        old_record["fields"].append(("VAL", "1"))
+
+        new_record = self._emptyrecord("ai", "$(P)HELLO")
+        new_record["fields"].append(("PINI", "YES"))
+
+        differences = self.differ.diff_records(old_record, new_record)
+
+        self.assertListEqual(
+            [d.kind for d in differences],
+            [DifferenceKinds.FIELD_REMOVED, DifferenceKinds.FIELD_ADDED],
+        )
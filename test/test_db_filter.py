@@ -0,0 +1,50 @@
+import os
+import unittest
+
+from src.db_filter import RecordFilter
+
+
+class RecordFilterTests(unittest.TestCase):
+    def test_GIVEN_empty_filter_WHEN_checking_anything_THEN_everything_included(self):
+        record_filter = RecordFilter()
+
+        self.assertTrue(record_filter.includes_path(os.path.join("EPICS", "a.db")))
+        self.assertTrue(record_filter.includes_record("ai", "$(P)TEST"))
+        self.assertTrue(record_filter.includes_field("VAL"))
+
+    def test_GIVEN_record_type_filter_WHEN_checking_records_THEN_only_those_types_included(self):
+        record_filter = RecordFilter(record_types=["ai", "ao"])
+
+        self.assertTrue(record_filter.includes_record("ai", "$(P)TEST"))
+        self.assertFalse(record_filter.includes_record("calc", "$(P)TEST"))
+
+    def test_GIVEN_name_pattern_WHEN_checking_records_THEN_only_matching_names_included(self):
+        record_filter = RecordFilter(name_patterns=["*:TEMP*"])
+
+        self.assertTrue(record_filter.includes_record("ai", "$(P)TC:TEMP1"))
+        self.assertFalse(record_filter.includes_record("ai", "$(P)TC:PRESSURE"))
+
+    def test_GIVEN_expression_with_all_clauses_WHEN_parsed_THEN_filter_uses_every_clause(self):
+        record_filter = RecordFilter.from_expression(
+            "type=ai, bo;name=re:.*TEMP.*;field=DTYP,INP;path=EPICS/support/*"
+        )
+
+        self.assertEqual(record_filter.record_types, frozenset(["ai", "bo"]))
+        self.assertEqual(record_filter.fields, frozenset(["DTYP", "INP"]))
+        self.assertTrue(record_filter.includes_record("bo", "TEMP"))
+        self.assertFalse(record_filter.includes_record("bo", "PRESSURE"))
+        self.assertTrue(record_filter.includes_path(os.path.join("EPICS", "support", "a.db")))
+        self.assertFalse(record_filter.includes_path(os.path.join("EPICS", "ioc", "a.db")))
+
+    def test_GIVEN_expression_with_unknown_key_WHEN_parsed_THEN_raises_error(self):
+        with self.assertRaises(ValueError):
+            RecordFilter.from_expression("kind=ai")
+
+    def test_GIVEN_expression_without_value_WHEN_parsed_THEN_raises_error(self):
+        with self.assertRaises(ValueError):
+            RecordFilter.from_expression("type")
+
+    def test_GIVEN_expression_with_empty_values_WHEN_parsed_THEN_raises_error(self):
+        for expression in ["type=", "name=", "field= , ", "path=;type=ai"]:
+            with self.assertRaises(ValueError):
+                RecordFilter.from_expression(expression)
@@ -0,0 +1,300 @@
+import os
+from unittest import mock
+
+from src.db_diff import ChangeKinds, DbDiffer, DifferenceKinds
+from src.db_filter import RecordFilter
+from src.db_iterators import DbChangesIterator
+from src.path_matcher import PathMatcher
+from test.helpers import RECORD, ReleasesTestCase
+
+
+class DbChangesIteratorTests(ReleasesTestCase):
+    def setUp(self):
+        super(DbChangesIteratorTests, self).setUp()
+        self.old_path = self._release_path("old")
+        self.new_path = self._release_path("new")
+
+    def _write_both(self, relative_path, old_contents, new_contents):
+        self._write(self.old_path, relative_path, old_contents)
+        self._write(self.new_path, relative_path, new_contents)
+
+    def test_GIVEN_db_only_in_old_release_WHEN_iterate_THEN_db_is_deleted(self):
+        db = os.path.join("EPICS", "support", "mod", "db", "test.db")
+        self._write(self.old_path, db, RECORD.format("A", "1"))
+
+        iterator = DbChangesIterator(self.old_path, self.new_path)
+
+        self.assertListEqual(list(iterator.deleted_dbs()), [db])
+        self.assertListEqual(list(iterator.modified_dbs()), [])
+
+    def test_GIVEN_db_changed_between_releases_WHEN_iterate_THEN_db_is_modified(self):
+        db = os.path.join("EPICS", "support", "mod", "db", "test.db")
+        self._write_both(db, RECORD.format("A", "1"), RECORD.format("A", "2"))
+
+        iterator = DbChangesIterator(self.old_path, self.new_path)
+
+        self.assertListEqual(list(iterator.modified_dbs()), [db])
+        self.assertListEqual(list(iterator.deleted_dbs()), [])
+
+    def test_GIVEN_db_in_ignored_directory_WHEN_iterate_THEN_db_is_not_returned(self):
+        self._write(
+            self.old_path, os.path.join("EPICS", "support", "mod", "O.Common", "test.db"), ""
+        )
+
+        iterator = DbChangesIterator(self.old_path, self.new_path)
+
+        self.assertListEqual(list(iterator.dbs_in_old_path()), [])
+
+    def test_GIVEN_db_only_in_new_release_WHEN_iterate_without_additions_THEN_nothing_reported(
+        self,
+    ):
+        db = os.path.join("EPICS", "support", "newmod", "test.db")
+        self._write(self.new_path, db, RECORD.format("A", "1"))
+
+        iterator = DbChangesIterator(self.old_path, self.new_path)
+
+        self.assertListEqual(list(iterator.change_descriptions()), [])
+
+    def test_GIVEN_db_only_in_new_release_WHEN_iterate_with_additions_THEN_db_is_added(self):
+        db = os.path.join("EPICS", "support", "newmod", "db", "test.db")
+        self._write(self.new_path, db, RECORD.format("A", "1"))
+
+        iterator = DbChangesIterator(self.old_path, self.new_path, report_additions=True)
+
+        self.assertListEqual(list(iterator.added_dbs()), [db])
+        changes = list(iterator.change_descriptions())
+        self.assertEqual(len(changes), 1)
+        self.assertIn(db, changes[0])
+
+    def test_GIVEN_record_added_to_db_WHEN_iterate_with_additions_THEN_record_addition_reported(
+        self,
+    ):
+        db = os.path.join("EPICS", "ioc", "master", "TEST", "test.db")
+        self._write_both(
+            db, RECORD.format("A", "1"), RECORD.format("A", "1") + RECORD.format("B", "1")
+        )
+
+        iterator = DbChangesIterator(self.old_path, self.new_path, report_additions=True)
+        changes = list(iterator.change_descriptions())
+
+        self.assertEqual(len(changes), 1)
+        self.assertIn("Record added: $(P)B", changes[0])
+
+    def test_GIVEN_path_matcher_excluding_a_directory_WHEN_iterate_THEN_dbs_in_it_not_returned(
+        self,
+    ):
+        kept = os.path.join("EPICS", "support", "motor", "test.db")
+        self._write(self.old_path, kept, "")
+        self._write(self.old_path, os.path.join("EPICS", "support", "vendor", "test.db"), "")
+
+        matcher = PathMatcher(
+            roots=[os.path.join("EPICS", "support")],
+            include_files=["*.db"],
+            exclude_paths=["EPICS/support/vendor"],
+        )
+        iterator = DbChangesIterator(self.old_path, self.new_path, path_matcher=matcher)
+
+        self.assertListEqual(list(iterator.dbs_in_old_path()), [kept])
+
+    def test_GIVEN_record_filter_WHEN_iterate_THEN_only_matching_dbs_and_records_compared(self):
+        motor_db = os.path.join("EPICS", "support", "motor", "test.db")
+        other_db = os.path.join("EPICS", "support", "other", "test.db")
+        self._write_both(
+            motor_db,
+            RECORD.format("A", "1") + RECORD.format("B", "1"),
+            RECORD.format("A", "1"),
+        )
+        self._write_both(other_db, RECORD.format("A", "1"), "")
+
+        record_filter = RecordFilter(name_patterns=["*A"], path_patterns=["EPICS/support/motor/*"])
+        iterator = DbChangesIterator(self.old_path, self.new_path, record_filter=record_filter)
+
+        self.assertListEqual(list(iterator.change_descriptions()), [])
+
+    def test_GIVEN_text_diff_WHEN_db_reordered_without_api_change_THEN_line_diff_reported(self):
+        db = os.path.join("EPICS", "support", "mod", "test.db")
+        self._write_both(
+            db,
+            RECORD.format("A", "1") + RECORD.format("B", "1"),
+            RECORD.format("B", "1") + RECORD.format("A", "1"),
+        )
+
+        iterator = DbChangesIterator(self.old_path, self.new_path, text_diff=True)
+        changes = list(iterator.change_descriptions())
+
+        self.assertEqual(len(changes), 1)
+        self.assertIn("differ textually", changes[0])
+        self.assertIn('+record(ai, "$(P)B")', changes[0])
+
+    def test_GIVEN_text_diff_WHEN_only_comments_changed_THEN_nothing_reported(self):
+        db = os.path.join("EPICS", "support", "mod", "test.db")
+        self._write_both(db, RECORD.format("A", "1"), "# New comment\n" + RECORD.format("A", "1"))
+
+        iterator = DbChangesIterator(self.old_path, self.new_path, text_diff=True)
+
+        self.assertListEqual(list(iterator.change_descriptions()), [])
+
+    def test_GIVEN_text_diff_WHEN_db_too_large_THEN_line_diff_not_computed(self):
+        db = os.path.join("EPICS", "support", "mod", "test.db")
+        self._write_both(
+            db,
+            RECORD.format("A", "1") + RECORD.format("B", "1"),
+            RECORD.format("B", "1") + RECORD.format("A", "1"),
+        )
+
+        iterator = DbChangesIterator(
+            self.old_path, self.new_path, text_diff=True, max_text_diff_size=10
+        )
+        changes = list(iterator.change_descriptions())
+
+        self.assertEqual(len(changes), 1)
+        self.assertIn("too large to diff", changes[0])
+
+    def test_GIVEN_db_with_only_cosmetic_changes_WHEN_iterate_THEN_db_is_not_parsed(self):
+        db = os.path.join("EPICS", "support", "mod", "test.db")
+        self._write_both(db, RECORD.format("A", "1"), "# Comment\n" + RECORD.format("A", "1"))
+
+        iterator = DbChangesIterator(self.old_path, self.new_path)
+        with mock.patch.object(DbDiffer, "parse_db") as parse_db:
+            changes = list(iterator.change_descriptions())
+
+        self.assertListEqual(changes, [])
+        parse_db.assert_not_called()
+
+    def test_GIVEN_identical_dbs_at_several_paths_WHEN_iterate_THEN_each_distinct_db_parsed_once(
+        self,
+    ):
+        dbs = [
+            os.path.join("EPICS", "support", module, "db", "test.db")
+            for module in ["mod1", "mod2", "mod3"]
+        ]
+        for db in dbs:
+            self._write_both(db, RECORD.format("A", "1"), RECORD.format("B", "1"))
+
+        iterator = DbChangesIterator(self.old_path, self.new_path)
+        with mock.patch.object(DbDiffer, "parse_db", wraps=DbDiffer.parse_db) as parse_db:
+            changes = list(iterator.change_descriptions())
+
+        self.assertListEqual([change.db_path for change in changes], dbs)
+        for change, db in zip(changes, dbs):
+            self.assertIn(os.path.join(self.old_path, db), change)
+            self.assertIn("Record removed: $(P)A", change)
+        self.assertEqual(parse_db.call_count, 2)
+
+    def test_GIVEN_record_removed_WHEN_iterate_checking_links_THEN_links_to_it_from_other_dbs_reported(
+        self,
+    ):
+        removed_from = os.path.join("EPICS", "support", "mod", "db", "a.db")
+        unchanged = os.path.join("EPICS", "support", "mod", "db", "b.db")
+        added = os.path.join("EPICS", "support", "newmod", "db", "c.db")
+        link = 'record(calc, "$(P){}") {{\n    field({}, "$(P){} CP MS")\n}}\n'
+        self._write_both(
+            removed_from, RECORD.format("A", "1") + RECORD.format("B", "1"), RECORD.format("A", "1")
+        )
+        self._write_both(
+            unchanged, link.format("C", "INPA", "B.SEVR"), link.format("C", "INPA", "B.SEVR")
+        )
+        self._write(self.new_path, added, link.format("D", "FLNK", "A"))
+
+        iterator = DbChangesIterator(self.old_path, self.new_path, check_links=True)
+        changes = list(iterator.change_descriptions())
+
+        self.assertListEqual(
+            [(c.kind, c.db_path) for c in changes],
+            [(ChangeKinds.MODIFIED, removed_from), (ChangeKinds.BROKEN_LINKS, unchanged)],
+        )
+        self.assertListEqual(
+            [(d.kind, d.record, d.field) for d in changes[1].differences],
+            [(DifferenceKinds.LINK_BROKEN, "$(P)C", "INPA")],
+        )
+
+    def test_GIVEN_record_moved_to_new_db_WHEN_iterate_checking_links_THEN_links_to_it_not_broken(
+        self,
+    ):
+        old_db = os.path.join("EPICS", "support", "mod", "db", "a.db")
+        new_db = os.path.join("EPICS", "support", "mod", "db", "moved.db")
+        self._write(self.old_path, old_db, RECORD.format("A", "1"))
+        self._write(self.new_path, new_db, RECORD.format("A", "1"))
+        self._write_both(
+            os.path.join("EPICS", "support", "mod", "db", "b.db"),
+            'record(ao, "$(P)B") {\n    field(OUT, "$(P)A PP")\n}\n',
+            'record(ao, "$(P)B") {\n    field(OUT, "$(P)A PP")\n}\n',
+        )
+
+        iterator = DbChangesIterator(self.old_path, self.new_path, check_links=True)
+
+        self.assertListEqual(
+            [(c.kind, c.db_path) for c in iterator.change_descriptions()],
+            [(ChangeKinds.DELETED, old_db)],
+        )
+
+    def test_GIVEN_field_filter_WHEN_iterate_checking_links_THEN_links_in_other_fields_found(self):
+        removed_from = os.path.join("EPICS", "support", "mod", "db", "a.db")
+        linking = os.path.join("EPICS", "support", "mod", "db", "b.db")
+        link = 'record(ao, "$(P)C") {\n    field(OUT, "$(P)B PP")\n}\n'
+        self._write_both(
+            removed_from, RECORD.format("A", "1") + RECORD.format("B", "1"), RECORD.format("A", "1")
+        )
+        self._write_both(linking, link, link)
+
+        iterator = DbChangesIterator(
+            self.old_path,
+            self.new_path,
+            record_filter=RecordFilter(fields=["DESC"]),
+            check_links=True,
+        )
+
+        self.assertListEqual(
+            [(c.kind, c.db_path) for c in iterator.change_descriptions()],
+            [(ChangeKinds.MODIFIED, removed_from), (ChangeKinds.BROKEN_LINKS, linking)],
+        )
+
+    def test_GIVEN_path_filter_WHEN_iterate_checking_links_THEN_dbs_outside_filter_in_link_graph(
+        self,
+    ):
+        removed_from = os.path.join("EPICS", "support", "mod", "db", "a.db")
+        moved_to = os.path.join("EPICS", "support", "other", "db", "moved.db")
+        linking = os.path.join("EPICS", "support", "other", "db", "b.db")
+        self._write_both(
+            removed_from, RECORD.format("A", "1") + RECORD.format("B", "1"), RECORD.format("C", "1")
+        )
+        self._write(self.new_path, moved_to, RECORD.format("A", "1"))
+        links = 'record(ao, "$(P)D") {\n    field(OUT, "$(P)A PP")\n    field(FLNK, "$(P)B")\n}\n'
+        self._write_both(linking, links, links)
+
+        iterator = DbChangesIterator(
+            self.old_path,
+            self.new_path,
+            record_filter=RecordFilter(path_patterns=["EPICS/support/mod/*"]),
+            check_links=True,
+        )
+        changes = list(iterator.change_descriptions())
+
+        self.assertListEqual(
+            [(c.kind, c.db_path) for c in changes],
+            [(ChangeKinds.MODIFIED, removed_from), (ChangeKinds.BROKEN_LINKS, linking)],
+        )
+        self.assertListEqual(
+            [(d.record, d.field) for d in changes[1].differences], [("$(P)D", "FLNK")]
+        )
+
+    def test_GIVEN_likely_changes_first_WHEN_iterate_THEN_dbs_whose_size_changed_compared_first(
+        self,
+    ):
+        dbs = [os.path.join("EPICS", "support", "mod", "{}.db".format(name)) for name in "abc"]
+        self._write_both(dbs[0], RECORD.format("A", "1"), RECORD.format("A", "2"))
+        self._write_both(dbs[1], RECORD.format("A", "1"), RECORD.format("A", "1"))
+        self._write_both(dbs[2], RECORD.format("A", "1"), RECORD.format("A", "10"))
+        for release_path in [self.old_path, self.new_path]:
+            for db in dbs:
+                os.utime(os.path.join(release_path, db), ns=(0, 0))
+        os.utime(os.path.join(self.new_path, dbs[1]), ns=(10**9, 10**9))
+
+        iterator = DbChangesIterator(self.old_path, self.new_path, likely_changes_first=True)
+
+        self.assertListEqual(
+            [db for db, _, _ in iterator.dbs_in_both_paths()], [dbs[2], dbs[1], dbs[0]]
+        )
+        self.assertListEqual(
+            [change.db_path for change in iterator.change_descriptions()], [dbs[2], dbs[0]]
+        )
@@ -0,0 +1,142 @@
+import os
+import unittest
+from unittest import mock
+
+from src.db_parser.common import DbSyntaxError
+from src.dbd_schema import RecordTypeSchema, load_release_schema, parse_dbd
+from src.path_matcher import PathMatcher
+from test.helpers import TemporaryDirectoryTestCase, write_file
+
+MENU_DBD = """
+menu(menuPini) {
+    choice(menuPiniNO, "NO")
+    choice(menuPiniYES, "YES")
+}
+"""
+
+RECORD_TYPE_DBD = """
+# A comment
+%#include "epicsTypes.h"
+recordtype(ai) {
+    include "dbCommon.dbd"
+    field(PINI, DBF_MENU) {
+        prompt("Process at iocInit")
+        menu(menuPini)
+    }
+    field(DTYP, DBF_DEVICE) {
+        prompt("Device Type")
+    }
+    field(PREC, DBF_SHORT) {
+        prompt("Display Precision")
+    }
+    field(SMOO, DBF_DOUBLE) {
+        initial("0.5")
+    }
+    field(DESC, DBF_STRING) {
+        size(41)
+    }
+}
+device(ai, CONSTANT, devAiSoft, "Soft Channel")
+device(ai, INST_IO, devAiAsyn, "asynInt32")
+"""
+
+
+class ParseDbdTests(unittest.TestCase):
+    def test_GIVEN_dbd_statements_WHEN_parsed_THEN_keywords_arguments_and_bodies_extracted(self):
+        statements = parse_dbd(MENU_DBD)
+
+        self.assertEqual(len(statements), 1)
+        keyword, args, body = statements[0]
+        self.assertEqual(keyword, "menu")
+        self.assertListEqual(args, ["menuPini"])
+        self.assertListEqual(
+            body,
+            [("choice", ["menuPiniNO", "NO"], []), ("choice", ["menuPiniYES", "YES"], [])],
+        )
+
+    def test_GIVEN_include_statement_WHEN_parsed_THEN_string_is_an_argument(self):
+        self.assertListEqual(parse_dbd('include "base.dbd"'), [("include", ["base.dbd"], [])])
+
+    def test_GIVEN_unterminated_body_WHEN_parsed_THEN_raises_syntax_error(self):
+        with self.assertRaises(DbSyntaxError):
+            parse_dbd("recordtype(ai) { field(VAL, DBF_DOUBLE)")
+
+
+class RecordTypeSchemaTests(unittest.TestCase):
+    def setUp(self):
+        self.schema = RecordTypeSchema()
+        # The record type is defined before its menu, as can happen across DBD files.
+        self.schema.add_dbd(RECORD_TYPE_DBD)
+        self.schema.add_dbd(MENU_DBD)
+
+    def test_GIVEN_fields_of_each_type_WHEN_getting_default_THEN_default_is_correct(self):
+        self.assertEqual(self.schema.default_value("ai", "PINI"), "NO")
+        self.assertEqual(self.schema.default_value("ai", "DTYP"), "Soft Channel")
+        self.assertEqual(self.schema.default_value("ai", "PREC"), "0")
+        self.assertEqual(self.schema.default_value("ai", "SMOO"), "0.5")
+        self.assertEqual(self.schema.default_value("ai", "DESC"), "")
+
+    def test_GIVEN_unknown_record_type_or_field_WHEN_getting_default_THEN_none(self):
+        self.assertIsNone(self.schema.default_value("bi", "PINI"))
+        self.assertIsNone(self.schema.default_value("ai", "NOTAFIELD"))
+
+    def test_GIVEN_values_equivalent_to_default_WHEN_checked_THEN_are_default(self):
+        self.assertTrue(self.schema.is_default_value("ai", "PINI", "NO"))
+        self.assertTrue(self.schema.is_default_value("ai", "PINI", "0"))
+        self.assertTrue(self.schema.is_default_value("ai", "PREC", "0.0"))
+        self.assertTrue(self.schema.is_default_value("ai", "SMOO", "0.50"))
+
+    def test_GIVEN_values_different_to_default_WHEN_checked_THEN_are_not_default(self):
+        self.assertFalse(self.schema.is_default_value("ai", "PINI", "YES"))
+        self.assertFalse(self.schema.is_default_value("ai", "PREC", "3"))
+        self.assertFalse(self.schema.is_default_value("bi", "PREC", "0"))
+
+
+class LoadReleaseSchemaTests(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super(LoadReleaseSchemaTests, self).setUp()
+        self.release = os.path.join(self.root, "release")
+        self.cache_dir = os.path.join(self.root, "cache")
+        self.dbd_path = write_file(
+            os.path.join(self.release, "EPICS", "support", "mod", "dbd", "mod.dbd"),
+            MENU_DBD + RECORD_TYPE_DBD,
+        )
+        self.matcher = PathMatcher(
+            roots=[os.path.join("EPICS", "support")], include_files=["*.dbd"]
+        )
+
+    def test_GIVEN_release_with_dbd_WHEN_schema_loaded_THEN_schema_contains_record_types(self):
+        schema = load_release_schema(self.release, self.matcher, self.cache_dir)
+
+        self.assertEqual(schema.default_value("ai", "PINI"), "NO")
+
+    def test_GIVEN_schema_already_cached_WHEN_loaded_again_THEN_dbd_files_not_reparsed(self):
+        load_release_schema(self.release, self.matcher, self.cache_dir)
+
+        with mock.patch.object(RecordTypeSchema, "add_dbd") as add_dbd:
+            schema = load_release_schema(self.release, self.matcher, self.cache_dir)
+
+        add_dbd.assert_not_called()
+        self.assertEqual(schema.default_value("ai", "PINI"), "NO")
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_GIVEN_nested_dbd_edited_WHEN_loaded_again_THEN_schema_rebuilt(self):
+        load_release_schema(self.release, self.matcher, self.cache_dir)
+        release_stat = os.stat(self.release)
+        write_file(
+            self.dbd_path, MENU_DBD + RECORD_TYPE_DBD.replace('initial("0.5")', 'initial("0.25")')
+        )
+        os.utime(self.release, ns=(release_stat.st_atime_ns, release_stat.st_mtime_ns))
+
+        schema = load_release_schema(self.release, self.matcher, self.cache_dir)
+
+        self.assertEqual(schema.default_value("ai", "SMOO"), "0.25")
+
+    def test_GIVEN_different_path_rules_WHEN_loaded_THEN_cached_separately(self):
+        load_release_schema(self.release, self.matcher, self.cache_dir)
+
+        schema = load_release_schema(
+            self.release, self.matcher.with_include_files(["*.none"]), self.cache_dir
+        )
+
+        self.assertIsNone(schema.default_value("ai", "PINI"))
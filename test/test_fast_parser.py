@@ -0,0 +1,67 @@
+from src.db_filter import RecordFilter
+from src.db_parser.bulk_lexer import BulkLexer
+from src.db_parser.common import DbSyntaxError
+from src.db_parser.fast_parser import FastParser
+from src.db_parser.lexer import Lexer
+from src.db_parser.parser import Parser
+from test import test_bulk_lexer, test_parser
+
+"""
+DBs which must be parsed to the same result, or fail with the same error, by Parser and FastParser.
+"""
+PARITY_INPUTS = test_bulk_lexer.PARITY_INPUTS + [
+    'record(ai, "A") {\n    field(VAL, "1")\n    alias("B")\n}\nalias("B", "C")\nalias(A, D)\n',
+    'record(ai, "A")\nrecord(bi, "B") {}\n',
+    'record(ai, "A") {\n    field(VAL, "1"\n}\n',
+    'record(ai, "A") {\n    field(VAL "1")\n}\n',
+    'record(ai, "A") {\n    record(VAL, "1")\n}\n',
+    'record(ai, "A") {\n    alias(, "1")\n}\n',
+    'record(ai, "A") {\n    field(VAL, "1")\n',
+    'record(ai, "A") {\n    field(VAL, "1")\n}\n}\n',
+    'field(VAL, "1")',
+    "record(ai",
+    'record(ai, "A") { field(VAL, "1") @ }',
+]
+
+
+def parse(parser_class, lexer_class, contents, record_filter=None):
+    """
+    Returns:
+        the parsed DB, or the error message if it could not be parsed
+    """
+    try:
+        return parser_class(lexer_class(contents), record_filter=record_filter).db()
+    except DbSyntaxError as e:
+        return str(e)
+
+
+class FastParserTests(test_parser.ParserTests):
+    parser_class = FastParser
+
+    def test_GIVEN_dbs_WHEN_parsed_from_bulk_lexer_THEN_results_and_errors_match_parser(self):
+        for contents in PARITY_INPUTS:
+            self.assertEqual(
+                parse(FastParser, BulkLexer, contents),
+                parse(Parser, Lexer, contents),
+                msg=repr(contents),
+            )
+
+    def test_GIVEN_dbs_WHEN_parsed_from_lexer_THEN_results_and_errors_match_parser(self):
+        for contents in PARITY_INPUTS:
+            self.assertEqual(
+                parse(FastParser, Lexer, contents),
+                parse(Parser, Lexer, contents),
+                msg=repr(contents),
+            )
+
+    def test_GIVEN_record_filter_WHEN_parsed_THEN_results_match_parser(self):
+        record_filter = RecordFilter(record_types=["ai"], fields=["VAL"])
+        contents = (
+            'record(bi, "A") {\n    field(VAL, "1")\n}\n'
+            'record(ai, "B") {\n    field(DESC, "x")\n    field(VAL, "2")\n    info(a, "b")\n}\n'
+        )
+
+        self.assertEqual(
+            parse(FastParser, BulkLexer, contents, record_filter),
+            parse(Parser, Lexer, contents, record_filter),
+        )
@@ -0,0 +1,70 @@
+import unittest
+
+from src.field_values import FieldKinds, canonical_value, field_kind
+
+
+class FieldKindTests(unittest.TestCase):
+    def test_GIVEN_field_names_WHEN_getting_kind_THEN_kind_is_correct(self):
+        self.assertEqual(field_kind("PREC"), FieldKinds.NUMERIC)
+        self.assertEqual(field_kind("PINI"), FieldKinds.MENU)
+        self.assertEqual(field_kind("FTVL"), FieldKinds.MENU)
+        self.assertEqual(field_kind("FTVB"), FieldKinds.MENU)
+        self.assertEqual(field_kind("HHSV"), FieldKinds.MENU)
+        self.assertEqual(field_kind("INP"), FieldKinds.LINK)
+        self.assertEqual(field_kind("INPA"), FieldKinds.LINK)
+        self.assertEqual(field_kind("LNK1"), FieldKinds.LINK)
+        self.assertEqual(field_kind("DESC"), FieldKinds.STRING)
+
+    def test_GIVEN_val_WHEN_getting_kind_THEN_kind_depends_on_record_type(self):
+        self.assertEqual(field_kind("VAL", "ai"), FieldKinds.NUMERIC)
+        self.assertEqual(field_kind("VAL", "stringout"), FieldKinds.STRING)
+        self.assertEqual(field_kind("VAL", "lsi"), FieldKinds.STRING)
+
+
+class CanonicalValueTests(unittest.TestCase):
+    def test_GIVEN_equivalent_numbers_WHEN_canonicalised_THEN_equal(self):
+        self.assertEqual(canonical_value("PREC", "1"), canonical_value("PREC", "1.0"))
+        self.assertEqual(canonical_value("HOPR", "100"), canonical_value("HOPR", "1e2"))
+        self.assertEqual(canonical_value("MASK", "0x10"), canonical_value("MASK", "16"))
+
+    def test_GIVEN_different_numbers_WHEN_canonicalised_THEN_not_equal(self):
+        self.assertNotEqual(canonical_value("PREC", "1"), canonical_value("PREC", "1.5"))
+
+    def test_GIVEN_integers_beyond_float_precision_WHEN_canonicalised_THEN_not_equal(self):
+        self.assertNotEqual(
+            canonical_value("MASK", str(2**53)), canonical_value("MASK", str(2**53 + 1))
+        )
+        self.assertEqual(canonical_value("MASK", str(2**53 + 1)), str(2**53 + 1))
+
+    def test_GIVEN_numeric_field_with_macro_value_WHEN_canonicalised_THEN_value_unchanged(self):
+        self.assertEqual(canonical_value("PREC", "$(PREC=3)"), "$(PREC=3)")
+
+    def test_GIVEN_menu_index_and_choice_WHEN_canonicalised_THEN_equal(self):
+        self.assertEqual(canonical_value("PINI", "1"), canonical_value("PINI", "YES"))
+        self.assertEqual(canonical_value("SCAN", "6"), canonical_value("SCAN", "1 second"))
+        self.assertNotEqual(canonical_value("PINI", "0"), canonical_value("PINI", "YES"))
+        self.assertEqual(canonical_value("FTVL", "10"), canonical_value("FTVL", "DOUBLE"))
+
+    def test_GIVEN_links_differing_in_whitespace_and_flag_order_WHEN_canonicalised_THEN_equal(self):
+        self.assertEqual(
+            canonical_value("INP", "$(P)X CP MS"), canonical_value("INP", " $(P)X  MS   CP")
+        )
+
+    def test_GIVEN_links_with_flags_in_other_case_WHEN_canonicalised_THEN_not_equal(self):
+        self.assertNotEqual(
+            canonical_value("INP", "$(P)X CP MS"), canonical_value("INP", "$(P)X CP ms")
+        )
+        self.assertEqual(canonical_value("INP", " $(P)X  ms   CP"), "$(P)X ms CP")
+
+    def test_GIVEN_links_differing_only_in_default_flags_WHEN_canonicalised_THEN_equal(self):
+        self.assertEqual(canonical_value("DOL", "$(P)X NPP NMS"), canonical_value("DOL", "$(P)X"))
+        self.assertEqual(canonical_value("FLNK", "$(P)X.VAL"), canonical_value("FLNK", "$(P)X"))
+
+    def test_GIVEN_links_with_different_flags_WHEN_canonicalised_THEN_not_equal(self):
+        self.assertNotEqual(canonical_value("INP", "$(P)X CP"), canonical_value("INP", "$(P)X PP"))
+
+    def test_GIVEN_hardware_link_WHEN_canonicalised_THEN_only_surrounding_whitespace_removed(self):
+        self.assertEqual(canonical_value("INP", " @asyn($(PORT), 0) CMD "), "@asyn($(PORT), 0) CMD")
+
+    def test_GIVEN_string_field_WHEN_canonicalised_THEN_value_unchanged(self):
+        self.assertEqual(canonical_value("DESC", " A description "), " A description ")
@@ -0,0 +1,60 @@
+import unittest
+
+from src.db_diff import ChangeKinds, DbChange, Difference, DifferenceKinds
+from src.gating import ChangeBudget
+
+
+def modified(db_path, *difference_kinds):
+    return DbChange(
+        ChangeKinds.MODIFIED,
+        db_path,
+        "Modified",
+        [Difference(kind, "Difference") for kind in difference_kinds],
+    )
+
+
+class ChangeBudgetTests(unittest.TestCase):
+    def test_GIVEN_change_WHEN_counted_THEN_change_and_differences_of_kinds_counted(self):
+        budget = ChangeBudget([DifferenceKinds.RECORD_REMOVED, ChangeKinds.PARSE_ERROR])
+
+        self.assertEqual(
+            budget.count(
+                modified(
+                    "a.db",
+                    DifferenceKinds.RECORD_REMOVED,
+                    DifferenceKinds.FIELD_CHANGED,
+                    DifferenceKinds.RECORD_REMOVED,
+                )
+            ),
+            2,
+        )
+        self.assertEqual(budget.count(DbChange(ChangeKinds.PARSE_ERROR, "b.db", "Error")), 1)
+        self.assertEqual(budget.count(DbChange(ChangeKinds.DELETED, "c.db", "Deleted")), 0)
+
+    def test_GIVEN_budget_WHEN_exceeded_THEN_changes_stop_and_are_closed(self):
+        produced = []
+
+        def changes():
+            for db in ["a.db", "b.db", "c.db", "d.db"]:
+                produced.append(db)
+                yield modified(db, DifferenceKinds.FIELD_REMOVED)
+
+        budget = ChangeBudget([DifferenceKinds.FIELD_REMOVED], max_changes=1)
+        generator = changes()
+
+        limited = [change.db_path for change in budget.limit(generator)]
+
+        self.assertListEqual(limited, ["a.db", "b.db"])
+        self.assertListEqual(produced, ["a.db", "b.db"])
+        self.assertTrue(budget.exceeded)
+        self.assertIsNone(next(generator, None))  # Closed
+
+    def test_GIVEN_budget_WHEN_not_exceeded_THEN_all_changes_returned(self):
+        budget = ChangeBudget([DifferenceKinds.RECORD_REMOVED], max_changes=1)
+
+        limited = list(
+            budget.limit([modified("a.db", DifferenceKinds.RECORD_REMOVED), modified("b.db")])
+        )
+
+        self.assertEqual(len(limited), 2)
+        self.assertFalse(budget.exceeded)
@@ -0,0 +1,116 @@
+import os
+import subprocess
+
+from src.db_diff import ChangeKinds, DifferenceKinds
+from src.db_filter import RecordFilter
+from src.git_changes import GitDbChangesIterator, GitRepository
+from src.release_sources import decode_text
+from test.helpers import RECORD, TemporaryDirectoryTestCase
+
+DB_PATH = os.path.join("mymodApp", "Db", "test.db")
+
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+
+class GitDbChangesIteratorTests(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super(GitDbChangesIteratorTests, self).setUp()
+        self._git("init", "-q")
+        self.repository = GitRepository(self.root)
+
+    def _git(self, *args):
+        subprocess.run(
+            ["git", "-C", self.root, "-c", "user.name=test", "-c", "user.email=test@example.com"]
+            + list(args),
+            check=True,
+            stdout=subprocess.PIPE,
+        )
+
+    def _commit(self, tag):
+        self._git("add", "-A")
+        self._git("commit", "-q", "--allow-empty", "-m", tag)
+        self._git("tag", tag)
+
+    def test_GIVEN_db_changed_between_revisions_WHEN_iterate_THEN_changes_reported(self):
+        self._write_file(DB_PATH, RECORD.format("A", "1"))
+        self._commit("v1")
+        self._write_file(DB_PATH, RECORD.format("A", "2"))
+        self._commit("v2")
+
+        changes = list(GitDbChangesIterator(self.repository, "v1", "v2").change_descriptions())
+
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].kind, ChangeKinds.MODIFIED)
+        self.assertEqual(changes[0].db_path, DB_PATH)
+        self.assertListEqual(
+            [d.kind for d in changes[0].differences], [DifferenceKinds.FIELD_CHANGED]
+        )
+
+    def test_GIVEN_dbs_deleted_and_added_WHEN_iterate_with_additions_THEN_deleted_then_added(self):
+        self._write_file(DB_PATH, RECORD.format("A", "1"))
+        self._commit("v1")
+        os.remove(os.path.join(self.root, DB_PATH))
+        self._write_file(os.path.join("mymodApp", "Db", "new.db"), RECORD.format("A", "1"))
+        self._commit("v2")
+
+        iterator = GitDbChangesIterator(self.repository, "v1", "v2", report_additions=True)
+        changes = list(iterator.change_descriptions())
+
+        self.assertListEqual([c.kind for c in changes], [ChangeKinds.DELETED, ChangeKinds.ADDED])
+
+    def test_GIVEN_only_unchanged_dbs_and_other_files_WHEN_iterate_THEN_nothing_reported(self):
+        self._write_file(DB_PATH, RECORD.format("A", "1"))
+        self._write_file(os.path.join("mymodApp", "src", "a.c"), "int a;")
+        self._commit("v1")
+        self._write_file(os.path.join("mymodApp", "src", "a.c"), "int b;")
+        self._write_file(os.path.join("mymodApp", "Db", "O.Common", "test.db"), "")
+        self._commit("v2")
+
+        iterator = GitDbChangesIterator(self.repository, "v1", "v2", report_additions=True)
+
+        self.assertListEqual(iterator.changed_dbs(), [])
+        self.assertListEqual(list(iterator.change_descriptions()), [])
+
+    def test_GIVEN_record_filter_with_path_WHEN_iterate_THEN_only_matching_dbs_compared(self):
+        other = os.path.join("otherApp", "Db", "other.db")
+        self._write_file(DB_PATH, RECORD.format("A", "1"))
+        self._write_file(other, RECORD.format("A", "1"))
+        self._commit("v1")
+        self._write_file(DB_PATH, RECORD.format("A", "2"))
+        self._write_file(other, RECORD.format("A", "2"))
+        self._commit("v2")
+
+        iterator = GitDbChangesIterator(
+            self.repository,
+            "v1",
+            "v2",
+            record_filter=RecordFilter.from_expression("path=mymodApp/*"),
+        )
+
+        self.assertListEqual([c.db_path for c in iterator.change_descriptions()], [DB_PATH])
+
+    def test_GIVEN_invalid_revision_WHEN_iterate_THEN_value_error(self):
+        self._commit("v1")
+
+        with self.assertRaises(ValueError):
+            list(GitDbChangesIterator(self.repository, "v1", "missing").change_descriptions())
+
+    def test_GIVEN_blobs_WHEN_read_in_one_batch_THEN_contents_of_each_returned(self):
+        self._write_file("a.db", "first\r\n")
+        self._write_file("b.db", "")
+        self._commit("v1")
+        changes = self.repository.changed_files(EMPTY_TREE, "v1")
+
+        with self.repository.blob_reader() as blobs:
+            contents = [decode_text(blobs.read(new_oid)) for _, _, new_oid in changes]
+
+        self.assertListEqual([path for path, _, _ in changes], ["a.db", "b.db"])
+        self.assertListEqual(contents, ["first\n", ""])
+
+    def test_GIVEN_git_not_installed_WHEN_iterate_THEN_value_error(self):
+        repository = GitRepository(self.root, git=os.path.join(self.root, "missing-git"))
+
+        with self.assertRaises(ValueError):
+            list(GitDbChangesIterator(repository, "v1", "v2").change_descriptions())
+        with self.assertRaises(ValueError):
+            repository.blob_reader()
@@ -20,50 +20,52 @@ def token_from_type(token_type):
 
 
 class LexerTests(unittest.TestCase):
+    lexer_class = Lexer
+
     def test_WHEN_lexer_lexes_empty_file_THEN_produces_an_EOF_token(self):
-        tokens = get_tokens_list(Lexer(""))
+        tokens = get_tokens_list(self.lexer_class(""))
 
         expected_tokens = [token_from_type(TokenTypes.EOF)]
 
         self.assertListEqual(tokens, expected_tokens)
 
     def test_WHEN_lexer_lexes_a_record_literal_THEN_produces_a_record_token(self):
-        tokens = get_tokens_list(Lexer("record"))
+        tokens = get_tokens_list(self.lexer_class("record"))
 
         expected_tokens = [token_from_type(TokenTypes.RECORD), token_from_type(TokenTypes.EOF)]
 
         self.assertListEqual(tokens, expected_tokens)
 
     def test_WHEN_lexer_lexes_a_literal_THEN_produces_a_literal_token(self):
-        tokens = get_tokens_list(Lexer("HI_THIS_IS_A_LITERAL"))
+        tokens = get_tokens_list(self.lexer_class("HI_THIS_IS_A_LITERAL"))
 
         expected_tokens = [token_from_type(TokenTypes.LITERAL), token_from_type(TokenTypes.EOF)]
 
         self.assertListEqual(tokens, expected_tokens)
 
     def test_WHEN_lexer_lexes_whitespace_THEN_whitespace_is_ignored(self):
-        tokens = get_tokens_list(Lexer("      "))
+        tokens = get_tokens_list(self.lexer_class("      "))
 
         expected_tokens = [token_from_type(TokenTypes.EOF)]
 
         self.assertListEqual(tokens, expected_tokens)
 
     def test_WHEN_lexer_lexes_a_comment_THEN_comment_is_ignored(self):
-        tokens = get_tokens_list(Lexer("# Hello this is a comment"))
+        tokens = get_tokens_list(self.lexer_class("# Hello this is a comment"))
 
         expected_tokens = [token_from_type(TokenTypes.EOF)]
 
         self.assertListEqual(tokens, expected_tokens)
 
     def test_WHEN_lexer_lexes_a_macro_THEN_macro_is_ignored(self):
-        tokens = get_tokens_list(Lexer("$(MACRO=VALUE)"))
+        tokens = get_tokens_list(self.lexer_class("$(MACRO=VALUE)"))
 
         expected_tokens = [token_from_type(TokenTypes.EOF)]
 
         self.assertListEqual(tokens, expected_tokens)
 
     def test_WHEN_lexer_lexes_brackets_THEN_returns_bracket_tokens(self):
-        tokens = get_tokens_list(Lexer("()"))
+        tokens = get_tokens_list(self.lexer_class("()"))
 
         expected_tokens = [
             token_from_type(TokenTypes.L_BRACKET),
@@ -74,7 +76,7 @@ class LexerTests(unittest.TestCase):
         self.assertListEqual(tokens, expected_tokens)
 
     def test_WHEN_lexer_lexes_braces_THEN_returns_brace_tokens(self):
-        tokens = get_tokens_list(Lexer("{}"))
+        tokens = get_tokens_list(self.lexer_class("{}"))
 
         expected_tokens = [
             token_from_type(TokenTypes.L_BRACE),
@@ -85,7 +87,7 @@ class LexerTests(unittest.TestCase):
         self.assertListEqual(tokens, expected_tokens)
 
     def test_WHEN_lexer_lexes_a_quoted_string_THEN_returns_quoted_string_token(self):
-        tokens = get_tokens_list(Lexer(r'"This is a quoted string"'))
+        tokens = get_tokens_list(self.lexer_class(r'"This is a quoted string"'))
 
         expected_tokens = [
             token_from_type(TokenTypes.QUOTED_STRING),
@@ -97,7 +99,7 @@ class LexerTests(unittest.TestCase):
     def test_WHEN_lexer_lexes_a_quoted_string_containing_escaped_quotes_THEN_returns_a_single_quoted_string_token(
         self,
     ):
-        tokens = get_tokens_list(Lexer(r'"This \"is\" a quoted string"'))
+        tokens = get_tokens_list(self.lexer_class(r'"This \"is\" a quoted string"'))
 
         expected_tokens = [
             token_from_type(TokenTypes.QUOTED_STRING),
@@ -109,7 +111,7 @@ class LexerTests(unittest.TestCase):
     def test_WHEN_lexer_lexes_a_quoted_string_containing_comment_syntax_THEN_returns_a_single_quoted_string_token(
         self,
     ):
-        tokens = get_tokens_list(Lexer(r'"This # is a quoted string"'))
+        tokens = get_tokens_list(self.lexer_class(r'"This # is a quoted string"'))
 
         expected_tokens = [
             token_from_type(TokenTypes.QUOTED_STRING),
@@ -119,7 +121,7 @@ class LexerTests(unittest.TestCase):
         self.assertListEqual(tokens, expected_tokens)
 
     def test_WHEN_lexer_lexes_an_empty_quoted_string_THEN_returns_a_quoted_string_token(self):
-        tokens = get_tokens_list(Lexer(r'""'))
+        tokens = get_tokens_list(self.lexer_class(r'""'))
 
         expected_tokens = [
             token_from_type(TokenTypes.QUOTED_STRING),
@@ -130,12 +132,12 @@ class LexerTests(unittest.TestCase):
 
     def test_WHEN_lexer_lexes_a_string_with_missing_end_quote_THEN_raises_syntax_error(self):
         with self.assertRaises(DbSyntaxError):
-            get_tokens_list(Lexer(r'"This is a quoted string without a closing quote'))
+            get_tokens_list(self.lexer_class(r'"This is a quoted string without a closing quote'))
 
     def test_WHEN_lexer_lexes_a_minimal_record_declaration_THEN_returns_an_appropriate_set_of_tokens(
         self,
     ):
-        tokens = get_tokens_list(Lexer(r'record(ai, "$(P)TEST"){}'))
+        tokens = get_tokens_list(self.lexer_class(r'record(ai, "$(P)TEST"){}'))
 
         expected_tokens = [
             token_from_type(TokenTypes.RECORD),
@@ -156,7 +158,7 @@ class LexerTests(unittest.TestCase):
         
         record"""
 
-        tokens = get_tokens_list(Lexer(content))
+        tokens = get_tokens_list(self.lexer_class(content))
 
         expected_tokens = [
             token_from_type(TokenTypes.RECORD),
@@ -169,7 +171,7 @@ class LexerTests(unittest.TestCase):
 
     def test_GIVEN_content_WHEN_lexed_THEN_column_number_is_correct(self):
         indentation_level = 4
-        tokens = get_tokens_list(Lexer("{}record".format(" " * indentation_level)))
+        tokens = get_tokens_list(self.lexer_class("{}record".format(" " * indentation_level)))
 
         expected_tokens = [
             token_from_type(TokenTypes.RECORD),
@@ -187,7 +189,7 @@ class LexerTests(unittest.TestCase):
         # Hi this is a comment on one line
         record
         """
-        tokens = get_tokens_list(Lexer(content))
+        tokens = get_tokens_list(self.lexer_class(content))
 
         expected_tokens = [
             token_from_type(TokenTypes.RECORD),
@@ -195,3 +197,19 @@ class LexerTests(unittest.TestCase):
         ]
 
         self.assertListEqual(tokens, expected_tokens)
+
+    def test_GIVEN_content_that_can_not_be_lexed_WHEN_lexed_THEN_error_has_position_and_excerpt(
+        self,
+    ):
+        with self.assertRaises(DbSyntaxError) as context:
+            get_tokens_list(self.lexer_class('record(ai, "A") {\n    field(VAL, @)\n}'))
+
+        self.assertEqual((context.exception.line, context.exception.col), (2, 15))
+        self.assertIn("    2 |     field(VAL, @)\n      |                ^", str(context.exception))
+
+    def test_GIVEN_content_WHEN_lexed_THEN_line_numbers_only_worked_out_when_requested(self):
+        lexer = self.lexer_class("record\nfield")
+        tokens = get_tokens_list(lexer)
+
+        self.assertIsNone(lexer.positions._line_starts)
+        self.assertEqual((tokens[1].line, tokens[1].col), (2, 0))
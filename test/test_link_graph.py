@@ -0,0 +1,86 @@
+import unittest
+
+from src.db_diff import ChangeKinds, DifferenceKinds
+from src.link_graph import LinkGraph, LinkReference, link_target
+
+
+def record(name, fields=(), aliases=()):
+    return {
+        "type": "calc",
+        "name": name,
+        "fields": list(fields),
+        "infos": [],
+        "aliases": list(aliases),
+    }
+
+
+class LinkTargetTests(unittest.TestCase):
+    def test_GIVEN_links_with_flags_and_fields_WHEN_target_found_THEN_record_name_returned(self):
+        for value in [
+            "$(P)A",
+            "$(P)A PP",
+            " $(P)A.VAL  CP MS ",
+            "$(P)A.HIHI NPP NMS",
+            "$(P)A.B1 cpp",
+        ]:
+            self.assertEqual(link_target(value), "$(P)A", value)
+
+    def test_GIVEN_values_which_are_not_links_to_records_WHEN_target_found_THEN_none(self):
+        for value in [
+            "",
+            "  ",
+            "1",
+            "0x10",
+            "-1.5e3",
+            "@asyn($(PORT),0)",
+            "#C0 S1",
+            '{"const": 1}',
+            "a b",
+        ]:
+            self.assertIsNone(link_target(value), value)
+
+
+class LinkGraphTests(unittest.TestCase):
+    def setUp(self):
+        self.graph = LinkGraph()
+        self.graph.add_db(
+            "a.db",
+            [
+                record("$(P)A", [("INP", "$(P)B CP MS"), ("DESC", "$(P)B"), ("FLNK", "$(P)C")]),
+                record("$(P)B", aliases=["$(P)B_ALIAS"]),
+            ],
+        )
+        self.graph.add_db("b.db", [record("$(P)D", [("INPA", "$(P)B.SEVR"), ("DOL", "1")])])
+
+    def test_GIVEN_dbs_WHEN_added_THEN_records_aliases_and_links_indexed(self):
+        self.assertTrue(self.graph.defines("$(P)B_ALIAS"))
+        self.assertFalse(self.graph.defines("$(P)C"))
+        self.assertListEqual(
+            list(self.graph.links_to(["$(P)B"])),
+            [
+                LinkReference("a.db", "$(P)A", "INP", "$(P)B"),
+                LinkReference("b.db", "$(P)D", "INPA", "$(P)B"),
+            ],
+        )
+
+    def test_GIVEN_records_removed_WHEN_broken_links_found_THEN_only_links_to_undefined_records(
+        self,
+    ):
+        links = list(self.graph.broken_links(["$(P)B", "$(P)C"]))
+
+        self.assertListEqual(links, [LinkReference("a.db", "$(P)A", "FLNK", "$(P)C")])
+
+    def test_GIVEN_broken_links_WHEN_changes_found_THEN_one_change_per_db(self):
+        self.graph.add_db("c.db", [record("$(P)E", [("OUT", "$(P)X PP"), ("SDIS", "$(P)C")])])
+
+        changes = self.graph.broken_link_changes(["$(P)C", "$(P)X"])
+
+        self.assertListEqual([c.db_path for c in changes], ["a.db", "c.db"])
+        self.assertEqual(changes[1].kind, ChangeKinds.BROKEN_LINKS)
+        self.assertListEqual(
+            [(d.kind, d.record, d.field) for d in changes[1].differences],
+            [
+                (DifferenceKinds.LINK_BROKEN, "$(P)E", "OUT"),
+                (DifferenceKinds.LINK_BROKEN, "$(P)E", "SDIS"),
+            ],
+        )
@@ -0,0 +1,90 @@
+import contextlib
+import io
+import json
+import os
+
+import main
+from src.gating import EXIT_OVER_BUDGET
+from test.helpers import RECORD, ReleasesTestCase
+
+
+class MainTests(ReleasesTestCase):
+    def _compare_releases(self, *arguments):
+        """
+        Compares release 1.0.0 with 2.0.0 in self.root, writing the details to a file.
+        Returns:
+            the exit code
+        """
+        argv = [
+            "--old",
+            "1.0.0",
+            "--new",
+            "2.0.0",
+            "--releases-dir",
+            self.root,
+            "--cache-dir",
+            os.path.join(self.root, "cache"),
+            "--details",
+            os.path.join(self.root, "details.txt"),
+            "--progress",
+            "never",
+        ] + list(arguments)
+        with self.assertRaises(SystemExit) as context, contextlib.redirect_stderr(io.StringIO()):
+            main.compare_releases(argv)
+        return context.exception.code
+
+    def _write_broken_link(self):
+        removed_from = os.path.join("EPICS", "support", "mod", "db", "a.db")
+        linking = os.path.join("EPICS", "support", "mod", "db", "b.db")
+        link = 'record(calc, "$(P)C") {\n    field(INPA, "$(P)B CP")\n}\n'
+        self._write("1.0.0", removed_from, RECORD.format("A", "1") + RECORD.format("B", "1"))
+        self._write("2.0.0", removed_from, RECORD.format("A", "1"))
+        self._write("1.0.0", linking, link)
+        self._write("2.0.0", linking, link)
+
+    def test_GIVEN_broken_link_WHEN_compare_releases_failing_on_broken_links_THEN_exits_over_budget(
+        self,
+    ):
+        self._write_broken_link()
+
+        code = self._compare_releases("--fail-on", "broken-links")
+
+        self.assertEqual(code, EXIT_OVER_BUDGET)
+
+    def test_GIVEN_fail_on_broken_links_WHEN_compare_releases_with_jobs_THEN_arguments_rejected(
+        self,
+    ):
+        self._write_broken_link()
+
+        code = self._compare_releases("--fail-on", "broken-links", "--jobs", "2")
+
+        self.assertEqual(code, 2)
+
+    def test_GIVEN_fail_on_broken_links_WHEN_compare_paths_THEN_arguments_rejected(self):
+        old = self._write("1.0.0", "a.db", RECORD.format("A", "1"))
+        new = self._write("2.0.0", "a.db", RECORD.format("A", "1"))
+
+        with self.assertRaises(SystemExit) as context, contextlib.redirect_stderr(io.StringIO()):
+            main.compare_paths([old, new, "--fail-on", "broken-links"])
+
+        self.assertEqual(context.exception.code, 2)
+
+    def test_GIVEN_config_WHEN_compare_directories_THEN_unconfigured_rules_search_whole_tree(self):
+        self._write("1.0.0", "a.db", RECORD.format("A", "1"))
+        self._write("2.0.0", "a.db", RECORD.format("A", "2"))
+        config = self._write_file("rules.json", json.dumps({"exclude_paths": []}))
+        details = os.path.join(self.root, "details.txt")
+
+        main.compare_paths(
+            [
+                self._release_path("1.0.0"),
+                self._release_path("2.0.0"),
+                "--config",
+                config,
+                "--details",
+                details,
+            ]
+        )
+
+        with open(details) as f:
+            self.assertIn("a.db", f.read())
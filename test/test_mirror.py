@@ -0,0 +1,141 @@
+import json
+import os
+import zipfile
+from unittest import mock
+
+from src.mirror import ReleaseMirror
+from src.path_matcher import PathMatcher
+from test.helpers import DB_PATH, ReleasesTestCase
+
+
+class ReleaseMirrorTests(ReleasesTestCase):
+    def setUp(self):
+        super(ReleaseMirrorTests, self).setUp()
+        self.share = os.path.join(self.root, "share")
+        self.store = os.path.join(self.root, "store")
+        self.mirror = ReleaseMirror(
+            self.store,
+            PathMatcher(
+                roots=[os.path.join("EPICS", "support")],
+                exclude_directories=["O.*"],
+                include_files=["*.db"],
+            ),
+            workers=2,
+        )
+
+    def _release_path(self, release):
+        return os.path.join(self.share, release)
+
+    def _mirrored(self, release, relative_path):
+        return os.path.join(self.store, "releases", release, relative_path)
+
+    def test_GIVEN_release_WHEN_mirrored_THEN_only_interesting_files_copied(self):
+        self._write("1.0.0", DB_PATH, "record(ai, A)")
+        self._write("1.0.0", os.path.join("EPICS", "support", "mod", "O.Common", "x.db"), "")
+        self._write("1.0.0", os.path.join("EPICS", "support", "mod", "src", "x.c"), "")
+
+        result = self.mirror.mirror(self._release_path("1.0.0"), "1.0.0")
+
+        self.assertEqual(result.copied, 1)
+        with open(self._mirrored("1.0.0", DB_PATH)) as f:
+            self.assertEqual(f.read(), "record(ai, A)")
+        self.assertFalse(
+            os.path.exists(
+                self._mirrored("1.0.0", os.path.join("EPICS", "support", "mod", "O.Common"))
+            )
+        )
+        self.assertFalse(
+            os.path.exists(self._mirrored("1.0.0", os.path.join("EPICS", "support", "mod", "src")))
+        )
+
+    def test_GIVEN_identical_files_in_two_releases_WHEN_mirrored_THEN_contents_stored_once(self):
+        self._write("1.0.0", DB_PATH, "record(ai, A)")
+        self._write("2.0.0", DB_PATH, "record(ai, A)")
+
+        self.mirror.mirror(self._release_path("1.0.0"), "1.0.0")
+        result = self.mirror.mirror(self._release_path("2.0.0"), "2.0.0")
+
+        self.assertEqual(result.copied, 0)
+        self.assertEqual(result.deduplicated, 1)
+        self.assertTrue(
+            os.path.samefile(self._mirrored("1.0.0", DB_PATH), self._mirrored("2.0.0", DB_PATH))
+        )
+
+    def test_GIVEN_release_already_mirrored_WHEN_mirrored_again_THEN_files_skipped(self):
+        self._write("1.0.0", DB_PATH, "record(ai, A)")
+        self.mirror.mirror(self._release_path("1.0.0"), "1.0.0")
+
+        result = self.mirror.mirror(self._release_path("1.0.0"), "1.0.0")
+
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(result.copied + result.deduplicated, 0)
+
+    def test_GIVEN_interrupted_mirror_WHEN_mirrored_again_THEN_only_missing_files_copied(self):
+        other_db = os.path.join("EPICS", "support", "mod", "db", "other.db")
+        self._write("1.0.0", DB_PATH, "record(ai, A)")
+        self._write("1.0.0", other_db, "record(ai, B)")
+        self.mirror.mirror(self._release_path("1.0.0"), "1.0.0")
+
+        # Simulate the run having been interrupted before other.db was written to the manifest
+        manifest_path = os.path.join(self.store, "manifests", "1.0.0.jsonl")
+        with open(manifest_path) as f:
+            entries = [json.loads(line) for line in f]
+        with open(manifest_path, "w") as f:
+            for entry in entries:
+                if entry["path"] != other_db:
+                    f.write(json.dumps(entry) + "\n")
+            f.write('{"path": "trunc')
+
+        result = self.mirror.mirror(self._release_path("1.0.0"), "1.0.0")
+
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(result.deduplicated, 1)
+
+    def test_GIVEN_release_without_interesting_files_WHEN_mirrored_THEN_release_has_epics_directory(
+        self,
+    ):
+        os.makedirs(os.path.join(self._release_path("1.0.0"), "EPICS"))
+
+        self.mirror.mirror(self._release_path("1.0.0"), "1.0.0")
+
+        self.assertTrue(os.path.isdir(self._mirrored("1.0.0", "EPICS")))
+
+    def test_GIVEN_copy_fails_WHEN_mirrored_THEN_no_temporary_file_left(self):
+        self._write("1.0.0", DB_PATH, "record(ai, A)")
+
+        with mock.patch("src.mirror.os.replace", side_effect=OSError("Disk full")):
+            with self.assertRaises(OSError):
+                self.mirror.mirror(self._release_path("1.0.0"), "1.0.0")
+
+        self.assertListEqual(
+            [files for _, _, files in os.walk(os.path.join(self.store, "objects")) if files], []
+        )
+
+    def test_GIVEN_file_removed_from_release_WHEN_mirrored_again_THEN_removed_from_mirror(self):
+        other_db = os.path.join("EPICS", "support", "other", "db", "other.db")
+        self._write("1.0.0", DB_PATH, "record(ai, A)")
+        self._write("1.0.0", other_db, "record(ai, B)")
+        self.mirror.mirror(self._release_path("1.0.0"), "1.0.0")
+
+        os.remove(os.path.join(self._release_path("1.0.0"), other_db))
+        result = self.mirror.mirror(self._release_path("1.0.0"), "1.0.0")
+
+        self.assertEqual(result.removed, 1)
+        self.assertTrue(os.path.exists(self._mirrored("1.0.0", DB_PATH)))
+        self.assertFalse(
+            os.path.exists(self._mirrored("1.0.0", os.path.join("EPICS", "support", "other")))
+        )
+
+    def test_GIVEN_archived_release_WHEN_mirrored_THEN_mirrored_as_directory(self):
+        self._write("1.0.0", DB_PATH, "record(ai, A)")
+        archive_path = self._release_path("1.0.0.zip")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.write(
+                os.path.join(self._release_path("1.0.0"), DB_PATH), DB_PATH.replace(os.sep, "/")
+            )
+
+        result = self.mirror.mirror(archive_path, "1.0.0")
+
+        self.assertEqual(result.copied, 1)
+        with open(self._mirrored("1.0.0", DB_PATH)) as f:
+            self.assertEqual(f.read(), "record(ai, A)")
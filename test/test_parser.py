@@ -1,7 +1,8 @@
 import unittest
 
-from src.db_parser.common import DbSyntaxError
-from src.db_parser.lexer import Token
+from src.db_filter import RecordFilter
+from src.db_parser.common import UNKNOWN_OFFSET, DbSyntaxError
+from src.db_parser.lexer import Lexer, Token
 from src.db_parser.parser import Parser
 from src.db_parser.tokens import TokenTypes
 
@@ -67,36 +68,38 @@ class MockLexer:
 
 
 class ParserTests(unittest.TestCase):
+    parser_class = Parser
+
     def test_WHEN_parser_given_no_tokens_THEN_raises_parse_error(self):
         lexer = (i for i in [])  # No tokens
 
         with self.assertRaises(DbSyntaxError):
-            Parser(lexer).db()
+            self.parser_class(lexer).db()
 
     def test_WHEN_parser_given_only_an_end_of_file_token_while_parsing_db_THEN_no_parse_error(self):
         lexer = MockLexer()
 
-        Parser(lexer).db()
+        self.parser_class(lexer).db()
 
     def test_WHEN_parser_given_a_quoted_string_THEN_parser_can_extract_the_value(self):
         val = "HELLO"
 
         lexer = MockLexer().add_token(TokenTypes.QUOTED_STRING, '"{}"'.format(val))
 
-        self.assertEqual(Parser(lexer).value(), val)
+        self.assertEqual(self.parser_class(lexer).value(), val)
 
     def test_WHEN_parser_given_a_string_literal_THEN_parser_can_extract_the_value(self):
         val = "TESTVALUE"
 
         lexer = MockLexer().add_token(TokenTypes.LITERAL, "{}".format(val))
 
-        self.assertEqual(Parser(lexer).value(), val)
+        self.assertEqual(self.parser_class(lexer).value(), val)
 
     def test_GIVEN_a_token_that_does_not_represent_a_value_WHEN_parse_value_THEN_parser_error(self):
         lexer = MockLexer().add_token(TokenTypes.RECORD)
 
         with self.assertRaises(DbSyntaxError):
-            Parser(lexer).value()
+            self.parser_class(lexer).value()
 
     def test_GIVEN_a_bracketed_key_value_pair_where_both_values_are_quoted_WHEN_parse_key_value_pair_THEN_can_extract_key_and_value(
         self,
@@ -113,7 +116,7 @@ class ParserTests(unittest.TestCase):
             .add_token(TokenTypes.R_BRACKET, '"{}"'.format(value))
         )
 
-        parsed_key, parsed_value = Parser(lexer).key_value_pair()
+        parsed_key, parsed_value = self.parser_class(lexer).key_value_pair()
 
         self.assertEqual(parsed_key, key)
         self.assertEqual(parsed_value, value)
@@ -126,7 +129,7 @@ class ParserTests(unittest.TestCase):
         # (KEY, "VALUE")
         lexer = MockLexer().add_key_value_pair(key, value)
 
-        parsed_key, parsed_value = Parser(lexer).key_value_pair()
+        parsed_key, parsed_value = self.parser_class(lexer).key_value_pair()
 
         self.assertEqual(parsed_key, key)
         self.assertEqual(parsed_value, value)
@@ -146,7 +149,7 @@ class ParserTests(unittest.TestCase):
             .add_token(TokenTypes.R_BRACKET, '"{}"'.format(value))
         )
 
-        parsed_key, parsed_value = Parser(lexer).key_value_pair()
+        parsed_key, parsed_value = self.parser_class(lexer).key_value_pair()
 
         self.assertEqual(parsed_key, key)
         self.assertEqual(parsed_value, value)
@@ -166,7 +169,7 @@ class ParserTests(unittest.TestCase):
         )
 
         with self.assertRaises(DbSyntaxError):
-            Parser(lexer).key_value_pair()
+            self.parser_class(lexer).key_value_pair()
 
     def test_GIVEN_a_field_declaration_WHEN_parse_field_THEN_can_extract_key_and_value(self):
         key, value = "PINI", "YES"
@@ -174,7 +177,7 @@ class ParserTests(unittest.TestCase):
         # field(PINI, "YES")
         lexer = MockLexer().add_token(TokenTypes.FIELD).add_key_value_pair(key, value)
 
-        parsed_key, parsed_value = Parser(lexer).field()
+        parsed_key, parsed_value = self.parser_class(lexer).field()
 
         self.assertEqual(parsed_key, key)
         self.assertEqual(parsed_value, value)
@@ -193,7 +196,7 @@ class ParserTests(unittest.TestCase):
             .add_token(TokenTypes.R_BRACE)
         )
 
-        parsed_record = Parser(lexer).record()
+        parsed_record = self.parser_class(lexer).record()
 
         self.assertEqual(parsed_record["name"], rec_name)
         self.assertEqual(parsed_record["type"], rec_type)
@@ -221,7 +224,7 @@ class ParserTests(unittest.TestCase):
             .add_token(TokenTypes.R_BRACE)
         )
 
-        parsed_record = Parser(lexer).record()
+        parsed_record = self.parser_class(lexer).record()
 
         self.assertEqual(parsed_record["name"], rec_name)
         self.assertEqual(parsed_record["type"], rec_type)
@@ -246,7 +249,7 @@ class ParserTests(unittest.TestCase):
             .add_token(TokenTypes.R_BRACE)
         )
 
-        parsed_record = Parser(lexer).record()
+        parsed_record = self.parser_class(lexer).record()
 
         self.assertEqual(parsed_record["name"], rec_name)
         self.assertEqual(parsed_record["type"], rec_type)
@@ -271,7 +274,7 @@ class ParserTests(unittest.TestCase):
             .add_alias(rec_name, alias_name)
         )
 
-        parsed_db = Parser(lexer).db()
+        parsed_db = self.parser_class(lexer).db()
 
         self.assertEqual(len(parsed_db), 1)
         parsed_record = parsed_db[0]
@@ -302,7 +305,7 @@ class ParserTests(unittest.TestCase):
             .add_token(TokenTypes.R_BRACE)
         )
 
-        parsed_db = Parser(lexer).db()
+        parsed_db = self.parser_class(lexer).db()
 
         self.assertEqual(len(parsed_db), 2)
         rec1, rec2 = parsed_db
@@ -327,7 +330,7 @@ class ParserTests(unittest.TestCase):
             .add_record_header(rec_type_1, rec_name_1)
             .add_record_header(rec_type_2, rec_name_2)
         )
-        parsed_db = Parser(lexer).db()
+        parsed_db = self.parser_class(lexer).db()
 
         self.assertEqual(len(parsed_db), 2)
         rec1, rec2 = parsed_db
@@ -336,3 +339,94 @@ class ParserTests(unittest.TestCase):
         self.assertEqual(rec2["type"], rec_type_2)
         self.assertEqual(rec1["name"], rec_name_1)
         self.assertEqual(rec2["name"], rec_name_2)
+
+    def test_GIVEN_record_filter_excluding_a_record_type_WHEN_parse_as_db_THEN_record_is_skipped(
+        self,
+    ):
+        # record(ai, "$(P)TEST1") {
+        #     field(PINI, "YES")
+        # }
+        # record(bi, "$(P)TEST2") {
+        # }
+        lexer = (
+            MockLexer()
+            .add_record_header("ai", "$(P)TEST1")
+            .add_token(TokenTypes.L_BRACE)
+            .add_field("PINI", "YES")
+            .add_token(TokenTypes.R_BRACE)
+            .add_record_header("bi", "$(P)TEST2")
+            .add_token(TokenTypes.L_BRACE)
+            .add_token(TokenTypes.R_BRACE)
+        )
+
+        parsed_db = self.parser_class(lexer, record_filter=RecordFilter(record_types=["bi"])).db()
+
+        self.assertEqual(len(parsed_db), 1)
+        self.assertEqual(parsed_db[0]["name"], "$(P)TEST2")
+
+    def test_GIVEN_record_filter_on_fields_WHEN_parse_record_THEN_only_those_fields_returned(self):
+        # record(ai, "$(P)TEST") {
+        #     field(PINI, "YES")
+        #     field(DTYP, "asyn")
+        # }
+        lexer = (
+            MockLexer()
+            .add_record_header("ai", "$(P)TEST")
+            .add_token(TokenTypes.L_BRACE)
+            .add_field("PINI", "YES")
+            .add_field("DTYP", "asyn")
+            .add_token(TokenTypes.R_BRACE)
+        )
+
+        parsed_record = self.parser_class(
+            lexer, record_filter=RecordFilter(fields=["DTYP"])
+        ).record()
+
+        self.assertEqual(parsed_record["fields"], [("DTYP", "asyn")])
+
+    def test_GIVEN_excluded_record_with_unterminated_body_WHEN_parse_as_db_THEN_raises_parse_error(
+        self,
+    ):
+        lexer = (
+            MockLexer()
+            .add_record_header("ai", "$(P)TEST")
+            .add_token(TokenTypes.L_BRACE)
+            .add_field("PINI", "YES")
+        )
+
+        with self.assertRaises(DbSyntaxError):
+            self.parser_class(lexer, record_filter=RecordFilter(record_types=["bi"])).db()
+
+    def test_GIVEN_db_with_syntax_error_WHEN_parse_as_db_THEN_error_has_position_and_excerpt(self):
+        lexer = Lexer('record(ai, "A") {\n    field(VAL "1")\n}\n')
+
+        with self.assertRaises(DbSyntaxError) as context:
+            self.parser_class(lexer).db()
+
+        self.assertEqual((context.exception.line, context.exception.col), (2, 14))
+        self.assertIn('    2 |     field(VAL "1")\n      |               ^', str(context.exception))
+
+    def test_GIVEN_db_WHEN_parse_as_db_THEN_offsets_of_records_and_fields_kept(self):
+        contents = (
+            'record(ai, "A") {\n    field(VAL, "1")\n    info(a, "b")\n    field(DESC, "x")\n}\n'
+        )
+
+        parsed_db = self.parser_class(Lexer(contents)).db()
+
+        self.assertListEqual(
+            list(parsed_db.offsets),
+            [0, contents.index("field(VAL"), contents.index("field(DESC")],
+        )
+
+    def test_GIVEN_tokens_without_offsets_WHEN_parse_as_db_THEN_offsets_unknown(self):
+        lexer = (
+            MockLexer()
+            .add_record_header("ai", "$(P)TEST")
+            .add_token(TokenTypes.L_BRACE)
+            .add_field("VAL", "1")
+            .add_token(TokenTypes.R_BRACE)
+        )
+
+        parsed_db = self.parser_class(lexer).db()
+
+        self.assertListEqual(list(parsed_db.offsets), [UNKNOWN_OFFSET, UNKNOWN_OFFSET])
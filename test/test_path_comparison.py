@@ -0,0 +1,100 @@
+import os
+import unittest
+from unittest import mock
+
+from src.db_diff import ChangeKinds, DbDiffer
+from src.path_comparison import PathComparer, parse_path_pair
+from test.helpers import RECORD, TemporaryDirectoryTestCase
+
+
+class ParsePathPairTests(unittest.TestCase):
+    def test_GIVEN_tab_separated_paths_WHEN_parsed_THEN_paths_may_contain_spaces(self):
+        self.assertTupleEqual(
+            parse_path_pair("old dir/a.db\tnew dir/a.db\n"), ("old dir/a.db", "new dir/a.db")
+        )
+
+    def test_GIVEN_space_separated_paths_WHEN_parsed_THEN_pair_returned(self):
+        self.assertTupleEqual(parse_path_pair("old/a.db  new/a.db"), ("old/a.db", "new/a.db"))
+
+    def test_GIVEN_blank_or_comment_line_WHEN_parsed_THEN_none(self):
+        self.assertIsNone(parse_path_pair("\n"))
+        self.assertIsNone(parse_path_pair("# old new\n"))
+
+    def test_GIVEN_one_path_WHEN_parsed_THEN_value_error(self):
+        with self.assertRaises(ValueError):
+            parse_path_pair("old/a.db\n")
+
+
+class PathComparerTests(TemporaryDirectoryTestCase):
+    def test_GIVEN_two_files_with_different_names_WHEN_compared_THEN_change_describes_both(self):
+        old = self._write_file("a.db", RECORD.format("A", "1"))
+        new = self._write_file("b.db", RECORD.format("A", "2"))
+
+        changes = list(PathComparer().change_descriptions(old, new))
+
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].kind, ChangeKinds.MODIFIED)
+        self.assertEqual(changes[0].db_path, new)
+        self.assertIn("DBs at '{}' and '{}' are different".format(old, new), changes[0])
+
+    def test_GIVEN_files_not_in_utf8_WHEN_compared_THEN_compared_without_error(self):
+        old = self._write_file("a.db", "")
+        new = self._write_file("b.db", "")
+        with open(old, "wb") as f:
+            f.write(b'record(ai, "A") {\n    field(DESC, "\xe9")\n}\n')
+        with open(new, "wb") as f:
+            f.write(b'record(ai, "A") {\n    field(DESC, "\xe8")\n}\n')
+
+        changes = list(PathComparer().change_descriptions(old, new))
+
+        self.assertListEqual([c.kind for c in changes], [ChangeKinds.MODIFIED])
+
+    def test_GIVEN_identical_files_WHEN_compared_THEN_no_changes(self):
+        old = self._write_file("a.db", RECORD.format("A", "1"))
+        new = self._write_file("b.db", RECORD.format("A", "1"))
+
+        self.assertListEqual(list(PathComparer().change_descriptions(old, new)), [])
+
+    def test_GIVEN_plain_directories_WHEN_compared_THEN_dbs_anywhere_compared(self):
+        self._write_file(os.path.join("old", "top.db"), RECORD.format("A", "1"))
+        self._write_file(os.path.join("new", "top.db"), RECORD.format("A", "2"))
+        self._write_file(os.path.join("old", "sub", "gone.db"), "")
+        self._write_file(os.path.join("old", "O.Common", "ignored.db"), "")
+        old, new = os.path.join(self.root, "old"), os.path.join(self.root, "new")
+
+        changes = list(PathComparer().change_descriptions(old, new))
+
+        self.assertListEqual(
+            [(c.kind, c.db_path) for c in changes],
+            [
+                (ChangeKinds.MODIFIED, os.path.join(new, "top.db")),
+                (ChangeKinds.DELETED, os.path.join(old, "sub", "gone.db")),
+            ],
+        )
+        self.assertEqual(
+            changes[1], "A DB file was deleted from {}".format(os.path.join(old, "sub", "gone.db"))
+        )
+
+    def test_GIVEN_file_and_directory_WHEN_compared_THEN_value_error(self):
+        old = self._write_file("a.db", "")
+
+        with self.assertRaises(ValueError):
+            list(PathComparer().change_descriptions(old, self.root))
+
+    def test_GIVEN_batch_of_pairs_WHEN_compared_THEN_bad_pairs_reported_and_dbs_parsed_once(self):
+        old = self._write_file("a.db", RECORD.format("A", "1"))
+        new = self._write_file("b.db", RECORD.format("A", "2"))
+        lines = [
+            "{}\t{}\n".format(old, new),
+            "{}\n".format(old),
+            "{}\t{}\n".format(old, os.path.join(self.root, "missing.db")),
+            "{}\t{}\n".format(old, new),
+        ]
+        errors = []
+
+        with mock.patch.object(DbDiffer, "parse_db", wraps=DbDiffer.parse_db) as parse_db:
+            changes = list(PathComparer().compare_pairs(lines, errors))
+
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(parse_db.call_count, 2)
+        self.assertListEqual([line_number for line_number, _ in errors], [2, 3])
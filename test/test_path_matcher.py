@@ -0,0 +1,113 @@
+import json
+import os
+import unittest
+
+from src.path_matcher import PathMatcher
+from test.helpers import TemporaryDirectoryTestCase
+
+
+class PathMatcherTests(unittest.TestCase):
+    def test_GIVEN_glob_directory_rule_WHEN_directory_name_matches_THEN_directory_excluded(self):
+        matcher = PathMatcher(roots=[], exclude_directories=["O.*"])
+
+        self.assertTrue(matcher.is_directory_excluded("O.Common", os.path.join("a", "O.Common")))
+        self.assertFalse(matcher.is_directory_excluded("Db", os.path.join("a", "Db")))
+
+    def test_GIVEN_regex_directory_rule_WHEN_directory_name_matches_THEN_directory_excluded(self):
+        matcher = PathMatcher(roots=[], exclude_directories=[r"re:\.git$"])
+
+        self.assertTrue(matcher.is_directory_excluded(".git", ".git"))
+        self.assertFalse(matcher.is_directory_excluded(".github", ".github"))
+
+    def test_GIVEN_include_file_rules_WHEN_checking_files_THEN_only_matching_files_included(self):
+        matcher = PathMatcher(roots=[], include_files=["*.db", "*.template"])
+
+        self.assertTrue(matcher.is_file_included("a.db", "a.db"))
+        self.assertTrue(matcher.is_file_included("a.template", "a.template"))
+        self.assertFalse(matcher.is_file_included("a.db.bak", "a.db.bak"))
+
+    def test_GIVEN_no_include_file_rules_WHEN_checking_files_THEN_no_files_included(self):
+        matcher = PathMatcher(roots=[])
+
+        self.assertFalse(matcher.is_file_included("a.db", "a.db"))
+
+    def test_GIVEN_exclude_path_rule_WHEN_checking_paths_THEN_matching_directories_and_files_excluded(
+        self,
+    ):
+        matcher = PathMatcher(
+            roots=[], include_files=["*.db"], exclude_paths=["EPICS/support/vendor*"]
+        )
+
+        self.assertTrue(
+            matcher.is_directory_excluded("vendor", os.path.join("EPICS", "support", "vendor"))
+        )
+        self.assertFalse(
+            matcher.is_file_included("a.db", os.path.join("EPICS", "support", "vendor", "a.db"))
+        )
+        self.assertTrue(
+            matcher.is_file_included("a.db", os.path.join("EPICS", "support", "motor", "a.db"))
+        )
+
+    def test_GIVEN_roots_WHEN_checking_listed_paths_THEN_only_paths_a_walk_would_find_included(
+        self,
+    ):
+        matcher = PathMatcher(
+            roots=[os.path.join("EPICS", "support")],
+            exclude_directories=["O.*"],
+            include_files=["*.db"],
+        )
+
+        self.assertTrue(matcher.is_path_included(os.path.join("EPICS", "support", "m", "a.db")))
+        self.assertFalse(matcher.is_path_included(os.path.join("EPICS", "ioc", "m", "a.db")))
+        self.assertFalse(
+            matcher.is_path_included(os.path.join("EPICS", "support", "m", "O.Common", "a.db"))
+        )
+        self.assertFalse(matcher.is_path_included(os.path.join("EPICS", "support", "m", "a.c")))
+
+    def test_GIVEN_current_directory_root_WHEN_checking_listed_paths_THEN_whole_release_covered(
+        self,
+    ):
+        matcher = PathMatcher(
+            roots=[os.curdir], exclude_directories=["O.*"], include_files=["*.db"]
+        )
+
+        self.assertTrue(matcher.is_path_included("a.db"))
+        self.assertTrue(matcher.is_path_included(os.path.join("db", "a.db")))
+        self.assertFalse(matcher.is_path_included(os.path.join("O.Common", "a.db")))
+
+
+class PathMatcherConfigFileTests(TemporaryDirectoryTestCase):
+    DEFAULTS = {
+        "interesting_directories": ["EPICS/support"],
+        "exclude_directories": ["bin"],
+        "include_files": ["*.db"],
+    }
+
+    def setUp(self):
+        super(PathMatcherConfigFileTests, self).setUp()
+        self.config_path = os.path.join(self.root, "rules.json")
+
+    def _write_config(self, config):
+        with open(self.config_path, "w") as f:
+            json.dump(config, f)
+
+    def test_GIVEN_config_with_some_keys_WHEN_loaded_THEN_configured_keys_replace_defaults(self):
+        self._write_config({"include_files": ["*.template"]})
+
+        matcher = PathMatcher.from_config_file(self.config_path, self.DEFAULTS)
+
+        self.assertListEqual(matcher.roots, [os.path.join("EPICS", "support")])
+        self.assertTrue(matcher.is_directory_excluded("bin", "bin"))
+        self.assertTrue(matcher.is_file_included("a.template", "a.template"))
+        self.assertFalse(matcher.is_file_included("a.db", "a.db"))
+
+    def test_GIVEN_config_with_unknown_key_WHEN_loaded_THEN_raises_error(self):
+        self._write_config({"include_file": ["*.template"]})
+
+        with self.assertRaises(ValueError):
+            PathMatcher.from_config_file(self.config_path, self.DEFAULTS)
+
+    def test_GIVEN_path_matcher_from_rules_WHEN_converted_to_rules_THEN_same_rules(self):
+        rules = dict(self.DEFAULTS, exclude_paths=["EPICS/support/old/*"])
+
+        self.assertDictEqual(PathMatcher.from_rules(rules).to_rules(), rules)
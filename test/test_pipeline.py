@@ -0,0 +1,81 @@
+import os
+
+from src.db_iterators import DbChangesIterator
+from src.path_matcher import PathMatcher
+from src.pipeline import ChangesPipeline
+from test.helpers import RECORD, ReleasesTestCase
+
+
+class ChangesPipelineTests(ReleasesTestCase):
+    def setUp(self):
+        super(ChangesPipelineTests, self).setUp()
+        self.old_path = self._release_path("old")
+        self.new_path = self._release_path("new")
+        self.matcher = PathMatcher(roots=[os.path.join("EPICS", "support")], include_files=["*.db"])
+
+        for module in range(5):
+            for db in range(10):
+                path = os.path.join("EPICS", "support", "mod{}".format(module), "{}.db".format(db))
+                self._write(self.old_path, path, RECORD.format("A", "1"))
+                self._write(self.new_path, path, RECORD.format("A", "1" if db % 3 else "2"))
+        self._write(self.old_path, os.path.join("EPICS", "support", "mod1", "gone.db"), "")
+        self._write(self.new_path, os.path.join("EPICS", "support", "mod2", "new.db"), "")
+        self._write(self.new_path, os.path.join("EPICS", "support", "mod3", "0.db"), "record(")
+
+    def _iterator(self):
+        return DbChangesIterator(
+            self.old_path, self.new_path, report_additions=True, path_matcher=self.matcher
+        )
+
+    def _assert_same_changes_as_iterator(self, pipeline):
+        changes = list(pipeline.change_descriptions())
+
+        expected = list(self._iterator().change_descriptions())
+        self.assertListEqual(changes, expected)
+        self.assertListEqual([c.to_dict() for c in changes], [c.to_dict() for c in expected])
+
+    def test_GIVEN_releases_WHEN_pipeline_diffs_in_this_process_THEN_same_changes_in_same_order(
+        self,
+    ):
+        self._assert_same_changes_as_iterator(
+            ChangesPipeline(self._iterator(), workers=0, readers=3, queue_size=2)
+        )
+
+    def test_GIVEN_releases_WHEN_pipeline_diffs_in_worker_processes_THEN_same_changes_in_same_order(
+        self,
+    ):
+        self._assert_same_changes_as_iterator(
+            ChangesPipeline(self._iterator(), workers=2, readers=3, queue_size=4)
+        )
+
+    def test_GIVEN_releases_WHEN_pipeline_run_THEN_work_of_each_stage_counted(self):
+        pipeline = ChangesPipeline(self._iterator(), workers=0)
+
+        changes = list(pipeline.change_descriptions())
+
+        self.assertEqual(pipeline.stats.walk.items, 52)
+        self.assertEqual(pipeline.stats.read.items, 50)
+        self.assertEqual(pipeline.stats.diff.items, 20)  # Those whose contents changed
+        self.assertEqual(pipeline.stats.write.items, len(changes))
+        self.assertIn("DB pairs", str(pipeline.stats))
+
+    def test_GIVEN_walk_fails_WHEN_pipeline_run_THEN_error_raised(self):
+        iterator = self._iterator()
+
+        def failing_walk():
+            yield os.path.join("EPICS", "support", "mod0", "0.db"), True, True
+            raise IOError("Share went away")
+
+        iterator.dbs_in_both_paths = failing_walk
+
+        with self.assertRaises(IOError):
+            list(ChangesPipeline(iterator, workers=0).change_descriptions())
+
+    def test_GIVEN_pipeline_closed_early_WHEN_run_THEN_remaining_dbs_not_read(self):
+        pipeline = ChangesPipeline(self._iterator(), workers=0, readers=1, queue_size=2)
+        changes = pipeline.change_descriptions()
+
+        next(changes)
+        changes.close()
+
+        self.assertLess(pipeline.stats.read.items, 50)
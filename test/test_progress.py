@@ -0,0 +1,92 @@
+import io
+import os
+import unittest
+from unittest import mock
+
+from src.db_iterators import DbChangesIterator
+from src.progress import ComparisonProgress, ProgressReporter
+from test.helpers import RECORD, ReleasesTestCase
+
+
+class ProgressReporterTests(unittest.TestCase):
+    def test_GIVEN_walk_not_finished_WHEN_described_THEN_dbs_found_shown(self):
+        progress = ComparisonProgress()
+        progress.dbs_found = 12
+
+        self.assertTrue(
+            ProgressReporter(progress).describe().startswith("Walking releases: 12 DBs")
+        )
+
+    def test_GIVEN_comparison_half_done_WHEN_described_THEN_throughput_and_eta_shown(self):
+        progress = ComparisonProgress()
+        progress.finish_walk(10)
+        progress.dbs_compared = 5
+        progress.dbs_parsed = 20
+        progress.characters_read = 2500000
+        progress.read_seconds = 3.0
+        progress.diff_seconds = 1.0
+
+        with mock.patch(
+            "src.progress.time.perf_counter", return_value=progress.walk_finish_time + 10
+        ):
+            description = ProgressReporter(progress).describe()
+
+        self.assertEqual(
+            description,
+            "Compared 5/10 DBs, 2.5M characters read, 2 DBs parsed/s, 75% of time reading, ETA 0:00:10",
+        )
+
+    def test_GIVEN_reports_WHEN_shorter_report_written_THEN_previous_report_overwritten(self):
+        progress = ComparisonProgress()
+        stream = io.StringIO()
+        reporter = ProgressReporter(progress, stream)
+
+        with mock.patch.object(reporter, "describe", side_effect=["longer", "short"]):
+            reporter.report()
+            reporter.report()
+
+        self.assertEqual(stream.getvalue(), "\rlonger\rshort ")
+
+    def test_GIVEN_reporter_WHEN_stopped_THEN_final_report_written_on_its_own_line(self):
+        progress = ComparisonProgress()
+        progress.finish_walk(0)
+        stream = io.StringIO()
+
+        with ProgressReporter(progress, stream, interval=60):
+            pass
+
+        self.assertTrue(stream.getvalue().startswith("\rCompared 0/0 DBs"))
+        self.assertTrue(stream.getvalue().endswith("\n"))
+
+
+class ComparisonProgressTests(ReleasesTestCase):
+    def setUp(self):
+        super(ComparisonProgressTests, self).setUp()
+        self.old_path = self._release_path("old")
+        self.new_path = self._release_path("new")
+
+    def _write_db(self, release_path, name, contents):
+        self._write(release_path, os.path.join("EPICS", "support", "mod", "db", name), contents)
+
+    def test_GIVEN_releases_WHEN_compared_THEN_progress_counted(self):
+        self._write_db(self.old_path, "changed.db", RECORD.format("A", "1"))
+        self._write_db(self.new_path, "changed.db", RECORD.format("A", "2"))
+        self._write_db(self.old_path, "same.db", RECORD.format("B", "1"))
+        self._write_db(self.new_path, "same.db", RECORD.format("B", "1"))
+        self._write_db(self.old_path, "deleted.db", "")
+        progress = ComparisonProgress()
+
+        changes = list(
+            DbChangesIterator(self.old_path, self.new_path, progress=progress).change_descriptions()
+        )
+
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(progress.dbs_found, 3)
+        self.assertEqual(progress.dbs_to_compare, 2)
+        self.assertEqual(progress.dbs_compared, 2)
+        self.assertEqual(progress.dbs_parsed, 2)  # Only the changed DB is parsed, in both releases
+        self.assertEqual(
+            progress.characters_read,
+            2 * len(RECORD.format("A", "1")) + 2 * len(RECORD.format("B", "1")),
+        )
+        self.assertIsNotNone(progress.walk_finish_time)
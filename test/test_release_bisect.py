@@ -0,0 +1,150 @@
+import os
+from unittest import mock
+
+from src.db_diff import DbDiffer, DifferenceKinds
+from src.path_matcher import PathMatcher
+from src.release_bisect import ReleaseBisector, build_name_index, load_name_index
+from src.releases import ReleaseCatalogue
+from test.helpers import DB_PATH, ReleasesTestCase
+
+RECORD = 'record(ai, "$(P){}") {{\n    field(VAL, "{}")\n    field(DESC, "{}")\n}}\n'
+
+OTHER_DB_PATH = os.path.join("EPICS", "support", "other", "db", "other.db")
+
+RELEASES = ["1.{}.0".format(minor) for minor in range(10)]
+
+
+class ReleaseBisectorTests(ReleasesTestCase):
+    def setUp(self):
+        super(ReleaseBisectorTests, self).setUp()
+        self.cache_dir = os.path.join(self.root, "cache")
+        self.matcher = PathMatcher(roots=[os.path.join("EPICS", "support")], include_files=["*.db"])
+        self.bisector = ReleaseBisector(ReleaseCatalogue(self.root), self.matcher, self.cache_dir)
+
+    def _write_releases(self, value_changed_in=None, description_changed_in=None, removed_in=None):
+        for index, release in enumerate(RELEASES):
+            contents = RECORD.format("B", "1", "")
+            if removed_in is None or index < removed_in:
+                contents += RECORD.format(
+                    "A",
+                    "1.0" if value_changed_in is None or index < value_changed_in else "2",
+                    (
+                        "old"
+                        if description_changed_in is None or index < description_changed_in
+                        else "new"
+                    ),
+                )
+            self._write(release, DB_PATH, contents)
+            self._write(release, OTHER_DB_PATH, RECORD.format("C", "1", ""))
+
+    def test_GIVEN_release_WHEN_name_index_built_THEN_dbs_defining_each_record_found(self):
+        self._write("1.0.0", DB_PATH, '# record(ai, "$(P)X")\n' + RECORD.format("A", "1", ""))
+        self._write("1.0.0", OTHER_DB_PATH, RECORD.format("A", "1", "") + "record(bo, B) {}\n")
+
+        index = build_name_index(os.path.join(self.root, "1.0.0"), self.matcher)
+
+        self.assertListEqual(index["$(P)A"], [DB_PATH, OTHER_DB_PATH])
+        self.assertListEqual(index["B"], [OTHER_DB_PATH])
+
+    def test_GIVEN_cache_dir_WHEN_name_index_loaded_twice_THEN_built_once(self):
+        self._write_releases()
+        release_path = os.path.join(self.root, "1.0.0")
+
+        first = load_name_index(release_path, self.matcher, self.cache_dir)
+        with mock.patch("src.release_bisect.build_name_index") as build:
+            second = load_name_index(release_path, self.matcher, self.cache_dir)
+
+        build.assert_not_called()
+        self.assertDictEqual(first, second)
+
+    def test_GIVEN_cached_name_index_WHEN_nested_db_edited_THEN_index_rebuilt(self):
+        self._write_releases()
+        release_path = os.path.join(self.root, "1.0.0")
+        load_name_index(release_path, self.matcher, self.cache_dir)
+
+        self._write("1.0.0", OTHER_DB_PATH, RECORD.format("D", "1", "added"))
+        index = load_name_index(release_path, self.matcher, self.cache_dir)
+
+        self.assertListEqual(index["$(P)D"], [OTHER_DB_PATH])
+        self.assertNotIn("$(P)C", index)
+
+    def test_GIVEN_cached_name_index_WHEN_loaded_with_other_rules_THEN_indexed_separately(self):
+        self._write_releases()
+        release_path = os.path.join(self.root, "1.0.0")
+        load_name_index(release_path, self.matcher, self.cache_dir)
+
+        other_matcher = PathMatcher(
+            roots=[os.path.join("EPICS", "support", "other")], include_files=["*.db"]
+        )
+        index = load_name_index(release_path, other_matcher, self.cache_dir)
+
+        self.assertListEqual(sorted(index), ["$(P)C"])
+
+    def test_GIVEN_record_removed_WHEN_bisect_THEN_first_release_without_it_found(self):
+        self._write_releases(removed_in=7)
+
+        result = self.bisector.bisect(RELEASES, "$(P)A")
+
+        self.assertEqual(result.last_unchanged, "1.6.0")
+        self.assertEqual(result.first_changed, "1.7.0")
+        self.assertListEqual([d.kind for d in result.differences], [DifferenceKinds.RECORD_REMOVED])
+        self.assertLessEqual(len(result.releases_checked), 5)
+
+    def test_GIVEN_field_changed_WHEN_bisect_on_other_field_THEN_only_that_field_considered(self):
+        self._write_releases(value_changed_in=3, description_changed_in=8)
+
+        any_field = self.bisector.bisect(RELEASES, "$(P)A")
+        description = self.bisector.bisect(RELEASES, "$(P)A", field="DESC")
+
+        self.assertEqual(any_field.first_changed, "1.3.0")
+        self.assertEqual(description.first_changed, "1.8.0")
+        self.assertListEqual([d.field for d in description.differences], ["DESC"])
+
+    def test_GIVEN_equivalent_values_WHEN_bisect_THEN_record_unchanged(self):
+        self._write_releases()
+        self._write(RELEASES[-1], DB_PATH, RECORD.format("A", "1", "old"))
+
+        self.assertIsNone(self.bisector.bisect(RELEASES, "$(P)A"))
+
+    def test_GIVEN_record_in_one_db_WHEN_bisect_THEN_only_that_db_parsed(self):
+        self._write_releases(removed_in=5)
+
+        with mock.patch.object(DbDiffer, "parse_db", wraps=DbDiffer.parse_db) as parse_db:
+            result = self.bisector.bisect(RELEASES, "$(P)A")
+
+        # One DB in each release looked at which still has the record, and none in the others
+        releases_with_record = [r for r in result.releases_checked if r < result.first_changed]
+        self.assertEqual(parse_db.call_count, len(releases_with_record))
+
+    def test_GIVEN_record_moved_to_other_db_WHEN_bisect_THEN_not_reported_as_removed(self):
+        self._write_releases(value_changed_in=7)
+        for release in RELEASES[4:]:
+            self._write(release, DB_PATH, RECORD.format("B", "1", ""))
+            self._write(
+                release,
+                OTHER_DB_PATH,
+                RECORD.format("C", "1", "")
+                + RECORD.format("A", "1.0" if release < RELEASES[7] else "2", "old"),
+            )
+
+        result = self.bisector.bisect(RELEASES, "$(P)A")
+
+        self.assertEqual(result.first_changed, "1.7.0")
+        self.assertListEqual([d.kind for d in result.differences], [DifferenceKinds.FIELD_CHANGED])
+
+    def test_GIVEN_record_moved_to_other_db_unchanged_WHEN_bisect_THEN_none(self):
+        self._write_releases()
+        self._write(RELEASES[-1], DB_PATH, RECORD.format("B", "1", ""))
+        self._write(
+            RELEASES[-1],
+            OTHER_DB_PATH,
+            RECORD.format("C", "1", "") + RECORD.format("A", "1.0", "old"),
+        )
+
+        self.assertIsNone(self.bisector.bisect(RELEASES, "$(P)A"))
+
+    def test_GIVEN_record_not_in_first_release_WHEN_bisect_THEN_value_error(self):
+        self._write_releases()
+
+        with self.assertRaises(ValueError):
+            self.bisector.bisect(RELEASES, "$(P)MISSING")
@@ -0,0 +1,133 @@
+import os
+import tarfile
+import zipfile
+
+from src.db_iterators import DbChangesIterator
+from src.path_matcher import PathMatcher
+from src.release_sources import (
+    DirectorySource,
+    TarSource,
+    ZipSource,
+    release_source,
+    walk_source,
+)
+from test.helpers import DB_PATH, RECORD, ReleasesTestCase
+
+
+class ReleaseSourceTests(ReleasesTestCase):
+    def setUp(self):
+        super(ReleaseSourceTests, self).setUp()
+        self.matcher = PathMatcher(
+            roots=[os.path.join("EPICS", "support")],
+            exclude_directories=["O.*"],
+            include_files=["*.db"],
+        )
+
+    def _write_release(self, release, value):
+        self._write(release, DB_PATH, RECORD.format("A", value))
+        self._write(release, os.path.join("EPICS", "support", "mod", "O.Common", "x.db"), "")
+        self._write(release, os.path.join("EPICS", "support", "mod", "src", "x.c"), "")
+
+    def _zip(self, release, top_directory=None):
+        path = os.path.join(self.root, "{}.zip".format(release))
+        with zipfile.ZipFile(path, "w") as archive:
+            for relative_path in PathMatcher([os.curdir], include_files=["*"]).walk(
+                os.path.join(self.root, release)
+            ):
+                name = relative_path.replace(os.sep, "/")
+                archive.write(
+                    os.path.join(self.root, release, relative_path),
+                    name if top_directory is None else "{}/{}".format(top_directory, name),
+                )
+        return path
+
+    def _tar(self, release, top_directory=None):
+        path = os.path.join(self.root, "{}.tar.gz".format(release))
+        with tarfile.open(path, "w:gz") as archive:
+            archive.add(
+                os.path.join(self.root, release, "EPICS"),
+                "EPICS" if top_directory is None else "{}/EPICS".format(top_directory),
+            )
+        return path
+
+    def test_GIVEN_release_archived_WHEN_listed_and_read_THEN_same_as_directory(self):
+        self._write_release("1.0.0", "1")
+        directory = release_source(os.path.join(self.root, "1.0.0"))
+
+        for archive in [
+            release_source(self._zip("1.0.0")),
+            release_source(self._tar("1.0.0", top_directory="1.0.0"), self.matcher),
+        ]:
+            self.assertListEqual(
+                list(walk_source(archive, self.matcher)), list(walk_source(directory, self.matcher))
+            )
+            self.assertEqual(archive.read(DB_PATH), directory.read(DB_PATH))
+
+    def test_GIVEN_release_archived_WHEN_stat_THEN_size_and_seconds_since_epoch_as_directory(self):
+        self._write_release("1.0.0", "1")
+        os.utime(os.path.join(self.root, "1.0.0", DB_PATH), (1500000000, 1500000000))
+        directory = release_source(os.path.join(self.root, "1.0.0"))
+
+        for archive in [
+            release_source(self._zip("1.0.0")),
+            release_source(self._tar("1.0.0"), self.matcher),
+        ]:
+            self.assertTupleEqual(archive.stat(DB_PATH), directory.stat(DB_PATH))
+            self.assertIsNone(archive.stat("missing.db"))
+        self.assertTupleEqual(directory.stat(DB_PATH), (len(RECORD.format("A", "1")), 1500000000))
+        self.assertIsNone(directory.stat("missing.db"))
+
+    def test_GIVEN_non_ascii_and_undecodable_text_WHEN_read_THEN_same_from_directory_and_archive(
+        self,
+    ):
+        self._write_release("1.0.0", "1")
+        with open(os.path.join(self._release_path("1.0.0"), DB_PATH), "wb") as f:
+            f.write(
+                'record(ai, "A") {\n    field(DESC, "caf\u00e9")\n}\n'.encode("utf-8")
+                + b"# \xe9\r\n"
+            )
+        directory = release_source(self._release_path("1.0.0"))
+
+        contents = directory.read(DB_PATH)
+
+        self.assertEqual(release_source(self._zip("1.0.0")).read(DB_PATH), contents)
+        self.assertIn("caf\u00e9", contents)
+        self.assertNotIn("\r", contents)
+
+    def test_GIVEN_paths_WHEN_getting_source_THEN_source_matches_type_of_path(self):
+        self._write_release("1.0.0", "1")
+        not_archive = self._write_file("notes.txt", "Not an archive")
+
+        self.assertIsInstance(release_source(os.path.join(self.root, "1.0.0")), DirectorySource)
+        self.assertIsInstance(release_source(self._zip("1.0.0")), ZipSource)
+        self.assertIsInstance(release_source(self._tar("1.0.0")), TarSource)
+        with self.assertRaises(ValueError):
+            release_source(not_archive)
+
+    def test_GIVEN_tar_archive_and_path_matcher_WHEN_read_THEN_only_matching_files_kept(self):
+        self._write_release("1.0.0", "1")
+        source = release_source(self._tar("1.0.0"), self.matcher)
+
+        self.assertEqual(source.read(DB_PATH), RECORD.format("A", "1"))
+        with self.assertRaises(IOError):
+            source.read(os.path.join("EPICS", "support", "mod", "src", "x.c"))
+
+    def test_GIVEN_archived_old_release_WHEN_compared_THEN_same_changes_as_extracted(self):
+        self._write_release("1.0.0", "1")
+        self._write_release("2.0.0", "2")
+        self._write("1.0.0", os.path.join("EPICS", "support", "mod", "db", "gone.db"), "")
+
+        def changes(old_path):
+            return list(
+                DbChangesIterator(
+                    old_path, os.path.join(self.root, "2.0.0"), path_matcher=self.matcher
+                ).change_descriptions()
+            )
+
+        extracted = changes(os.path.join(self.root, "1.0.0"))
+        self.assertEqual(len(extracted), 2)
+        for archive in [self._zip("1.0.0", top_directory="1.0.0"), self._tar("1.0.0")]:
+            self.assertListEqual(
+                [(c.kind, c.differences) for c in changes(archive)],
+                [(c.kind, c.differences) for c in extracted],
+            )
@@ -0,0 +1,152 @@
+import os
+
+from src.db_diff import ChangeKinds
+from src.db_iterators import DbChangesIterator
+from src.path_matcher import PathMatcher
+from src.release_store import ReleaseStore
+from test.helpers import DB_PATH, ReleasesTestCase
+
+OLD_DB = """
+record(ai, "$(P)A") {
+    field(DTYP, "asyn")
+    field(VAL, "1")
+    field(PREC, "2")
+    field(EGU, "mm")
+    info(archive, "VAL")
+}
+record(motor, "$(P)M") {
+    field(DTYP, "asynMotor")
+    field(VAL, "1")
+}
+record(bo, "$(P)GONE") {}
+record(ao, "$(P)DUPLICATED") {
+    field(EGU, "mm")
+    field(EGU, "cm")
+    field(PREC, "1")
+    field(PREC, "1")
+}
+"""
+
+NEW_DB = """
+record(ai, "$(P)A") {
+    field(DTYP, "asyn")
+    field(VAL, "1.0")
+    field(PREC, "3")
+    field(DESC, "Added")
+    info(archive, "VAL")
+    info(autosave, "VAL")
+    alias("$(P)A:ALIAS")
+}
+record(motor, "$(P)M") {
+    field(VAL, "1")
+}
+record(bo, "$(P)NEW") {}
+record(ao, "$(P)DUPLICATED") {
+    field(PREC, "2")
+    field(PREC, "3")
+    field(DESC, "First")
+    field(DESC, "Second")
+}
+"""
+
+
+class ReleaseStoreTests(ReleasesTestCase):
+    def setUp(self):
+        super(ReleaseStoreTests, self).setUp()
+        self.matcher = PathMatcher(roots=[os.path.join("EPICS", "support")], include_files=["*.db"])
+        self.store = ReleaseStore(os.path.join(self.root, "store.sqlite"))
+
+    def tearDown(self):
+        self.store.close()
+        super(ReleaseStoreTests, self).tearDown()
+
+    def _write_releases(self):
+        unchanged = os.path.join("EPICS", "support", "mod", "db", "unchanged.db")
+        super(ReleaseStoreTests, self)._write_releases(OLD_DB, NEW_DB)
+        self._write("1.0.0", unchanged, OLD_DB)
+        self._write("2.0.0", unchanged, OLD_DB)
+        self._write("1.0.0", os.path.join("EPICS", "support", "mod", "db", "bad.db"), "")
+        self._write("2.0.0", os.path.join("EPICS", "support", "mod", "db", "bad.db"), "record(")
+
+    def _load_releases(self):
+        for release in ["1.0.0", "2.0.0"]:
+            self.store.load_release(release, self._release_path(release), self.matcher)
+
+    def test_GIVEN_releases_sharing_dbs_WHEN_loaded_THEN_identical_contents_stored_once(self):
+        self._write_releases()
+
+        self.assertTupleEqual(
+            self.store.load_release("1.0.0", self._release_path("1.0.0"), self.matcher), (4, 2)
+        )
+        self.assertTupleEqual(
+            self.store.load_release("2.0.0", self._release_path("2.0.0"), self.matcher), (4, 2)
+        )
+        self.assertListEqual(self.store.release_names(), ["1.0.0", "2.0.0"])
+        _, rows = self.store.query("SELECT COUNT(*) FROM records")
+        self.assertEqual(rows[0][0], 8)
+
+    def test_GIVEN_release_loaded_again_WHEN_queried_THEN_only_latest_dbs_kept(self):
+        self._write_releases()
+        self._load_releases()
+        os.remove(os.path.join(self.root, "1.0.0", DB_PATH))
+
+        self.store.load_release("1.0.0", self._release_path("1.0.0"), self.matcher)
+
+        columns, rows = self.store.query(
+            "SELECT COUNT(*) AS dbs FROM dbs d JOIN releases r ON r.id = d.release_id WHERE r.name = ?",
+            ("1.0.0",),
+        )
+        self.assertListEqual(columns, ["dbs"])
+        self.assertEqual(rows[0][0], 3)
+
+    def test_GIVEN_loaded_releases_WHEN_searching_by_type_and_field_THEN_releases_found(self):
+        self._write_releases()
+        self._write("3.0.0", DB_PATH, 'record(motor, "$(P)M") {\n    field(DTYP, "asynMotor")\n}\n')
+        self._load_releases()
+        self.store.load_release("3.0.0", self._release_path("3.0.0"), self.matcher)
+
+        self.assertListEqual(self.store.releases_defining("motor"), ["1.0.0", "2.0.0", "3.0.0"])
+        self.assertListEqual(
+            self.store.releases_defining("motor", "DTYP", "asynMotor"), ["1.0.0", "2.0.0", "3.0.0"]
+        )
+        self.assertListEqual(self.store.releases_defining("ai", "PREC", "3.0"), ["2.0.0"])
+        self.assertListEqual(self.store.releases_defining("ai", "DESC"), ["2.0.0"])
+
+    def test_GIVEN_loaded_releases_WHEN_compared_THEN_same_changes_as_iterator(self):
+        self._write_releases()
+        self._load_releases()
+
+        for report_additions in [False, True]:
+            for normalise_values in [False, True]:
+                changes = self.store.change_descriptions(
+                    "1.0.0", "2.0.0", report_additions, normalise_values
+                )
+                expected = list(
+                    DbChangesIterator(
+                        self._release_path("1.0.0"),
+                        self._release_path("2.0.0"),
+                        report_additions=report_additions,
+                        path_matcher=self.matcher,
+                        normalise_values=normalise_values,
+                    ).change_descriptions()
+                )
+
+                self.assertListEqual(changes, expected)
+                self.assertListEqual(
+                    [c.to_dict() for c in changes], [c.to_dict() for c in expected]
+                )
+
+    def test_GIVEN_release_not_loaded_WHEN_compared_THEN_value_error(self):
+        self._write_releases()
+        self.store.load_release("1.0.0", self._release_path("1.0.0"), self.matcher)
+
+        with self.assertRaises(ValueError):
+            self.store.change_descriptions("1.0.0", "2.0.0")
+
+    def test_GIVEN_parse_error_WHEN_compared_THEN_parse_error_reported(self):
+        self._write_releases()
+        self._load_releases()
+
+        changes = self.store.change_descriptions("1.0.0", "2.0.0")
+
+        self.assertIn(ChangeKinds.PARSE_ERROR, [c.kind for c in changes])
@@ -0,0 +1,64 @@
+import os
+
+from src.releases import ReleaseCatalogue
+from test.helpers import TemporaryDirectoryTestCase
+
+
+class ReleaseCatalogueTests(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super(ReleaseCatalogueTests, self).setUp()
+        self.releases_dir = os.path.join(self.root, "releases")
+        self.cache_dir = os.path.join(self.root, "cache")
+        self._make_release("1.0.0", with_epics=True)
+        self._make_release("1.0.1", with_epics=False)  # Client-only hotfix
+        self._make_release("2.0.0", with_epics=True)
+
+    def _make_release(self, name, with_epics):
+        path = os.path.join(self.releases_dir, name)
+        os.makedirs(os.path.join(path, "EPICS") if with_epics else path)
+
+    def test_GIVEN_releases_WHEN_checking_validity_THEN_only_releases_with_epics_are_valid(self):
+        catalogue = ReleaseCatalogue(self.releases_dir)
+
+        self.assertTrue(catalogue.is_valid("1.0.0"))
+        self.assertFalse(catalogue.is_valid("1.0.1"))
+        self.assertFalse(catalogue.is_valid("3.0.0"))
+
+    def test_GIVEN_release_archives_WHEN_finding_releases_THEN_archives_are_valid_releases(self):
+        for name in ["3.0.0.zip", "3.1.0.tar.gz", "notes.txt"]:
+            with open(os.path.join(self.releases_dir, name), "w"):
+                pass
+        catalogue = ReleaseCatalogue(self.releases_dir)
+
+        self.assertEqual(
+            catalogue.release_path("3.1.0"), os.path.join(self.releases_dir, "3.1.0.tar.gz")
+        )
+        self.assertEqual(catalogue.release_path("1.0.0"), os.path.join(self.releases_dir, "1.0.0"))
+        self.assertListEqual(catalogue.valid_releases(), ["1.0.0", "2.0.0", "3.0.0", "3.1.0"])
+
+    def test_GIVEN_release_name_that_is_a_path_WHEN_checking_validity_THEN_not_valid(self):
+        catalogue = ReleaseCatalogue(self.releases_dir)
+
+        self.assertFalse(catalogue.is_valid(os.path.join("1.0.0", "EPICS")))
+        self.assertFalse(catalogue.is_valid(os.pardir))
+
+    def test_GIVEN_releases_WHEN_listing_valid_releases_THEN_releases_with_epics_listed(self):
+        catalogue = ReleaseCatalogue(self.releases_dir)
+
+        self.assertListEqual(catalogue.valid_releases(), ["1.0.0", "2.0.0"])
+
+    def test_GIVEN_cached_list_within_ttl_WHEN_listing_valid_releases_THEN_cached_list_used(self):
+        ReleaseCatalogue(self.releases_dir, self.cache_dir).valid_releases()
+        self._make_release("3.0.0", with_epics=True)
+
+        releases = ReleaseCatalogue(self.releases_dir, self.cache_dir).valid_releases()
+
+        self.assertListEqual(releases, ["1.0.0", "2.0.0"])
+
+    def test_GIVEN_cached_list_older_than_ttl_WHEN_listing_valid_releases_THEN_list_refreshed(self):
+        ReleaseCatalogue(self.releases_dir, self.cache_dir).valid_releases()
+        self._make_release("3.0.0", with_epics=True)
+
+        releases = ReleaseCatalogue(self.releases_dir, self.cache_dir, ttl=0).valid_releases()
+
+        self.assertListEqual(releases, ["1.0.0", "2.0.0", "3.0.0"])
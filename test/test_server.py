@@ -0,0 +1,195 @@
+import json
+import os
+import shutil
+import threading
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from src.db_diff import ChangeKinds, DifferenceKinds
+from src.db_iterators import DbChangesIterator
+from src.path_matcher import PathMatcher
+from src.releases import ReleaseCatalogue
+from src.server import ComparisonService, ReleaseSnapshot, comparison_server
+from test.helpers import DB_PATH, RECORD, ReleasesTestCase
+
+SMOO_DBD = 'recordtype(ai) {{\n    field(SMOO, DBF_DOUBLE) {{\n        initial("{}")\n    }}\n}}\n'
+
+
+class ServiceTestCase(ReleasesTestCase):
+    """
+    Writes releases to a temporary releases directory, and compares them with a ComparisonService.
+    """
+
+    def setUp(self):
+        super(ServiceTestCase, self).setUp()
+        self.matcher = PathMatcher(
+            roots=[os.path.join("EPICS", "support")],
+            exclude_directories=["O.*"],
+            include_files=["*.db"],
+        )
+        self.service = ComparisonService(ReleaseCatalogue(self.root), self.matcher, max_releases=2)
+
+    def _write_releases(self):
+        super(ServiceTestCase, self)._write_releases(
+            RECORD.format("A", "1") + RECORD.format("B", "1"), RECORD.format("A", "2")
+        )
+
+
+class ComparisonServiceTests(ServiceTestCase):
+    def test_GIVEN_release_WHEN_loaded_THEN_only_interesting_files_read(self):
+        self._write("1.0.0", DB_PATH, "record(ai, A)")
+        self._write("1.0.0", os.path.join("EPICS", "support", "mod", "O.Common", "x.db"), "")
+        self._write("1.0.0", os.path.join("EPICS", "support", "mod", "src", "x.c"), "")
+
+        snapshot = ReleaseSnapshot.load("1.0.0", os.path.join(self.root, "1.0.0"), self.matcher)
+
+        self.assertDictEqual(snapshot.contents, {DB_PATH: "record(ai, A)"})
+
+    def test_GIVEN_release_root_WHEN_compared_THEN_same_changes_as_comparing_on_disk(self):
+        self._write_releases()
+        matcher = PathMatcher(roots=["."], exclude_directories=["O.*"], include_files=["*.db"])
+        service = ComparisonService(ReleaseCatalogue(self.root), matcher)
+
+        changes = list(service.compare("1.0.0", "2.0.0").change_descriptions())
+
+        on_disk = DbChangesIterator(
+            os.path.join(self.root, "1.0.0"), os.path.join(self.root, "2.0.0"), path_matcher=matcher
+        )
+        self.assertListEqual(changes, list(on_disk.change_descriptions()))
+        self.assertListEqual([c.kind for c in changes], [ChangeKinds.MODIFIED, ChangeKinds.DELETED])
+
+    def test_GIVEN_releases_WHEN_compared_THEN_same_changes_as_comparing_on_disk(self):
+        self._write_releases()
+
+        changes = list(
+            self.service.compare("1.0.0", "2.0.0", report_additions=True).change_descriptions()
+        )
+
+        on_disk = DbChangesIterator(
+            os.path.join(self.root, "1.0.0"),
+            os.path.join(self.root, "2.0.0"),
+            report_additions=True,
+            path_matcher=self.matcher,
+        )
+        self.assertListEqual(changes, list(on_disk.change_descriptions()))
+        self.assertListEqual(
+            [c.kind for c in changes],
+            [ChangeKinds.MODIFIED, ChangeKinds.DELETED, ChangeKinds.ADDED],
+        )
+
+    def test_GIVEN_releases_compared_WHEN_compared_again_after_deleting_from_disk_THEN_same_changes(
+        self,
+    ):
+        self._write_releases()
+        first = list(self.service.compare("1.0.0", "2.0.0").change_descriptions())
+
+        shutil.rmtree(os.path.join(self.root, "1.0.0", "EPICS", "support"))
+        second = list(self.service.compare("1.0.0", "2.0.0").change_descriptions())
+
+        self.assertListEqual(first, second)
+        self.assertEqual(len(second), 2)
+
+    def test_GIVEN_release_changed_on_disk_WHEN_compared_with_reload_THEN_release_read_again(self):
+        self._write_releases()
+        self.service.compare("1.0.0", "2.0.0")
+
+        self._write("2.0.0", DB_PATH, RECORD.format("A", "1") + RECORD.format("B", "1"))
+        changes = list(self.service.compare("1.0.0", "2.0.0", reload=True).change_descriptions())
+
+        self.assertListEqual([c.kind for c in changes], [ChangeKinds.DELETED])
+
+    def test_GIVEN_dbd_changed_on_disk_WHEN_compared_with_schema_and_reload_THEN_new_schema_used(
+        self,
+    ):
+        dbd_path = os.path.join("EPICS", "support", "mod", "dbd", "mod.dbd")
+        self._write("1.0.0", DB_PATH, 'record(ai, "A") {\n    field(SMOO, "0.5")\n}\n')
+        self._write("2.0.0", DB_PATH, 'record(ai, "A") {}\n')
+        self._write("2.0.0", dbd_path, SMOO_DBD.format("0.5"))
+        first = list(self.service.compare("1.0.0", "2.0.0", use_schema=True).change_descriptions())
+        self.assertListEqual(
+            [d.kind for d in first[0].differences], [DifferenceKinds.FIELD_REMOVED_DEFAULT]
+        )
+
+        self._write("2.0.0", dbd_path, SMOO_DBD.format("0.25"))
+        changes = list(
+            self.service.compare(
+                "1.0.0", "2.0.0", use_schema=True, reload=True
+            ).change_descriptions()
+        )
+
+        self.assertListEqual(
+            [d.kind for d in changes[0].differences], [DifferenceKinds.FIELD_REMOVED]
+        )
+
+    def test_GIVEN_more_releases_than_maximum_WHEN_loaded_THEN_least_recently_used_dropped(self):
+        for release in ["1.0.0", "2.0.0", "3.0.0"]:
+            self._write(release, DB_PATH, "")
+
+        self.service.release("1.0.0")
+        self.service.release("2.0.0")
+        self.service.release("1.0.0")
+        self.service.release("3.0.0")
+
+        self.assertListEqual(self.service.loaded_releases(), ["1.0.0", "3.0.0"])
+
+    def test_GIVEN_invalid_release_WHEN_compared_THEN_value_error(self):
+        self._write("1.0.0", DB_PATH, "")
+
+        with self.assertRaises(ValueError):
+            self.service.compare("1.0.0", "missing")
+
+
+class ComparisonServerTests(ServiceTestCase):
+    def setUp(self):
+        super(ComparisonServerTests, self).setUp()
+        self.server = comparison_server(self.service, port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        super(ComparisonServerTests, self).tearDown()
+
+    def _get(self, path):
+        with urlopen("http://127.0.0.1:{}{}".format(self.server.server_address[1], path)) as r:
+            return r.read().decode("utf-8")
+
+    def test_GIVEN_releases_WHEN_compare_requested_as_json_THEN_one_change_per_line(self):
+        self._write_releases()
+
+        lines = self._get("/compare?old=1.0.0&new=2.0.0&format=json").splitlines()
+
+        self.assertListEqual(
+            [json.loads(line)["kind"] for line in lines],
+            [ChangeKinds.MODIFIED, ChangeKinds.DELETED],
+        )
+        self.assertIn("1.0.0", self._get("/status"))
+
+    def test_GIVEN_releases_WHEN_summary_requested_THEN_summary_table_returned(self):
+        self._write_releases()
+
+        summary = self._get("/summary?old=1.0.0&new=2.0.0&show_added=1")
+
+        self.assertTrue(summary.startswith("Directory"))
+        self.assertIn("DBs added", summary)
+
+    def test_GIVEN_invalid_release_WHEN_compare_requested_THEN_bad_request(self):
+        with self.assertRaises(HTTPError) as e:
+            self._get("/compare?old=1.0.0&new=missing")
+
+        self.assertEqual(e.exception.code, 400)
+
+    def test_GIVEN_release_can_not_be_read_WHEN_compare_requested_THEN_server_error(self):
+        self._write_releases()
+
+        with mock.patch.object(
+            self.service, "compare", side_effect=IOError("Share unavailable")
+        ), self.assertRaises(HTTPError) as e:
+            self._get("/compare?old=1.0.0&new=2.0.0")
+
+        self.assertEqual(e.exception.code, 500)
+        self.assertIn("Share unavailable", e.exception.read().decode("utf-8"))
+        self.assertIn("releases", self._get("/status"))
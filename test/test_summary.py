@@ -0,0 +1,137 @@
+import io
+import json
+import os
+import unittest
+
+from src.db_diff import ChangeKinds, DbChange, Difference, DifferenceKinds
+from src.summary import ChangeSummary
+
+SUPPORT = os.path.join("EPICS", "support")
+IOC = os.path.join("EPICS", "ioc", "master")
+
+
+def _change(kind, db_path, *difference_kinds):
+    return DbChange(
+        kind, db_path, "Change to {}".format(db_path), [Difference(k, k) for k in difference_kinds]
+    )
+
+
+class ChangeSummaryTests(unittest.TestCase):
+    def setUp(self):
+        self.summary = ChangeSummary([SUPPORT, IOC])
+
+    def test_GIVEN_db_paths_WHEN_getting_directory_THEN_directory_is_root_plus_one_level(self):
+        self.assertEqual(
+            self.summary.directory_of(os.path.join(SUPPORT, "motor", "master", "db", "a.db")),
+            os.path.join(SUPPORT, "motor"),
+        )
+        self.assertEqual(self.summary.directory_of(os.path.join(SUPPORT, "a.db")), SUPPORT)
+        self.assertEqual(
+            self.summary.directory_of(os.path.join("other", "dir", "a.db")),
+            os.path.join("other", "dir"),
+        )
+
+    def test_GIVEN_changes_WHEN_consumed_THEN_details_written_and_counts_kept_per_directory(self):
+        details = io.StringIO()
+
+        self.summary.consume(
+            [
+                _change(
+                    ChangeKinds.MODIFIED,
+                    os.path.join(SUPPORT, "motor", "db", "a.db"),
+                    DifferenceKinds.RECORD_REMOVED,
+                    DifferenceKinds.FIELD_REMOVED,
+                    DifferenceKinds.FIELD_REMOVED,
+                ),
+                _change(ChangeKinds.DELETED, os.path.join(SUPPORT, "motor", "db", "b.db")),
+                _change(ChangeKinds.DELETED, os.path.join(IOC, "GALIL", "db", "c.db")),
+            ],
+            details,
+        )
+
+        self.assertIn("a.db", details.getvalue())
+        self.assertIn("-----", details.getvalue())
+        self.assertEqual(len(self.summary.counts), 2)
+        motor_counts = self.summary.counts[os.path.join(SUPPORT, "motor")]
+        self.assertEqual(motor_counts[ChangeKinds.MODIFIED], 1)
+        self.assertEqual(motor_counts[ChangeKinds.DELETED], 1)
+        self.assertEqual(motor_counts[DifferenceKinds.RECORD_REMOVED], 1)
+        self.assertEqual(motor_counts[DifferenceKinds.FIELD_REMOVED], 2)
+
+    def test_GIVEN_json_format_WHEN_consumed_THEN_one_json_object_written_per_change(self):
+        details = io.StringIO()
+        db_path = os.path.join(SUPPORT, "motor", "db", "a.db")
+        change = DbChange(
+            ChangeKinds.MODIFIED,
+            db_path,
+            "Change to a.db",
+            [
+                Difference(
+                    DifferenceKinds.FIELD_CHANGED, "VAL changed", "A", "VAL", old_line=2, new_line=5
+                )
+            ],
+        )
+
+        self.summary.consume([change, _change(ChangeKinds.DELETED, db_path)], details, "json")
+
+        lines = details.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertDictEqual(
+            json.loads(lines[0]),
+            {
+                "kind": ChangeKinds.MODIFIED,
+                "db_path": db_path,
+                "description": "Change to a.db",
+                "differences": [
+                    {
+                        "kind": DifferenceKinds.FIELD_CHANGED,
+                        "description": "VAL changed (old line 2, new line 5)",
+                        "record": "A",
+                        "field": "VAL",
+                        "old_line": 2,
+                        "new_line": 5,
+                    }
+                ],
+            },
+        )
+        self.assertEqual(json.loads(lines[1])["kind"], ChangeKinds.DELETED)
+
+    def test_GIVEN_changes_WHEN_summary_written_THEN_each_directory_and_total_listed(self):
+        self.summary.add(_change(ChangeKinds.DELETED, os.path.join(SUPPORT, "motor", "a.db")))
+        self.summary.add(_change(ChangeKinds.DELETED, os.path.join(IOC, "GALIL", "b.db")))
+        stream = io.StringIO()
+
+        self.summary.write_summary(stream)
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith(os.path.join(IOC, "GALIL")))
+        self.assertTrue(lines[2].startswith(os.path.join(SUPPORT, "motor")))
+        self.assertTrue(lines[3].startswith("Total"))
+        self.assertNotIn("added", lines[0])
+
+    def test_GIVEN_additions_WHEN_summary_written_THEN_addition_columns_shown(self):
+        self.summary.add(_change(ChangeKinds.ADDED, os.path.join(SUPPORT, "motor", "a.db")))
+        stream = io.StringIO()
+
+        self.summary.write_summary(stream)
+
+        self.assertIn("DBs added", stream.getvalue())
+
+    def test_GIVEN_info_and_alias_additions_WHEN_summary_written_THEN_counted(self):
+        self.summary.add(
+            _change(
+                ChangeKinds.MODIFIED,
+                os.path.join(SUPPORT, "motor", "a.db"),
+                DifferenceKinds.INFO_ADDED,
+                DifferenceKinds.INFO_ADDED,
+                DifferenceKinds.ALIAS_ADDED,
+            )
+        )
+        stream = io.StringIO()
+
+        self.summary.write_summary(stream)
+
+        heading, _, total = stream.getvalue().splitlines()
+        self.assertTrue(heading.endswith("Infos added  Aliases added"))
+        self.assertTrue(total.endswith("2              1"))